@@ -6,23 +6,17 @@ import os
 import ast  # Used for safely evaluating string representations of lists
 import pandas as pd
 import hashlib # For password hashing
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import cm
-from reportlab.platypus.flowables import HRFlowable
 import plotly.express as px
 import secrets # For generating secure tokens for sharing
 import re
 import time
 from contextlib import contextmanager
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 import bcrypt
 import json
+import threading
+import io
+
+from src.utils.pdf_cache import cached_invoice_pdf, get_pdf_cache, invalidate_invoice_pdfs
 
 # Import enhanced database and business logic modules
 try:
@@ -32,6 +26,10 @@ try:
         InvoiceTemplate, RecurringInvoice, TaxCalculator, CurrencyConverter,
         AuditLog, RoleManager, InvoiceReminder, BusinessAnalytics
     )
+    from src.models.rollups import track_invoices, track_expenses, get_monthly_rollups, summarize_rollups
+    from src.models.payments import record_payment as record_invoice_payment
+    from src.business.pdf_batch import BatchPdfRenderer
+    from src.business.mailer import get_mailer, invoice_email, get_outbox_messages
     USE_ENHANCED_FEATURES = True
 except ImportError:
     USE_ENHANCED_FEATURES = False
@@ -47,6 +45,7 @@ class Config:
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here")
     SESSION_TIMEOUT: int = int(os.getenv("SESSION_TIMEOUT", "3600"))  # 1 hour
     DEBUG: bool = os.getenv("DEBUG", "False").lower() == "true"
+    CACHE_TTL: int = int(os.getenv("CACHE_TTL", "300"))  # seconds; bounds staleness from other writers
 
 config = Config()
 DB_NAME = config.DB_NAME
@@ -131,6 +130,24 @@ def get_db_connection():
         if conn:
             conn.close()
 
+@contextmanager
+def tracked_invoices(conn, where, params=()):
+    """Keep the monthly rollups in step with a write to invoices (enhanced schema only)"""
+    if USE_ENHANCED_FEATURES:
+        with track_invoices(conn, where, params):
+            yield
+    else:
+        yield
+
+@contextmanager
+def tracked_expenses(conn, where, params=()):
+    """Keep the monthly rollups in step with a write to expenses (enhanced schema only)"""
+    if USE_ENHANCED_FEATURES:
+        with track_expenses(conn, where, params):
+            yield
+    else:
+        yield
+
 def init_db():
     """Initializes the database schema."""
     # Use enhanced schema if available
@@ -169,7 +186,13 @@ def init_db():
             cursor.execute("SELECT project_id FROM invoices LIMIT 1")
         except sqlite3.OperationalError:
             cursor.execute("ALTER TABLE invoices ADD COLUMN project_id TEXT")
-        
+
+        # Add date_iso to invoices if it doesn't exist (written on every new invoice)
+        try:
+            cursor.execute("SELECT date_iso FROM invoices LIMIT 1")
+        except sqlite3.OperationalError:
+            cursor.execute("ALTER TABLE invoices ADD COLUMN date_iso TEXT")
+
         # Add created_at columns if they don't exist
         for table in ['users', 'clients', 'projects', 'invoices', 'shared_invoices', 'expenses', 'payments']:
             try:
@@ -199,6 +222,7 @@ def check_and_set_default_settings():
         for key, value in defaults.items():
             conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", (key, value))
         conn.commit()
+    invalidate_tables('settings')
 
 # ---------- AUTHENTICATION UTILITIES ----------
 def check_for_users():
@@ -218,21 +242,55 @@ def check_session_timeout():
     elapsed_time = time.time() - st.session_state.login_time
     return elapsed_time > config.SESSION_TIMEOUT
 
-# ---------- DATA FETCHING UTILITIES ----------
-def fetch_settings():
-    """Fetches all settings from the database and returns them as a dict."""
+# ---------- DATA CACHING ----------
+class TableGenerations:
+    """Process-wide write counter per table. Cached loaders take the
+    generation of the tables they read as an argument, so bumping a table
+    after a write makes only the loaders that read it query again."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {}
+
+    def get(self, *tables):
+        with self._lock:
+            return tuple(self._counts.get(table, 0) for table in tables)
+
+    def bump(self, *tables):
+        with self._lock:
+            for table in tables:
+                self._counts[table] = self._counts.get(table, 0) + 1
+
+@st.cache_resource
+def get_table_generations():
+    """Returns the single TableGenerations shared by every session."""
+    return TableGenerations()
+
+def table_generation(*tables):
+    """Current generation of the given tables, used as a cache key."""
+    return get_table_generations().get(*tables)
+
+def invalidate_tables(*tables):
+    """Marks tables as written so cached reads of them are refetched."""
+    get_table_generations().bump(*tables)
+
+# Writes from other processes (API, scheduler) are picked up after CACHE_TTL
+cache_table_data = st.cache_data(ttl=config.CACHE_TTL, max_entries=4, show_spinner=False)
+
+@cache_table_data
+def _load_settings(generation):
     with get_db_connection() as conn:
         settings_data = conn.execute("SELECT key, value FROM settings").fetchall()
     return {row['key']: row['value'] for row in settings_data}
 
-def fetch_all_clients():
-    """Fetches all clients from the database, ordered by name."""
+@cache_table_data
+def _load_clients(generation):
     with get_db_connection() as conn:
         clients = conn.execute("SELECT * FROM clients ORDER BY name ASC").fetchall()
-    return clients
-    
-def fetch_all_projects_with_client_info():
-    """Fetches all projects with joined client names."""
+    return [dict(client) for client in clients]
+
+@cache_table_data
+def _load_projects_with_client_info(generation):
     with get_db_connection() as conn:
         projects = conn.execute('''
             SELECT p.id, p.name, p.budget, p.status, p.description, c.name as client_name, c.id as client_id
@@ -240,10 +298,10 @@ def fetch_all_projects_with_client_info():
             JOIN clients c ON p.client_id = c.id
             ORDER BY p.name ASC
         ''').fetchall()
-    return projects
+    return [dict(project) for project in projects]
 
-def fetch_all_invoices_with_client_info():
-    """Fetches all invoices with joined client information."""
+@cache_table_data
+def _load_invoices_with_client_info(generation):
     with get_db_connection() as conn:
         invoices = conn.execute('''
             SELECT i.id, i.date, i.total, i.status, i.services, i.project_id, c.name, c.email, c.phone, c.id as client_id
@@ -251,7 +309,30 @@ def fetch_all_invoices_with_client_info():
             JOIN clients c ON i.client_id = c.id
             ORDER BY i.date DESC
         ''').fetchall()
-    return invoices
+    return [dict(invoice) for invoice in invoices]
+
+@cache_table_data
+def _load_expenses(generation):
+    with get_db_connection() as conn:
+        expenses = conn.execute("SELECT * FROM expenses ORDER BY date DESC").fetchall()
+    return [dict(expense) for expense in expenses]
+
+# ---------- DATA FETCHING UTILITIES ----------
+def fetch_settings():
+    """Fetches all settings from the database and returns them as a dict."""
+    return _load_settings(table_generation('settings'))
+
+def fetch_all_clients():
+    """Fetches all clients from the database, ordered by name."""
+    return _load_clients(table_generation('clients'))
+    
+def fetch_all_projects_with_client_info():
+    """Fetches all projects with joined client names."""
+    return _load_projects_with_client_info(table_generation('projects', 'clients'))
+
+def fetch_all_invoices_with_client_info():
+    """Fetches all invoices with joined client information."""
+    return _load_invoices_with_client_info(table_generation('invoices', 'clients'))
 
 def fetch_invoice_by_id(invoice_id):
     """Fetches a single invoice by its ID, with client info."""
@@ -266,9 +347,7 @@ def fetch_invoice_by_id(invoice_id):
 
 def fetch_all_expenses():
     """Fetches all expenses from the database, ordered by date."""
-    with get_db_connection() as conn:
-        expenses = conn.execute("SELECT * FROM expenses ORDER BY date DESC").fetchall()
-    return expenses
+    return _load_expenses(table_generation('expenses'))
 
 def fetch_payments_for_invoice(invoice_id):
     """Fetches all payments for a specific invoice."""
@@ -276,28 +355,178 @@ def fetch_payments_for_invoice(invoice_id):
         payments = conn.execute("SELECT * FROM payments WHERE invoice_id = ? ORDER BY date DESC", (invoice_id,)).fetchall()
     return payments
 
+def fetch_payments_for_invoices(invoice_ids):
+    """Fetches the payments of several invoices in one query, grouped by invoice ID."""
+    payments = {invoice_id: [] for invoice_id in invoice_ids}
+    if not invoice_ids:
+        return payments
+    placeholders = ", ".join("?" * len(invoice_ids))
+    with get_db_connection() as conn:
+        rows = conn.execute(f"SELECT * FROM payments WHERE invoice_id IN ({placeholders}) ORDER BY date DESC", tuple(invoice_ids)).fetchall()
+    for row in rows:
+        payments[row['invoice_id']].append(row)
+    return payments
+
+# Sort options for the invoice list: label -> (sort key, direction). Ties are
+# broken by invoice ID so every row has a unique position for keyset paging;
+# NULL keys on legacy rows are coalesced so those rows are still reachable.
+INVOICE_SORTS = {
+    "Newest first": ("COALESCE(i.created_at, '')", "DESC"),
+    "Oldest first": ("COALESCE(i.created_at, '')", "ASC"),
+    "Amount: high to low": ("COALESCE(i.total, 0)", "DESC"),
+    "Amount: low to high": ("COALESCE(i.total, 0)", "ASC"),
+}
+
+def _invoice_filters(search, status):
+    """Builds the WHERE conditions shared by the invoice page and count queries."""
+    conditions, params = [], []
+    if status:
+        conditions.append("i.status = ?")
+        params.append(status)
+    if search:
+        pattern = "%" + re.sub(r"([!%_])", r"!\1", search.lower()) + "%"
+        conditions.append("(LOWER(c.name) LIKE ? ESCAPE '!' OR LOWER(i.id) LIKE ? ESCAPE '!')")
+        params.extend([pattern, pattern])
+    return conditions, params
+
+def count_invoices(search="", status=None):
+    """Counts the invoices matching a search and status filter."""
+    conditions, params = _invoice_filters(search, status)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with get_db_connection() as conn:
+        return conn.execute(f"SELECT COUNT(*) FROM invoices i JOIN clients c ON i.client_id = c.id {where}", tuple(params)).fetchone()[0]
+
+def fetch_invoice_page(search="", status=None, sort="Newest first", page_size=25, after=None):
+    """
+    Fetches one page of invoices (with client info) using keyset pagination.
+
+    ``after`` is the cursor returned for the previous page. Returns the rows
+    and the cursor of the next page, or None on the last page.
+    """
+    sort_key, direction = INVOICE_SORTS[sort]
+    comparison = "<" if direction == "DESC" else ">"
+
+    conditions, params = _invoice_filters(search, status)
+    if after is not None:
+        conditions.append(f"({sort_key} {comparison} ? OR ({sort_key} = ? AND i.id {comparison} ?))")
+        params.extend([after[0], after[0], after[1]])
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with get_db_connection() as conn:
+        rows = conn.execute(f'''
+            SELECT i.id, i.date, i.total, i.status, i.services, i.project_id, c.name, c.email, c.phone, c.id as client_id,
+                   {sort_key} as sort_key
+            FROM invoices i
+            JOIN clients c ON i.client_id = c.id
+            {where}
+            ORDER BY sort_key {direction}, i.id {direction}
+            LIMIT ?
+        ''', tuple(params) + (page_size + 1,)).fetchall()
+
+    rows = [dict(row) for row in rows]
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = (rows[-1]['sort_key'], rows[-1]['id'])
+    return rows, next_cursor
+
+def fetch_financial_summary():
+    """Fetches headline totals: paid revenue, expenses, profit and unpaid outstanding."""
+    with get_db_connection() as conn:
+        if USE_ENHANCED_FEATURES:
+            return summarize_rollups(conn)
+        invoice_totals = conn.execute('''
+            SELECT SUM(CASE WHEN status = 'paid' THEN total ELSE 0 END) as revenue,
+                   SUM(CASE WHEN status = 'unpaid' THEN total ELSE 0 END) as outstanding
+            FROM invoices
+        ''').fetchone()
+        expenses = conn.execute("SELECT SUM(amount) FROM expenses").fetchone()[0] or 0
+    revenue = invoice_totals['revenue'] or 0
+    return {'revenue': revenue, 'expenses': expenses, 'profit': revenue - expenses,
+            'outstanding': invoice_totals['outstanding'] or 0}
+
+def fetch_monthly_performance():
+    """Fetches paid revenue and expenses per month ('YYYY-MM'), oldest first."""
+    if USE_ENHANCED_FEATURES:
+        with get_db_connection() as conn:
+            months = get_monthly_rollups(conn)
+        return [{'month_year': m['month'], 'Revenue': m['revenue_paid'] or 0, 'Expenses': m['expenses'] or 0}
+                for m in months if m['revenue_paid'] or m['expenses']]
+    # The basic schema has no rollup table, so bucket the raw rows
+    monthly = {}
+    for inv in fetch_all_invoices_with_client_info():
+        if inv['status'] == 'paid':
+            month = datetime.datetime.strptime(inv['date'], '%d %B %Y').strftime('%Y-%m')
+            monthly.setdefault(month, {'Revenue': 0, 'Expenses': 0})['Revenue'] += inv['total']
+    for exp in fetch_all_expenses():
+        month = exp['date'][:7]
+        monthly.setdefault(month, {'Revenue': 0, 'Expenses': 0})['Expenses'] += exp['amount']
+    return [{'month_year': month, **values} for month, values in sorted(monthly.items())]
+
+def fetch_expense_totals_by_category():
+    """Fetches the total expense amount per category."""
+    with get_db_connection() as conn:
+        return conn.execute("SELECT category, SUM(amount) as amount FROM expenses GROUP BY category").fetchall()
+
+def fetch_unpaid_invoice_amounts():
+    """Fetches the date and total of every unpaid invoice."""
+    with get_db_connection() as conn:
+        return conn.execute("SELECT date, total FROM invoices WHERE status = 'unpaid'").fetchall()
+
+def fetch_project_revenue():
+    """Fetches every project with the total of its paid invoices."""
+    with get_db_connection() as conn:
+        return conn.execute('''
+            SELECT p.id, p.name, p.budget, p.status, c.name as client_name,
+                   SUM(CASE WHEN i.status = 'paid' THEN i.total ELSE 0 END) as revenue,
+                   COUNT(CASE WHEN i.status = 'paid' THEN 1 END) as paid_invoices
+            FROM projects p
+            JOIN clients c ON p.client_id = c.id
+            LEFT JOIN invoices i ON i.project_id = p.id
+            GROUP BY p.id, p.name, p.budget, p.status, c.name
+            ORDER BY p.name ASC
+        ''').fetchall()
+
+def fetch_client_lifetime_values():
+    """Fetches paid revenue per client name, highest first."""
+    with get_db_connection() as conn:
+        return conn.execute('''
+            SELECT c.name, SUM(i.total) as lifetime_value
+            FROM invoices i
+            JOIN clients c ON i.client_id = c.id
+            WHERE i.status = 'paid'
+            GROUP BY c.name
+            ORDER BY lifetime_value DESC
+        ''').fetchall()
+
 # ---------- PAYMENT MANAGEMENT ----------
 def record_payment(invoice_id, amount, payment_date, method, notes=""):
     """Record a payment for an invoice"""
     with get_db_connection() as conn:
-        payment_id = str(uuid.uuid4())[:8]
-        created_at = datetime.datetime.now().isoformat()
-        
-        conn.execute(
-            "INSERT INTO payments (id, invoice_id, amount, date, method, notes, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
-            (payment_id, invoice_id, amount, payment_date, method, notes, created_at)
-        )
-        
-        # Update invoice status if fully paid
-        invoice = conn.execute("SELECT total FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
-        total_paid = conn.execute("SELECT SUM(amount) FROM payments WHERE invoice_id = ?", (invoice_id,)).fetchone()[0] or 0
-        
-        if total_paid >= invoice['total']:
-            conn.execute("UPDATE invoices SET status = 'paid' WHERE id = ?", (invoice_id,))
-        elif total_paid > 0:
-            conn.execute("UPDATE invoices SET status = 'partially_paid' WHERE id = ?", (invoice_id,))
+        if USE_ENHANCED_FEATURES:
+            # amount_paid and the status are updated with the insert, in one statement
+            record_invoice_payment(conn, invoice_id, amount, payment_date, method, notes)
+        else:
+            payment_id = str(uuid.uuid4())[:8]
+            created_at = datetime.datetime.now().isoformat()
+            
+            conn.execute(
+                "INSERT INTO payments (id, invoice_id, amount, date, method, notes, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (payment_id, invoice_id, amount, payment_date, method, notes, created_at)
+            )
+            
+            # Update invoice status if fully paid
+            invoice = conn.execute("SELECT total FROM invoices WHERE id = ?", (invoice_id,)).fetchone()
+            total_paid = conn.execute("SELECT SUM(amount) FROM payments WHERE invoice_id = ?", (invoice_id,)).fetchone()[0] or 0
+            
+            if total_paid >= invoice['total']:
+                conn.execute("UPDATE invoices SET status = 'paid' WHERE id = ?", (invoice_id,))
+            elif total_paid > 0:
+                conn.execute("UPDATE invoices SET status = 'partially_paid' WHERE id = ?", (invoice_id,))
         
         conn.commit()
+    invalidate_tables('payments', 'invoices')
+    invalidate_invoice_pdfs([invoice_id])
 
 # ---------- BACKUP & DATA EXPORT ----------
 def export_database_backup():
@@ -324,144 +553,30 @@ def with_loading(message="Processing..."):
     return decorator
 
 # ---------- PDF GENERATION ----------
-@with_loading("Generating PDF...")
-def generate_invoice_pdf(invoice_data, settings):
-    """Generates a professional PDF invoice from the provided data and settings."""
-    filename = f"invoice_{invoice_data['id']}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm)
-    styles = getSampleStyleSheet()
-    
-    styles.add(ParagraphStyle(name='RightAlign', alignment=2))
-    styles.add(ParagraphStyle(name='TotalLabel', alignment=2, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='TotalValue', alignment=2, fontName='Helvetica-Bold', textColor=colors.HexColor("#0057A0")))
-
-    elements = []
-
-    header_data = [[
-        Image(LOGO_PATH, width=60, height=60) if os.path.exists(LOGO_PATH) else '',
-        Paragraph(f"<b>{settings.get('COMPANY_NAME', '')}</b><br/>{settings.get('COMPANY_ADDRESS', '')}<br/>{settings.get('COMPANY_PHONE', '')} | {settings.get('COMPANY_EMAIL', '')}<br/>{settings.get('COMPANY_TIN', '')}", styles['RightAlign'])
-    ]]
-    header_table = Table(header_data, colWidths=[10*cm, 7.5*cm])
-    header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
-    elements.append(header_table)
-
-    elements.append(Spacer(1, 1*cm))
-    elements.append(Paragraph("INVOICE", styles['h1']))
-    elements.append(HRFlowable(width="100%", thickness=1, color=colors.grey))
-    elements.append(Spacer(1, 0.5*cm))
-
-    status_html = f"<font color='green'><b>PAID</b></font>" if invoice_data['status'] == 'paid' else f"<font color='red'><b>UNPAID</b></font>"
-    details_data = [
-        [Paragraph(f"<b>Bill To:</b><br/>{invoice_data['name']}<br/>{invoice_data['email'] or ''}<br/>{invoice_data['phone'] or ''}", styles['Normal']),
-         Paragraph(f"<b>Invoice ID:</b> {invoice_data['id']}<br/><b>Date:</b> {invoice_data['date']}<br/><b>Status:</b> {status_html}", styles['RightAlign'])]
-    ]
-    details_table = Table(details_data, colWidths=[9*cm, 8.5*cm])
-    details_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
-    elements.append(details_table)
-    elements.append(Spacer(1, 1*cm))
+def invoice_pdf_filename(invoice_data):
+    """Download file name for an invoice PDF."""
+    return f"invoice_{invoice_data['id']}.pdf"
 
-    try:
-        services = ast.literal_eval(invoice_data['services'])
-        if not isinstance(services, list):
-            services = [("Error parsing services", 0.0)]
-    except (ValueError, SyntaxError):
-        services = [("Error: Service data is corrupt.", 0.0)]
-
-    data = [["SERVICE DESCRIPTION", "PRICE"]]
-    for service, price in services:
-        data.append([Paragraph(service, styles['Normal']), f"${price:,.2f}"])
-    
-    services_table = Table(data, colWidths=[14*cm, 3.5*cm], repeatRows=1)
-    services_table.setStyle(TableStyle([
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#0057A0")),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-        ('ALIGN', (0,0), (-1,0), 'LEFT'),
-        ('ALIGN', (1,0), (-1,-1), 'RIGHT'),
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0,0), (-1,0), 12),
-        ('TOPPADDING', (0,0), (-1,0), 12),
-        ('BACKGROUND', (0,1), (-1,-1), colors.whitesmoke),
-        ('GRID', (0,0), (-1,-1), 1, colors.lightgrey)
-    ]))
-    elements.append(services_table)
-
-    total_data = [
-        [Paragraph(f"TOTAL:", styles['TotalLabel']), Paragraph(f"${invoice_data['total']:,.2f}", styles['TotalValue'])]
-    ]
-    total_table = Table(total_data, colWidths=[14*cm, 3.5*cm])
-    total_table.setStyle(TableStyle([
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('BACKGROUND', (0,0), (-1,-1), colors.HexColor("#DEEEF9")),
-        ('GRID', (0,0), (-1,-1), 1, colors.lightgrey)
-    ]))
-    elements.append(total_table)
-    elements.append(Spacer(1, 1.5*cm))
-
-    payment_terms_data = [
-        [Paragraph(settings.get('BANK_DETAILS', ''), styles['Normal']), Paragraph("<b>Terms & Conditions:</b><br/>1. Payment due in 7 days.<br/>2. Late payments may incur fees.<br/>3. All transactions are final.", styles['Normal'])]
-    ]
-    payment_terms_table = Table(payment_terms_data, colWidths=[8.5*cm, 9*cm])
-    payment_terms_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'TOP')]))
-    elements.append(payment_terms_table)
-    elements.append(Spacer(1, 1*cm))
-    elements.append(Paragraph("Thank you for your business!", styles['Italic']))
-
-    def add_watermark(canvas, doc):
-        canvas.saveState()
-        watermark_text = invoice_data['status'].upper()
-        color = colors.green if invoice_data['status'] == 'paid' else colors.red
-        canvas.setFont("Helvetica-Bold", 100)
-        canvas.setFillColor(color, alpha=0.1)
-        canvas.translate(A4[0]/2, A4[1]/2)
-        canvas.rotate(45)
-        canvas.drawCentredString(0, 0, watermark_text)
-        canvas.restoreState()
-
-    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
-    return filename
+def invoice_pdf(invoice_data, settings):
+    """Returns an invoice's PDF bytes from the shared PDF cache, rendering it only if that exact content is not cached."""
+    return cached_invoice_pdf(invoice_data, settings, LOGO_PATH)
 
 # ---------- EMAIL UTILITY ----------
 @with_loading("Sending email...")
 def send_invoice_email(invoice_data, settings, recipient_email):
-    """Sends an invoice PDF via email."""
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    if not all([settings.get("SMTP_SERVER"), settings.get("SMTP_PORT"), settings.get("SMTP_USERNAME"), smtp_password, settings.get("SMTP_SENDER_EMAIL")]):
+    """Sends an invoice PDF via email through the outbox and the shared SMTP connection pool."""
+    mailer = get_mailer(settings, LOGO_PATH) if USE_ENHANCED_FEATURES else None
+    if mailer is None:
         st.error("SMTP settings are not fully configured. Please check Settings and ensure the SMTP_PASSWORD environment variable is set.")
         return False
 
-    pdf_filename = generate_invoice_pdf(invoice_data, settings)
-
-    msg = MIMEMultipart()
-    msg['From'] = settings["SMTP_SENDER_EMAIL"]
-    msg['To'] = recipient_email
-    
-    subject_template = settings.get("EMAIL_SUBJECT", "Invoice from {company_name}")
-    msg['Subject'] = subject_template.format(company_name=settings.get("COMPANY_NAME", ""))
-
-    body_template = settings.get("EMAIL_BODY", "Please find your invoice attached.")
-    body = body_template.format(
-        client_name=invoice_data['name'],
-        invoice_id=invoice_data['id'],
-        total=f"{invoice_data['total']:,.2f}",
-        company_name=settings.get("COMPANY_NAME", "")
-    )
-    msg.attach(MIMEText(body, 'html'))
-
-    with open(pdf_filename, "rb") as f:
-        attach = MIMEApplication(f.read(), _subtype="pdf")
-        attach.add_header('Content-Disposition', 'attachment', filename=str(pdf_filename))
-        msg.attach(attach)
-
-    try:
-        with smtplib.SMTP_SSL(settings["SMTP_SERVER"], int(settings["SMTP_PORT"])) as server:
-            server.login(settings["SMTP_USERNAME"], smtp_password)
-            server.send_message(msg)
-        os.remove(pdf_filename) # Clean up the generated PDF
-        return True
-    except Exception as e:
-        st.error(f"Failed to send email: {e}")
-        os.remove(pdf_filename) # Clean up even if it fails
+    with get_db_connection() as conn:
+        result = mailer.send(conn, [invoice_email(invoice_data, settings, recipient_email)])
+    outcome = result['results'][0]
+    if outcome['error'] is not None:
+        st.error(f"Failed to send email after {outcome['attempts']} attempt(s): {outcome['error']}")
         return False
+    return True
 
 # ---------- UI HELPER ----------
 def get_time_of_day_greeting():
@@ -482,10 +597,8 @@ def page_dashboard():
     st.markdown("Here's your business overview.")
 
     with st.spinner('Loading your dashboard...'):
-        invoices = fetch_all_invoices_with_client_info()
-        expenses = fetch_all_expenses()
-        df_invoices = pd.DataFrame(invoices, columns=invoices[0].keys()) if invoices else pd.DataFrame()
-        df_expenses = pd.DataFrame(expenses, columns=expenses[0].keys()) if expenses else pd.DataFrame()
+        summary = fetch_financial_summary()
+        df_monthly = pd.DataFrame(fetch_monthly_performance(), columns=['month_year', 'Revenue', 'Expenses'])
 
         st.markdown("---")
         
@@ -495,20 +608,16 @@ def page_dashboard():
             col1, col2, col3, col4 = st.columns(4)
             with col1:
                 with st.container(border=True):
-                    total_revenue = sum(inv['total'] for inv in invoices if inv['status'] == 'paid')
-                    st.metric("Total Revenue 💵", f"${total_revenue:,.2f}")
+                    st.metric("Total Revenue 💵", f"${summary['revenue']:,.2f}")
             with col2:
                  with st.container(border=True):
-                    total_expenses = sum(exp['amount'] for exp in expenses)
-                    st.metric("Total Expenses 💸", f"${total_expenses:,.2f}")
+                    st.metric("Total Expenses 💸", f"${summary['expenses']:,.2f}")
             with col3:
                  with st.container(border=True):
-                    net_profit = total_revenue - total_expenses
-                    st.metric("Net Profit 💰", f"${net_profit:,.2f}")
+                    st.metric("Net Profit 💰", f"${summary['profit']:,.2f}")
             with col4:
                  with st.container(border=True):
-                    outstanding_revenue = sum(inv['total'] for inv in invoices if inv['status'] == 'unpaid')
-                    st.metric("Outstanding ⏰", f"${outstanding_revenue:,.2f}")
+                    st.metric("Outstanding ⏰", f"${summary['outstanding']:,.2f}")
 
         st.markdown("<br>", unsafe_allow_html=True) 
 
@@ -517,21 +626,7 @@ def page_dashboard():
         with tab1:
             with st.container(border=True):
                 st.write("##### Monthly Performance")
-                if not df_invoices.empty or not df_expenses.empty:
-                    if not df_invoices.empty and df_invoices['status'].eq('paid').any():
-                        df_paid = df_invoices[df_invoices['status'] == 'paid'].copy()
-                        df_paid['date_dt'] = pd.to_datetime(df_paid['date'], format='%d %B %Y')
-                        df_paid['month_year'] = df_paid['date_dt'].dt.to_period('M').astype(str)
-                        monthly_revenue = df_paid.groupby('month_year')['total'].sum().reset_index().rename(columns={'total': 'Revenue'})
-                    else: monthly_revenue = pd.DataFrame(columns=['month_year', 'Revenue'])
-
-                    if not df_expenses.empty:
-                        df_expenses['date_dt'] = pd.to_datetime(df_expenses['date'], format='%Y-%m-%d')
-                        df_expenses['month_year'] = df_expenses['date_dt'].dt.to_period('M').astype(str)
-                        monthly_expenses = df_expenses.groupby('month_year')['amount'].sum().reset_index().rename(columns={'amount': 'Expenses'})
-                    else: monthly_expenses = pd.DataFrame(columns=['month_year', 'Expenses'])
-
-                    df_monthly = pd.merge(monthly_revenue, monthly_expenses, on='month_year', how='outer').fillna(0)
+                if not df_monthly.empty:
                     df_monthly = pd.melt(df_monthly, id_vars='month_year', value_vars=['Revenue', 'Expenses'], var_name='Metric', value_name='Amount')
 
                     fig = px.bar(df_monthly, x='month_year', y='Amount', color='Metric', barmode='group', labels={'Amount': 'Amount (USD)', 'month_year': 'Month'}, color_discrete_map={'Revenue': 'green', 'Expenses': 'red'})
@@ -543,8 +638,9 @@ def page_dashboard():
             with col1:
                 with st.container(border=True):
                     st.write("##### Expense Breakdown")
-                    if not df_expenses.empty:
-                        df_expenses_cat = df_expenses.groupby('category')['amount'].sum().reset_index()
+                    expense_categories = fetch_expense_totals_by_category()
+                    if expense_categories:
+                        df_expenses_cat = pd.DataFrame(expense_categories, columns=['category', 'amount'])
                         fig_exp = px.pie(df_expenses_cat, values='amount', names='category', title='', hole=.3)
                         fig_exp.update_traces(textposition='inside', textinfo='percent+label')
                         st.plotly_chart(fig_exp, use_container_width=True)
@@ -552,22 +648,21 @@ def page_dashboard():
             with col2:
                 with st.container(border=True):
                     st.write("##### Invoice Aging (Unpaid)")
-                    if not df_invoices.empty:
-                        df_unpaid = df_invoices[df_invoices['status'] == 'unpaid'].copy()
-                        if not df_unpaid.empty:
-                            df_unpaid['date_dt'] = pd.to_datetime(df_unpaid['date'], format='%d %B %Y')
-                            today = datetime.datetime.now()
-                            df_unpaid['days_overdue'] = (today - df_unpaid['date_dt']).dt.days
-                            def age_bucket(days):
-                                if days <= 0: return 'Current';
-                                if 1 <= days <= 30: return 'Overdue (1-30 Days)';
-                                return 'Severely Overdue (30+ Days)'
-                            df_unpaid['Aging'] = df_unpaid['days_overdue'].apply(age_bucket)
-                            aging_summary = df_unpaid.groupby('Aging')['total'].sum().reset_index()
-                            fig_age = px.pie(aging_summary, values='total', names='Aging', color_discrete_map={'Current': 'blue', 'Overdue (1-30 Days)': 'orange', 'Severely Overdue (30+ Days)': 'crimson'})
-                            st.plotly_chart(fig_age, use_container_width=True)
-                        else: st.info("No unpaid invoices to analyze.")
-                    else: st.info("No invoice data available.")
+                    unpaid_invoices = fetch_unpaid_invoice_amounts()
+                    if unpaid_invoices:
+                        df_unpaid = pd.DataFrame(unpaid_invoices, columns=['date', 'total'])
+                        df_unpaid['date_dt'] = pd.to_datetime(df_unpaid['date'], format='%d %B %Y')
+                        today = datetime.datetime.now()
+                        df_unpaid['days_overdue'] = (today - df_unpaid['date_dt']).dt.days
+                        def age_bucket(days):
+                            if days <= 0: return 'Current';
+                            if 1 <= days <= 30: return 'Overdue (1-30 Days)';
+                            return 'Severely Overdue (30+ Days)'
+                        df_unpaid['Aging'] = df_unpaid['days_overdue'].apply(age_bucket)
+                        aging_summary = df_unpaid.groupby('Aging')['total'].sum().reset_index()
+                        fig_age = px.pie(aging_summary, values='total', names='Aging', color_discrete_map={'Current': 'blue', 'Overdue (1-30 Days)': 'orange', 'Severely Overdue (30+ Days)': 'crimson'})
+                        st.plotly_chart(fig_age, use_container_width=True)
+                    else: st.info("No unpaid invoices to analyze.")
 
 def page_create_invoice():
     """Page for creating a new invoice."""
@@ -644,36 +739,62 @@ def page_create_invoice():
                            (client_id, client_name, client_email, client_phone, created_at))
             
             invoice_id = f"ST-{str(uuid.uuid4())[:6].upper()}"
-            invoice_date = datetime.date.today().strftime('%d %B %Y')
+            today = datetime.date.today()
+            invoice_date = today.strftime('%d %B %Y')
             
-            conn.execute('INSERT INTO invoices (id, client_id, project_id, services, total, date, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)', 
-                       (invoice_id, client_id, project_id, str(final_services), total, invoice_date, created_at))
+            with tracked_invoices(conn, "id = ?", (invoice_id,)):
+                conn.execute('INSERT INTO invoices (id, client_id, project_id, services, total, date, date_iso, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', 
+                           (invoice_id, client_id, project_id, str(final_services), total, invoice_date, today.isoformat(), created_at))
             conn.commit()
+        invalidate_tables('invoices', 'clients')
             
         st.success(f"Invoice {invoice_id} created!")
         
         pdf_data = {'id': invoice_id, 'date': invoice_date, 'total': total, 'status': 'unpaid', 'services': str(final_services), 'name': client_name, 'email': client_email, 'phone': client_phone}
-        pdf_file = generate_invoice_pdf(pdf_data, settings)
-        with open(pdf_file, "rb") as file: 
-            st.download_button("📄 Download PDF", file, pdf_file, "application/pdf")
+        st.download_button("📄 Download PDF", lambda: invoice_pdf(pdf_data, settings), invoice_pdf_filename(pdf_data), "application/pdf")
         if 'services' in st.session_state: 
             del st.session_state.services
 
 def page_invoice_dashboard():
     """Page for viewing, managing, and regenerating invoices."""
     st.header("📊 Invoice Management")
+    settings = fetch_settings()
+
+    st.subheader("Filters"); col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
+    search_query = col1.text_input("Search Client or Invoice ID").strip()
+    status_filter = col2.selectbox("Filter Status", ["All", "Paid", "Unpaid", "Partially Paid"])
+    sort = col3.selectbox("Sort By", list(INVOICE_SORTS))
+    page_size = col4.selectbox("Per Page", [10, 25, 50, 100], index=1)
+    status = None if status_filter == "All" else status_filter.lower().replace(' ', '_')
+
+    # Cursors of the pages visited so far; start over whenever the query changes
+    query_key = (search_query, status, sort, page_size)
+    if st.session_state.get('invoice_page_query') != query_key:
+        st.session_state.invoice_page_query = query_key
+        st.session_state.invoice_page_cursors = [None]
+    cursors = st.session_state.invoice_page_cursors
+
     with st.spinner('Loading invoices...'):
-        settings = fetch_settings()
-        invoices = fetch_all_invoices_with_client_info()
-    if not invoices: st.info("No invoices found."); return
-
-    st.subheader("Filters"); col1, col2 = st.columns(2)
-    search_query = st.text_input("Search Client or Invoice ID")
-    status_filter = st.selectbox("Filter Status", ["All", "Paid", "Unpaid", "Partially Paid"])
-    filtered_invoices = [inv for inv in invoices if (search_query.lower() in inv['name'].lower() or search_query.lower() in inv['id'].lower()) and (status_filter.lower() == 'all' or inv['status'] == status_filter.lower().replace(' ', '_'))]
-    if not filtered_invoices: st.warning("No invoices match criteria."); return
+        total_matches = count_invoices(search_query, status)
+        invoices, next_cursor = fetch_invoice_page(search_query, status, sort, page_size, after=cursors[-1])
+        payments_by_invoice = fetch_payments_for_invoices([inv['id'] for inv in invoices])
+    if not invoices and len(cursors) > 1:
+        cursors.pop(); st.rerun()  # the last page was emptied by a delete
+    if not invoices:
+        if search_query or status: st.warning("No invoices match criteria.")
+        else: st.info("No invoices found.")
+        return
+
+    page_number = len(cursors)
+    first = (page_number - 1) * page_size + 1
+    nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+    nav_info.caption(f"Showing {first}–{first + len(invoices) - 1} of {total_matches} invoices (page {page_number})")
+    if nav_prev.button("◀ Previous", disabled=page_number == 1):
+        cursors.pop(); st.rerun()
+    if nav_next.button("Next ▶", disabled=next_cursor is None):
+        cursors.append(next_cursor); st.rerun()
         
-    for inv in filtered_invoices:
+    for inv in invoices:
         status_emoji = "🟢" if inv['status'] == 'paid' else "🟡" if inv['status'] == 'partially_paid' else "🔴"
         with st.expander(f"{status_emoji} **{inv['id']}** - {inv['name']} - `${inv['total']:,.2f}`"):
             st.write(f"**Client:** {inv['name']} | **Email:** {inv['email']} | **Phone:** {inv['phone']}")
@@ -686,27 +807,32 @@ def page_invoice_dashboard():
             st.markdown(f"**Total:** `${inv['total']:,.2f}` | **Status:** `{inv['status'].upper().replace('_', ' ')}`")
             
             # Show payment history if any
-            payments = fetch_payments_for_invoice(inv['id'])
+            payments = payments_by_invoice[inv['id']]
             if payments:
                 st.subheader("Payment History")
                 for payment in payments:
                     st.write(f"- ${payment['amount']:,.2f} on {payment['date']} via {payment['method']}")
             
             btn_pdf, btn_mark, btn_delete, btn_payment, btn_share, btn_email = st.columns(6)
-            pdf_file = generate_invoice_pdf(inv, settings)
-            with open(pdf_file, "rb") as file: 
-                btn_pdf.download_button("📄 PDF", file, pdf_file, "application/pdf", key=f"pdf_{inv['id']}")
+            # Rendered only when the button is clicked
+            btn_pdf.download_button("📄 PDF", lambda inv=inv: invoice_pdf(inv, settings), invoice_pdf_filename(inv), "application/pdf", key=f"pdf_{inv['id']}")
             
             with get_db_connection() as conn:
                 if inv['status'] == 'unpaid':
                     if btn_mark.button("Mark Paid", key=f"paid_{inv['id']}", type="primary"): 
-                        conn.execute("UPDATE invoices SET status='paid' WHERE id=?", (inv['id'],)); conn.commit(); st.rerun()
+                        with tracked_invoices(conn, "id = ?", (inv['id'],)):
+                            conn.execute("UPDATE invoices SET status='paid' WHERE id=?", (inv['id'],))
+                        conn.commit(); invalidate_tables('invoices'); invalidate_invoice_pdfs([inv['id']]); st.rerun()
                 else:
                     if btn_mark.button("Mark Unpaid", key=f"unpaid_{inv['id']}"): 
-                        conn.execute("UPDATE invoices SET status='unpaid' WHERE id=?", (inv['id'],)); conn.commit(); st.rerun()
+                        with tracked_invoices(conn, "id = ?", (inv['id'],)):
+                            conn.execute("UPDATE invoices SET status='unpaid' WHERE id=?", (inv['id'],))
+                        conn.commit(); invalidate_tables('invoices'); invalidate_invoice_pdfs([inv['id']]); st.rerun()
                 
                 if btn_delete.button("🗑️ Delete", key=f"del_inv_{inv['id']}"): 
-                    conn.execute("DELETE FROM invoices WHERE id=?", (inv['id'],)); conn.commit(); st.rerun()
+                    with tracked_invoices(conn, "id = ?", (inv['id'],)):
+                        conn.execute("DELETE FROM invoices WHERE id=?", (inv['id'],))
+                    conn.commit(); invalidate_tables('invoices'); invalidate_invoice_pdfs([inv['id']]); st.rerun()
                 
                 if btn_payment.button("💰 Record Payment", key=f"pay_{inv['id']}"):
                     with st.form(key=f"payment_form_{inv['id']}"):
@@ -770,6 +896,7 @@ def page_manage_projects():
                     conn.execute("INSERT INTO projects (id, client_id, name, budget, status, description, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)", 
                                (str(uuid.uuid4())[:8], client_id, sanitize_input(name), budget, status, sanitize_input(description), created_at))
                     conn.commit()
+                invalidate_tables('projects')
                 st.success("Project added!")
                 st.rerun()
             else:
@@ -800,6 +927,7 @@ def page_manage_projects():
                         conn.execute("UPDATE projects SET name=?, budget=?, status=?, description=? WHERE id=?", 
                                    (sanitize_input(name), budget, status, sanitize_input(description), proj['id']))
                         conn.commit()
+                    invalidate_tables('projects')
                     st.rerun()
             
             # Delete button outside the form
@@ -809,6 +937,7 @@ def page_manage_projects():
                     with get_db_connection() as conn:
                         conn.execute("DELETE FROM projects WHERE id=?", (proj['id'],))
                         conn.commit()
+                    invalidate_tables('projects')
                     st.rerun()
 
 def page_manage_clients():
@@ -835,6 +964,7 @@ def page_manage_clients():
                         conn.execute('INSERT INTO clients (id, name, email, phone, created_at) VALUES (?, ?, ?, ?, ?)', 
                                    (str(uuid.uuid4())[:8].upper(), sanitize_input(name), sanitize_input(email), sanitize_input(phone), created_at))
                         conn.commit()
+                    invalidate_tables('clients')
                     st.success(f"Client '{name}' added successfully.")
                     st.rerun()
 
@@ -866,6 +996,7 @@ def page_manage_clients():
                             conn.execute('UPDATE clients SET name=?, email=?, phone=? WHERE id=?', 
                                        (sanitize_input(name), sanitize_input(email), sanitize_input(phone), selected_client_id))
                             conn.commit()
+                        invalidate_tables('clients')
                         st.rerun()
 
             with st.form(key=f"delete_client_{selected_client_id}"):
@@ -874,10 +1005,15 @@ def page_manage_clients():
                 if st.checkbox("Confirm permanent deletion."):
                     if st.form_submit_button("Delete Permanently"):
                         with get_db_connection() as conn:
-                            conn.execute('DELETE FROM invoices WHERE client_id=?', (selected_client_id,))
+                            invoice_ids = [row['id'] for row in conn.execute(
+                                'SELECT id FROM invoices WHERE client_id=?', (selected_client_id,)).fetchall()]
+                            with tracked_invoices(conn, "client_id = ?", (selected_client_id,)):
+                                conn.execute('DELETE FROM invoices WHERE client_id=?', (selected_client_id,))
                             conn.execute('DELETE FROM projects WHERE client_id=?', (selected_client_id,))
                             conn.execute('DELETE FROM clients WHERE id=?', (selected_client_id,))
                             conn.commit()
+                        invalidate_tables('invoices', 'payments', 'projects', 'clients')
+                        invalidate_invoice_pdfs(invoice_ids)
                         st.rerun()
 
 def page_manage_expenses():
@@ -895,9 +1031,12 @@ def page_manage_expenses():
             if amount > 0 and description:
                 with get_db_connection() as conn:
                     created_at = datetime.datetime.now().isoformat()
-                    conn.execute("INSERT INTO expenses (id, date, category, description, amount, created_at) VALUES (?, ?, ?, ?, ?, ?)", 
-                               (str(uuid.uuid4())[:8], date.strftime('%Y-%m-%d'), category, sanitize_input(description), amount, created_at))
+                    expense_id = str(uuid.uuid4())[:8]
+                    with tracked_expenses(conn, "id = ?", (expense_id,)):
+                        conn.execute("INSERT INTO expenses (id, date, category, description, amount, created_at) VALUES (?, ?, ?, ?, ?, ?)", 
+                                   (expense_id, date.strftime('%Y-%m-%d'), category, sanitize_input(description), amount, created_at))
                     conn.commit()
+                invalidate_tables('expenses')
                 st.rerun()
             else: st.error("Amount and description required.")
     st.subheader("Recorded Expenses")
@@ -911,7 +1050,7 @@ def page_reports():
     """Page for generating and downloading reports."""
     st.header("📄 Reports")
     with st.spinner('Generating reports...'):
-        tab1, tab2, tab3, tab4 = st.tabs(["Financial Reports", "Project Reports", "Client Reports", "Backup & Export"])
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(["Financial Reports", "Project Reports", "Client Reports", "Backup & Export", "Batch PDFs"])
 
         with tab1:
             st.subheader("Generate Financial Reports")
@@ -942,14 +1081,11 @@ def page_reports():
         
         with tab2:
             st.subheader("Project Profitability")
-            projects = fetch_all_projects_with_client_info()
-            invoices = fetch_all_invoices_with_client_info()
-            if projects and invoices:
-                df_projects = pd.DataFrame(projects, columns=projects[0].keys()) if projects else pd.DataFrame()
-                df_invoices = pd.DataFrame(invoices, columns=invoices[0].keys()) if invoices else pd.DataFrame()
-                project_revenue = df_invoices[df_invoices['status']=='paid'].groupby('project_id')['total'].sum().reset_index().rename(columns={'total': 'revenue'})
-                if not project_revenue.empty:
-                    merged = pd.merge(df_projects, project_revenue, left_on='id', right_on='project_id', how='left').fillna(0)
+            projects = fetch_project_revenue()
+            if projects:
+                df_projects = pd.DataFrame(projects, columns=projects[0].keys())
+                if df_projects['paid_invoices'].sum() > 0:
+                    merged = df_projects.fillna(0)
                     merged['profit'] = merged['revenue'] - merged['budget']
                     merged = merged[merged['status'] == 'Completed']
                     fig = px.bar(merged, x='name', y=['revenue', 'budget'], barmode='group', labels={'value': 'Amount (USD)', 'name': 'Project'}, title="Project Revenue vs. Budget")
@@ -960,10 +1096,9 @@ def page_reports():
 
         with tab3:
             st.subheader("Client Lifetime Value (LTV)")
-            invoices = fetch_all_invoices_with_client_info()
-            if invoices:
-                df_invoices = pd.DataFrame(invoices, columns=invoices[0].keys()) if invoices else pd.DataFrame()
-                client_ltv = df_invoices[df_invoices['status'] == 'paid'].groupby('name')['total'].sum().reset_index().rename(columns={'total': 'Lifetime Value'}).sort_values('Lifetime Value', ascending=False)
+            lifetime_values = fetch_client_lifetime_values()
+            if lifetime_values:
+                client_ltv = pd.DataFrame(lifetime_values, columns=['name', 'lifetime_value']).rename(columns={'lifetime_value': 'Lifetime Value'})
                 st.dataframe(client_ltv, hide_index=True)
                 fig = px.bar(client_ltv, x='name', y='Lifetime Value', title="Total Revenue by Client")
                 st.plotly_chart(fig, use_container_width=True)
@@ -986,6 +1121,47 @@ def page_reports():
                     # Clean up
                     os.remove(backup_file)
 
+        with tab5:
+            st.subheader("Batch Invoice PDFs")
+            if not USE_ENHANCED_FEATURES:
+                st.info("Batch rendering requires the enhanced modules. Install dependencies to enable.")
+            else:
+                st.info("Render every matching invoice to PDF in parallel and download them as one ZIP archive.")
+                cpu_count = os.cpu_count() or 1
+                with st.form("batch_pdf_form"):
+                    col1, col2 = st.columns(2)
+                    batch_status = col1.selectbox("Status", ["All", "Paid", "Unpaid", "Partially Paid"])
+                    batch_workers = int(col1.number_input("Worker Processes", min_value=1, max_value=cpu_count, value=cpu_count, step=1))
+                    batch_start = col2.date_input("Created From", datetime.date.today() - datetime.timedelta(days=30))
+                    batch_end = col2.date_input("Created To", datetime.date.today())
+                    render_clicked = st.form_submit_button("Render PDFs", type="primary")
+
+                if render_clicked:
+                    filters = {'start_date': batch_start.isoformat(), 'end_date': batch_end.isoformat()}
+                    if batch_status != "All":
+                        filters['status'] = batch_status.lower().replace(' ', '_')
+                    progress_bar = st.progress(0.0, text="Fetching invoices...")
+                    def show_progress(done, total):
+                        progress_bar.progress(done / total, text=f"Rendered {done} of {total} invoices")
+                    archive = io.BytesIO()
+                    with get_db_connection() as conn:
+                        result = BatchPdfRenderer.export(conn, archive, filters=filters, logo_path=LOGO_PATH,
+                                                         workers=batch_workers, progress=show_progress)
+                    progress_bar.empty()
+                    st.session_state.batch_pdf_result = result
+                    st.session_state.batch_pdf_archive = archive.getvalue() if result['total'] else None
+
+                result = st.session_state.get('batch_pdf_result')
+                if result:
+                    if not result['total']:
+                        st.warning("No invoices match these filters.")
+                    else:
+                        st.success(f"Rendered {result['rendered_count']} of {result['total']} invoices in {result['elapsed']:.1f}s.")
+                        if result['errors']:
+                            st.error(f"{result['error_count']} invoice(s) failed (listed in errors.json inside the archive).")
+                            st.dataframe(pd.DataFrame(result['errors']), hide_index=True)
+                        st.download_button("📦 Download ZIP", st.session_state.batch_pdf_archive, "invoices.zip", "application/zip")
+
 def page_settings():
     """Page for updating company and payment information."""
     st.header("⚙️ Application Settings")
@@ -1016,6 +1192,7 @@ def page_settings():
                     for key, value in updated_settings.items():
                         conn.execute("UPDATE settings SET value=? WHERE key=?", (value, key))
                     conn.commit()
+                invalidate_tables('settings')
                 st.success("Settings saved!")
                 st.rerun()
     
@@ -1048,8 +1225,26 @@ def page_settings():
                     for key, value in updated_settings.items():
                         conn.execute("UPDATE settings SET value=? WHERE key=?", (value, key))
                     conn.commit()
+                invalidate_tables('settings')
                 st.success("Email settings saved!")
                 st.rerun()
+        
+        if USE_ENHANCED_FEATURES:
+            st.subheader("Email Outbox")
+            with get_db_connection() as conn:
+                failed = get_outbox_messages(conn, status='failed')
+                recent = get_outbox_messages(conn, limit=20)
+            if recent:
+                st.dataframe(pd.DataFrame(recent)[['created_at', 'recipient', 'invoice_id', 'status', 'attempts', 'last_error']],
+                             use_container_width=True, hide_index=True)
+            else:
+                st.caption("No emails have been sent yet.")
+            mailer = get_mailer(settings, LOGO_PATH)
+            if failed and mailer and st.button(f"Retry {len(failed)} Failed Email(s)"):
+                with get_db_connection() as conn:
+                    mailer.requeue(conn, [message['id'] for message in failed])
+                    result = mailer.dispatch(conn, [message['id'] for message in failed])
+                st.info(f"Sent {result['sent_count']}, failed {result['failed_count']}.")
     
     with tab3:
         st.subheader("Tax Configuration")
@@ -1068,6 +1263,7 @@ def page_settings():
                         conn.execute("UPDATE settings SET value=? WHERE key=?", (str(tax_rate), "TAX_RATE"))
                         conn.execute("UPDATE settings SET value=? WHERE key=?", (tax_number, "TAX_NUMBER"))
                         conn.commit()
+                    invalidate_tables('settings')
                     st.success("Tax settings saved!")
                     st.rerun()
         else:
@@ -1093,6 +1289,17 @@ def page_settings():
                 else:
                     st.error(message)
             
+            with st.expander("PDF Cache"):
+                pdf_cache = get_pdf_cache()
+                stats = pdf_cache.stats()
+                c1, c2, c3 = st.columns(3)
+                c1.metric("Cached PDFs", stats['entries'])
+                c2.metric("Size", f"{stats['size_bytes'] / 1024 / 1024:.1f} / {stats['max_bytes'] / 1024 / 1024:.0f} MB")
+                c3.metric("Hit Rate", f"{stats['hit_rate']:.0%}", help=f"{stats['hits']} hits, {stats['misses']} misses since this app started")
+                if st.button("Clear PDF Cache"):
+                    pdf_cache.clear()
+                    st.rerun()
+            
             st.markdown("---")
             st.subheader("Database Configuration Guide")
             st.markdown("""
@@ -1227,9 +1434,7 @@ def display_shared_invoice(invoice_id, token):
                 st.markdown(f"- {service}: `${price:,.2f}`")
             st.markdown("---")
             st.header(f"Total: ${invoice['total']:,.2f}")
-            pdf_file = generate_invoice_pdf(invoice, settings)
-            with open(pdf_file, "rb") as file: 
-                st.download_button("📄 Download PDF", file, pdf_file)
+            st.download_button("📄 Download PDF", lambda: invoice_pdf(invoice, settings), invoice_pdf_filename(invoice), "application/pdf")
         else: 
             st.error("Invoice not found.")
     else:
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark the per-request cost of API key authentication (p50/p99)
+
+Sends requests through the Flask test client to a trivial endpoint, once
+without authentication and once per authentication mode, and reports the
+difference as the auth overhead:
+
+- per-request: one database checkout and api_keys lookup per request, as
+  require_api_key did before the cache
+- cached: ApiKeyCache (lookups served from memory, last_used batched)
+
+--latency-ms adds a simulated round trip to each database lookup to show the
+cost on PostgreSQL or MySQL.
+
+Usage:
+    python benchmarks/bench_api_auth.py [--requests 5000] [--latency-ms 0.5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import remove_database, use_fresh_database
+from flask import Flask, jsonify, request
+from src.api.auth import ApiKeyCache, hash_api_key
+from src.models import database
+
+
+def make_app(authenticate):
+    """App with one endpoint guarded by ``authenticate`` and one without"""
+    app = Flask(__name__)
+
+    def guarded(f):
+        @wraps(f)
+        def decorated():
+            if not authenticate(request.headers.get('X-API-Key')):
+                return jsonify({'error': 'Invalid API key'}), 401
+            return f()
+        return decorated
+
+    @app.route('/open')
+    def open_endpoint():
+        return jsonify({'success': True})
+
+    @app.route('/guarded')
+    @guarded
+    def guarded_endpoint():
+        return jsonify({'success': True})
+
+    return app
+
+
+def latency_connections(latency: float):
+    """Connection factory that adds a simulated round trip per checkout"""
+    @contextmanager
+    def connect():
+        if latency:
+            time.sleep(latency)
+        with database.get_db_connection() as conn:
+            yield conn
+    return connect
+
+
+def per_request_lookup(connect):
+    """The pre-cache pattern: one checkout and lookup per request"""
+    def authenticate(api_key):
+        with connect() as conn:
+            return conn.execute("SELECT * FROM api_keys WHERE key_hash = ? AND is_active = 1",
+                                (hash_api_key(api_key),)).fetchone()
+    return authenticate
+
+
+def timings(client, path, api_key, requests, warmup=200):
+    """Per-request wall time in microseconds, after a few untimed warm-up requests"""
+    headers = {'X-API-Key': api_key}
+    for _ in range(warmup):
+        client.get(path, headers=headers)
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        response = client.get(path, headers=headers)
+        samples.append((time.perf_counter() - start) * 1e6)
+        assert response.status_code == 200
+    return samples
+
+
+def percentile(samples, p):
+    """p-th percentile (0-100) of a list of samples"""
+    return statistics.quantiles(samples, n=100)[p - 1]
+
+
+def main():
+    """Time the endpoint with each authentication mode and print the overhead"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated round-trip time added to every database lookup")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("API Key Authentication Benchmark")
+    print("=" * 60)
+    print(f"{args.requests} requests per mode, {args.latency_ms}ms simulated latency\n")
+
+    path = use_fresh_database()
+    try:
+        connect = latency_connections(args.latency_ms / 1000)
+        cache = ApiKeyCache(connect, flush_interval=3600)
+        with database.get_db_connection() as conn:
+            api_key = cache.create(conn, 'Benchmark', 'admin')['api_key']
+            conn.commit()
+
+        modes = [('per-request', per_request_lookup(connect)), ('cached', cache.authenticate)]
+        baseline = timings(make_app(None).test_client(), '/open', api_key, args.requests)
+        base_p50, base_p99 = percentile(baseline, 50), percentile(baseline, 99)
+        print(f"{'mode':<14} {'p50':>10} {'p99':>10} {'overhead p50':>14} {'overhead p99':>14}")
+        print(f"{'no auth':<14} {base_p50:>8.0f}us {base_p99:>8.0f}us")
+        for name, authenticate in modes:
+            samples = timings(make_app(authenticate).test_client(), '/guarded', api_key, args.requests)
+            p50, p99 = percentile(samples, 50), percentile(samples, 99)
+            print(f"{name:<14} {p50:>8.0f}us {p99:>8.0f}us {p50 - base_p50:>12.0f}us {p99 - base_p99:>12.0f}us")
+        cache.stop()
+    finally:
+        remove_database(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
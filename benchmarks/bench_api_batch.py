@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark item throughput of the batch endpoints against one POST per item
+
+Creates the same clients, invoices and payments through the REST API with
+the Flask test client, first with one request per item (POST /clients,
+/invoices, /payments) and then through /batch/clients, /batch/invoices and
+/batch/payments, and reports items per second for each.
+
+Usage:
+    python benchmarks/bench_api_batch.py [--items 2000] [--batch-size 1000]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import remove_database, use_fresh_database
+from src.api import api
+from src.models import database
+
+
+def api_client():
+    """Test client and auth headers for the current database"""
+    api.api_key_cache.invalidate()
+    with database.get_db_connection() as conn:
+        api_key = api.api_key_cache.create(conn, 'Benchmark', 'admin')['api_key']
+        conn.commit()
+    return api.app.test_client(), {'X-API-Key': api_key}
+
+
+def post_each(client, headers, path, items):
+    """POST every item on its own; returns the created ids"""
+    ids = []
+    for item in items:
+        response = client.post(path, json=item, headers=headers)
+        assert response.status_code == 201, response.data
+        ids.append(response.get_json()['data']['id'])
+    return ids
+
+
+def post_batches(client, headers, path, items, batch_size):
+    """POST the items batch_size at a time; returns the created ids"""
+    ids = []
+    for start in range(0, len(items), batch_size):
+        response = client.post(path, json=items[start:start + batch_size], headers=headers)
+        body = response.get_json()
+        assert response.status_code == 200 and body['error_count'] == 0, body
+        ids.extend(result['id'] for result in body['results'])
+    return ids
+
+
+def run(items, send):
+    """Create clients, invoices and payments with ``send``; returns seconds per stage"""
+    client, headers = api_client()
+    timings = {}
+
+    start = time.perf_counter()
+    client_ids = send(client, headers, 'clients', [{'name': f"Client {i}"} for i in range(items)])
+    timings['clients'] = time.perf_counter() - start
+
+    invoices = [{'client_id': client_ids[i], 'services': ['Consulting'], 'amounts': [100.0],
+                 'total': 100.0, 'date': '2026-01-05'} for i in range(items)]
+    start = time.perf_counter()
+    invoice_ids = send(client, headers, 'invoices', invoices)
+    timings['invoices'] = time.perf_counter() - start
+
+    payments = [{'invoice_id': invoice_id, 'amount': 100.0, 'date': '2026-01-06', 'method': 'Cash'}
+                for invoice_id in invoice_ids]
+    start = time.perf_counter()
+    send(client, headers, 'payments', payments)
+    timings['payments'] = time.perf_counter() - start
+
+    with database.get_db_connection() as conn:
+        paid = conn.execute("SELECT COUNT(*) FROM invoices WHERE status = 'paid'").fetchone()[0]
+    assert paid == items, paid
+    return timings
+
+
+def main():
+    """Time both modes on fresh databases and print items per second"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=1000, help="items per batch request")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("API Batch Endpoint Benchmark")
+    print("=" * 60)
+    print(f"{args.items} clients, invoices and payments; {args.batch_size} items per batch request\n")
+
+    modes = [
+        ('per item', lambda client, headers, kind, items:
+            post_each(client, headers, f'/api/v1/{kind}', items)),
+        ('batch', lambda client, headers, kind, items:
+            post_batches(client, headers, f'/api/v1/batch/{kind}', items, args.batch_size)),
+    ]
+    results = {}
+    for name, send in modes:
+        path = use_fresh_database()
+        try:
+            results[name] = run(args.items, send)
+            api.api_key_cache.flush()  # pending last_used writes belong to this database
+        finally:
+            remove_database(path)
+    api.api_key_cache.stop()
+
+    print(f"{'stage':<10} {'per item':>14} {'batch':>14} {'speedup':>9}")
+    for stage in ('clients', 'invoices', 'payments'):
+        single, batch = results['per item'][stage], results['batch'][stage]
+        print(f"{stage:<10} {args.items / single:>10.0f}/sec {args.items / batch:>10.0f}/sec {single / batch:>8.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark bulk invoice creation throughput in rows/sec
+
+Compares BulkInvoiceOperations.bulk_create_invoices (validate up front, then
+chunked executemany) with the previous row-at-a-time insert loop.
+
+Usage:
+    python benchmarks/bench_bulk_create.py [--rows 20000] [--chunk-size 1000] [--profile default]
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.db_schema import init_enhanced_schema
+from src.business.bulk_operations import BulkInvoiceOperations, _INSERT_INVOICE_SQL
+
+
+def make_rows(count: int, clients: int):
+    """Build import rows spread over the seeded clients"""
+    return [
+        {
+            'client_id': f"C{i % clients}",
+            'services': ['Consulting', 'Hosting'],
+            'amounts': [100.0 + i % 50, 20.0],
+            'tax_rate': 15,
+            'due_date': '2026-02-01',
+            'notes': 'Nightly import'
+        }
+        for i in range(count)
+    ]
+
+
+def row_at_a_time(conn, invoice_data_list):
+    """The previous implementation: one uuid4(), now() and INSERT per row"""
+    for invoice_data in invoice_data_list:
+        subtotal = sum(invoice_data['amounts'])
+        tax_rate = invoice_data.get('tax_rate', 0)
+        tax_amount = subtotal * (tax_rate / 100)
+        created_at = datetime.datetime.now().isoformat()
+        conn.execute(_INSERT_INVOICE_SQL, (
+            str(uuid.uuid4())[:8], invoice_data['client_id'], str(invoice_data['services']),
+            str(invoice_data['amounts']), subtotal + tax_amount,
+            created_at, created_at[:10], None, 'USD', tax_rate, tax_amount,
+            invoice_data.get('due_date'), invoice_data.get('notes', '')
+        ))
+    conn.commit()
+
+
+def run(name: str, insert, rows: int, clients: int, profile: str) -> float:
+    """Time one implementation against a fresh database and return rows/sec"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    database.close_all_connections()
+    database.db_config.db_name = path
+    database.db_config.sqlite_profile = profile
+    init_enhanced_schema()
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO clients (id, name, created_at) VALUES (?, ?, '2026-01-01')",
+            [(f"C{i}", f"Client {i}") for i in range(clients)]
+        )
+        conn.commit()
+
+    data = make_rows(rows, clients)
+    with database.get_db_connection() as conn:
+        start = time.perf_counter()
+        insert(conn, data)
+        elapsed = time.perf_counter() - start
+
+    database.close_all_connections()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return rows / elapsed
+
+
+def main():
+    """Run both implementations and print rows/sec"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--profile", default="default", choices=sorted(database.SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Bulk Invoice Creation Benchmark")
+    print("=" * 60)
+    print(f"{args.rows} invoices, {args.clients} clients, chunk size {args.chunk_size}, "
+          f"profile {args.profile}\n")
+
+    def batched(conn, data):
+        BulkInvoiceOperations.bulk_create_invoices(conn, data, chunk_size=args.chunk_size)
+
+    print(f"{'implementation':<16} {'rows/s':>12}")
+    for name, insert in (("row-at-a-time", row_at_a_time), ("batched", batched)):
+        rate = run(name, insert, args.rows, args.clients, args.profile)
+        print(f"{name:<16} {rate:>12.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
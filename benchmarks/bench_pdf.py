@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark invoice PDF rendering throughput in PDFs/sec
+
+Compares the shared InvoicePdfRenderer (styles and decoded logo built once)
+with building a fresh stylesheet and decoding the logo for every document,
+as generate_invoice_pdf used to. A 600x600 PNG logo is generated unless
+--logo points at a real one.
+
+Usage:
+    python benchmarks/bench_pdf.py [--invoices 500] [--services 8] [--logo logo.png]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils import pdf_renderer
+from src.utils.pdf_renderer import InvoicePdfRenderer, get_invoice_renderer
+
+SETTINGS = {
+    'COMPANY_NAME': 'Benchmark Ltd',
+    'COMPANY_ADDRESS': '1 Main Street, Harare',
+    'COMPANY_PHONE': '+263 77 000 0000',
+    'COMPANY_EMAIL': 'billing@example.com',
+    'COMPANY_TIN': 'TIN 123456',
+    'BANK_DETAILS': '<b>Payment Details:</b><br/>Bank: Example Bank<br/>Account: 0000000',
+}
+
+
+def make_invoices(count: int, services: int):
+    """Invoices with a few service lines each, alternating paid and unpaid"""
+    return [
+        {
+            'id': f"INV-{i}", 'date': '01 January 2026', 'status': 'paid' if i % 2 else 'unpaid',
+            'services': str([(f"Service {n}", 100.0 + n) for n in range(services)]),
+            'total': sum(100.0 + n for n in range(services)),
+            'name': f"Client {i}", 'email': f"client{i}@example.com", 'phone': '+263 77 111 1111',
+        }
+        for i in range(count)
+    ]
+
+
+def make_logo(path: str):
+    """Write a synthetic PNG logo"""
+    from PIL import Image
+    Image.new('RGBA', (600, 600), (0, 87, 160, 255)).save(path)
+
+
+def per_call_setup(invoices, logo_path):
+    """Stylesheet and logo rebuilt for every document"""
+    for invoice in invoices:
+        pdf_renderer.invoice_styles.cache_clear()
+        InvoicePdfRenderer(SETTINGS, logo_path).render(invoice)
+
+
+def shared_renderer(invoices, logo_path):
+    """One renderer for every document"""
+    for invoice in invoices:
+        get_invoice_renderer(SETTINGS, logo_path).render(invoice)
+
+
+def main():
+    """Render the invoices both ways and print PDFs/sec"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--invoices", type=int, default=500)
+    parser.add_argument("--services", type=int, default=8)
+    parser.add_argument("--logo", help="logo image to embed (default: generated PNG)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Invoice PDF Rendering Benchmark")
+    print("=" * 60)
+    print(f"{args.invoices} invoices, {args.services} service lines each\n")
+
+    invoices = make_invoices(args.invoices, args.services)
+    with tempfile.TemporaryDirectory() as tmp:
+        logo_path = args.logo
+        if not logo_path:
+            logo_path = os.path.join(tmp, "logo.png")
+            make_logo(logo_path)
+
+        results = []
+        for name, func in (("per-call setup", per_call_setup), ("shared renderer", shared_renderer)):
+            start = time.perf_counter()
+            func(invoices, logo_path)
+            elapsed = time.perf_counter() - start
+            results.append(elapsed)
+            print(f"{name:<18} {elapsed:>8.3f}s {args.invoices / elapsed:>10.1f} PDFs/sec")
+
+    print(f"\nSpeedup: {results[0] / results[1]:.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark the advanced reports against the per-row (N+1) queries they replaced
+
+Seeds 1k clients, 200 projects and 100k invoices (see fixtures.py), then
+times client_performance_metrics, project_profitability_analysis and
+invoice_aging_report against the old one-SUM-query-per-row access pattern.
+
+SQLite runs in-process, so a query costs no round trip; --latency-ms adds a
+simulated client/server round trip per statement to show what the per-row
+pattern costs on PostgreSQL or MySQL.
+
+Usage:
+    python benchmarks/bench_reports.py [--clients 1000] [--projects 200] [--invoices 100000] [--latency-ms 0.5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fixtures import remove_database, seed_business_data, use_fresh_database
+from src.models import database
+from src.business.advanced_reporting import AdvancedReporting
+
+
+def legacy_client_performance(conn):
+    """One payments SUM per client, as before"""
+    clients = conn.execute(
+        """SELECT c.id, COUNT(i.id) as invoice_count, SUM(i.total) as total_revenue
+           FROM clients c LEFT JOIN invoices i ON c.id = i.client_id
+           GROUP BY c.id"""
+    ).fetchall()
+    for client in clients:
+        if client['invoice_count']:
+            conn.execute(
+                """SELECT SUM(p.amount) as total_paid FROM payments p
+                   JOIN invoices i ON p.invoice_id = i.id WHERE i.client_id = ?""",
+                (client['id'],)
+            ).fetchone()
+
+
+def legacy_project_profitability(conn):
+    """One invoices SUM and one expenses SUM per project, as before"""
+    for project in conn.execute("SELECT id FROM projects").fetchall():
+        conn.execute("SELECT SUM(total), COUNT(*) FROM invoices WHERE project_id = ?",
+                     (project['id'],)).fetchone()
+        conn.execute("SELECT SUM(amount) FROM expenses WHERE project_id = ?",
+                     (project['id'],)).fetchone()
+
+
+def legacy_invoice_aging(conn):
+    """One payments SUM per open invoice, as before"""
+    invoices = conn.execute(
+        """SELECT i.id FROM invoices i JOIN clients c ON i.client_id = c.id
+           WHERE i.status IN ('unpaid', 'partially_paid')"""
+    ).fetchall()
+    for invoice in invoices:
+        conn.execute("SELECT SUM(amount) as paid FROM payments WHERE invoice_id = ?",
+                     (invoice['id'],)).fetchone()
+
+
+REPORTS = [
+    ('client_performance_metrics', legacy_client_performance, AdvancedReporting.client_performance_metrics),
+    ('project_profitability_analysis', legacy_project_profitability, AdvancedReporting.project_profitability_analysis),
+    ('invoice_aging_report', legacy_invoice_aging, AdvancedReporting.invoice_aging_report),
+]
+
+
+class CountingConnection:
+    """Connection proxy that counts statements and adds a simulated round trip to each"""
+
+    def __init__(self, conn, latency: float):
+        self._conn = conn
+        self._latency = latency
+        self.statements = 0
+
+    def execute(self, query, params=()):
+        self.statements += 1
+        if self._latency:
+            time.sleep(self._latency)
+        return self._conn.execute(query, params)
+
+
+def timed(func, conn, latency: float):
+    """Run a report once and return (elapsed seconds, statements issued)"""
+    counting = CountingConnection(conn, latency)
+    start = time.perf_counter()
+    func(counting)
+    return time.perf_counter() - start, counting.statements
+
+
+def main():
+    """Seed the fixture and print old vs new timings per report"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--latency-ms", type=float, default=0.0,
+                        help="simulated round-trip time added to every statement")
+    args = parser.parse_args()
+
+    print("=" * 72)
+    print("Advanced Reporting Benchmark")
+    print("=" * 72)
+    print(f"{args.clients} clients, {args.projects} projects, {args.invoices} invoices, "
+          f"{args.latency_ms}ms simulated latency\n")
+
+    path = use_fresh_database()
+    try:
+        with database.get_db_connection() as conn:
+            seed_business_data(conn, args.clients, args.projects, args.invoices)
+
+            latency = args.latency_ms / 1000
+            print(f"{'report':<32} {'per-row':>18} {'set-based':>18} {'speedup':>8}")
+            for name, legacy, report in REPORTS:
+                old, old_statements = timed(legacy, conn, latency)
+                new, new_statements = timed(report, conn, latency)
+                print(f"{name:<32} {old:>7.3f}s {old_statements:>6} q "
+                      f"{new:>7.3f}s {new_statements:>6} q {old / new:>7.1f}x")
+    finally:
+        remove_database(path)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
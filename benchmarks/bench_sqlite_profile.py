@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark mixed read/write throughput for each SQLite performance profile
+
+Simulates the API, the Streamlit app and the scheduler sharing one database
+file: several reader threads run dashboard-style aggregates while writer
+threads insert invoices and payments.
+
+Usage:
+    python benchmarks/bench_sqlite_profile.py [--seconds 5] [--readers 6] [--writers 2]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.db_schema import init_enhanced_schema
+
+
+def seed(rows: int):
+    """Create the schema and some invoices to read back"""
+    init_enhanced_schema()
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, created_at) VALUES ('C1', 'Bench Client', '2026-01-01')")
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, total, date, status, created_at) VALUES (?, 'C1', ?, '2026-01-01', ?, '2026-01-01')",
+            [(f"INV-{i}", 100.0 + i, 'paid' if i % 2 else 'unpaid') for i in range(rows)]
+        )
+        conn.commit()
+
+
+def run_profile(profile: str, seconds: float, readers: int, writers: int, rows: int):
+    """Run the mixed workload against a fresh database using the given profile"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    database.close_all_connections()
+    database.db_config.db_name = path
+    database.db_config.sqlite_profile = profile
+    seed(rows)
+
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def reader():
+        while time.monotonic() < stop:
+            try:
+                with database.get_db_connection() as conn:
+                    conn.execute("SELECT status, SUM(total), COUNT(*) FROM invoices GROUP BY status").fetchall()
+                with lock:
+                    counts['reads'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['locked'] += 1
+
+    def writer():
+        while time.monotonic() < stop:
+            try:
+                with database.get_db_connection() as conn:
+                    invoice_id = str(uuid.uuid4())[:8]
+                    conn.execute(
+                        "INSERT INTO invoices (id, client_id, total, date, status, created_at) VALUES (?, 'C1', 50.0, '2026-01-02', 'unpaid', '2026-01-02')",
+                        (invoice_id,)
+                    )
+                    conn.execute(
+                        "INSERT INTO payments (id, invoice_id, amount, date, method, created_at) VALUES (?, ?, 25.0, '2026-01-02', 'Cash', '2026-01-02')",
+                        (str(uuid.uuid4())[:8], invoice_id)
+                    )
+                    conn.commit()
+                with lock:
+                    counts['writes'] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counts['locked'] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    database.close_all_connections()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return counts
+
+
+def main():
+    """Run the benchmark for every profile and print a comparison"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--readers", type=int, default=6)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--rows", type=int, default=20000)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("SQLite Profile Benchmark (mixed read/write)")
+    print("=" * 60)
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds}s, {args.rows} seeded invoices\n")
+    print(f"{'profile':<12} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+
+    for profile in database.SQLITE_PROFILES:
+        counts = run_profile(profile, args.seconds, args.readers, args.writers, args.rows)
+        print(f"{profile:<12} {counts['reads'] / args.seconds:>10.1f} "
+              f"{counts['writes'] / args.seconds:>10.1f} {counts['locked']:>8}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Shared data fixtures for the benchmark scripts
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.db_schema import init_enhanced_schema
+
+STATUSES = ('paid', 'unpaid', 'partially_paid')
+
+
+def use_fresh_database(profile: str = "default") -> str:
+    """Point the database layer at a new temporary SQLite file with the full schema"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    database.close_all_connections()
+    database.db_config.db_name = path
+    database.db_config.sqlite_profile = profile
+    init_enhanced_schema()
+    return path
+
+
+def remove_database(path: str):
+    """Close pooled connections and delete a benchmark database"""
+    database.close_all_connections()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def seed_business_data(conn, clients: int = 1000, projects: int = 200,
+                       invoices: int = 100000, seed: int = 42):
+    """
+    Fill the database with a reproducible book of business
+
+    Invoices are spread over the last two years; paid invoices have one
+    payment for the full amount, partially paid ones a payment for half,
+    and every project gets a handful of expenses.
+    """
+    rng = random.Random(seed)
+    now = datetime.datetime.now()
+
+    conn.executemany(
+        "INSERT INTO clients (id, name, email, phone, created_at) VALUES (?, ?, ?, '', ?)",
+        [(f"C{i}", f"Client {i}", f"client{i}@example.com", (now - datetime.timedelta(days=900)).isoformat())
+         for i in range(clients)]
+    )
+    conn.executemany(
+        "INSERT INTO projects (id, client_id, name, budget, status, created_at) VALUES (?, ?, ?, ?, 'active', ?)",
+        [(f"P{i}", f"C{i % clients}", f"Project {i}", rng.choice([0, 5000, 20000]), now.isoformat())
+         for i in range(projects)]
+    )
+
+    invoice_rows = []
+    payment_rows = []
+    for i in range(invoices):
+        created = now - datetime.timedelta(days=rng.randint(0, 730), seconds=rng.randint(0, 86399))
+        total = round(rng.uniform(50, 5000), 2)
+        status = rng.choice(STATUSES)
+        project_id = f"P{rng.randrange(projects)}" if projects and rng.random() < 0.3 else None
+        due_date = (created + datetime.timedelta(days=30)).isoformat()
+        invoice_rows.append((
+            f"INV-{i}", f"C{rng.randrange(clients)}", project_id, total,
+            created.strftime('%d %B %Y'), created.date().isoformat(), status, created.isoformat(), due_date
+        ))
+        if status != 'unpaid':
+            amount = total if status == 'paid' else round(total / 2, 2)
+            payment_rows.append((f"PAY-{i}", f"INV-{i}", amount, created.date().isoformat(),
+                                 'Bank Transfer', created.isoformat()))
+
+    conn.executemany(
+        """INSERT INTO invoices (id, client_id, project_id, services, total, date, date_iso, status, created_at, due_date)
+           VALUES (?, ?, ?, '[]', ?, ?, ?, ?, ?, ?)""",
+        invoice_rows
+    )
+    conn.executemany(
+        "INSERT INTO payments (id, invoice_id, amount, date, method, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+        payment_rows
+    )
+    conn.executemany(
+        "INSERT INTO expenses (id, date, category, description, amount, created_at, project_id) VALUES (?, ?, ?, '', ?, ?, ?)",
+        [(f"EXP-{i}", (now - datetime.timedelta(days=rng.randint(0, 730))).date().isoformat(),
+          rng.choice(['Software', 'Travel', 'Office']), round(rng.uniform(10, 500), 2), now.isoformat(),
+          f"P{i % projects}" if projects else None)
+         for i in range(projects * 10)]
+    )
+    conn.commit()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Rebuild the monthly_rollups table from invoices and expenses
+
+Run this if dashboard totals drift from the raw data, e.g. after editing the
+database by hand or restoring a backup.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.models.database import get_db_connection
+from src.models.db_schema import init_enhanced_schema
+from src.models.rollups import rebuild_monthly_rollups
+
+if __name__ == '__main__':
+    init_enhanced_schema()
+    with get_db_connection() as conn:
+        months = rebuild_monthly_rollups(conn)
+    print(f"Rebuilt monthly rollups: {months} month/currency rows")
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Check invoices.amount_paid against the payments table and repair drift
+
+Run this on a schedule (e.g. nightly from cron), and after restoring a
+backup or editing payments by hand. Pass --check to report drifted
+invoices without changing them; the exit status is 1 if any were found.
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.models.database import get_db_connection
+from src.models.db_schema import init_enhanced_schema
+from src.models.payments import reconcile_amount_paid
+
+if __name__ == '__main__':
+    check_only = '--check' in sys.argv[1:]
+    init_enhanced_schema()
+    with get_db_connection() as conn:
+        drifted = reconcile_amount_paid(conn, fix=not check_only)
+    for row in drifted:
+        print(f"{row['id']}: amount_paid {row['amount_paid']} != payments {row['payments_total']}")
+    print(f"{len(drifted)} invoice(s) out of step" + ("" if check_only or not drifted else ", repaired"))
+    sys.exit(1 if check_only and drifted else 0)
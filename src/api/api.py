@@ -6,23 +6,63 @@ from flask import Flask, request, jsonify, send_file
 from functools import wraps
 import jwt
 import datetime
+import hashlib
+import json
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence
 import io
+import tempfile
 
 # Import database and business logic
 try:
-    from src.models.database import get_db_connection
+    from src.models.database import get_db_connection, get_db_type, get_pool_stats, iter_rows
+    from src.models.dialect import nulls_as_empty
+    from src.models.rollups import invoice_date_iso, summarize_rollups, track_invoices
+    from src.models.versions import table_versions
+    from src.models import payments
     from src.business.business_logic import TaxCalculator, CurrencyConverter
+    from src.business.bulk_operations import BulkClientOperations, BulkInvoiceOperations, BulkPaymentOperations
+    from src.business.pdf_batch import BatchPdfRenderer
+    from src.utils.pdf_cache import cached_invoice_pdf, get_pdf_cache, invalidate_invoice_pdfs
+    from src.utils.pdf_renderer import invoice_content_key
 except ImportError:
     print("Warning: Database or business_logic modules not available")
+from src.api.auth import ApiKeyCache
+from src.api.pagination import (NDJSON_MIMETYPE, decode_cursor, keyset_condition, parse_date,
+                                parse_fields, parse_limit, stream_rows, wants_ndjson)
 
 # Flask app initialization
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('API_SECRET_KEY', 'change-this-in-production')
+LOGO_PATH = os.getenv('LOGO_PATH', 'logo.png')
+PDF_BATCH_MAX_IDS = int(os.getenv('PDF_BATCH_MAX_IDS', '10000'))
+PDF_BATCH_WORKERS = int(os.getenv('PDF_BATCH_WORKERS', '0')) or None  # 0 = one per CPU
+API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', '100'))
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', '1000'))  # NDJSON streams are not capped
+API_BATCH_MAX_ITEMS = int(os.getenv('API_BATCH_MAX_ITEMS', '10000'))
+API_BATCH_MAX_BYTES = int(os.getenv('API_BATCH_MAX_MB', '16')) * 1024 * 1024
+API_BATCH_TRANSACTION_SIZE = int(os.getenv('API_BATCH_TRANSACTION_SIZE', '1000'))  # items committed together
+
+# Columns the list endpoints accept in ?fields=, with the SQL that selects them
+CLIENT_FIELDS = {f: f for f in ('id', 'name', 'email', 'phone', 'created_at', 'row_version')}
+INVOICE_FIELDS = dict(
+    {f: f"i.{f}" for f in ('id', 'client_id', 'project_id', 'services', 'amounts', 'total', 'currency',
+                           'tax_rate', 'tax_amount', 'date', 'date_iso', 'due_date', 'status', 'notes',
+                           'amount_paid', 'created_at', 'row_version')},
+    client_name='c.name AS client_name',
+    client_email='c.email AS client_email'
+)
 
 # ---------- AUTHENTICATION ----------
 
+# Revoked keys stop working in every process within API_KEY_CACHE_TTL seconds
+api_key_cache = ApiKeyCache(
+    lambda: get_db_connection(),  # resolved per call, so a failed import above only fails requests
+    ttl=float(os.getenv('API_KEY_CACHE_TTL', '30')),
+    negative_ttl=float(os.getenv('API_KEY_NEGATIVE_CACHE_TTL', '5')),
+    flush_interval=float(os.getenv('API_KEY_LAST_USED_FLUSH_INTERVAL', '10'))
+)
+
 def require_api_key(f):
     """Decorator to require API key authentication"""
     @wraps(f)
@@ -32,39 +72,110 @@ def require_api_key(f):
         if not token:
             return jsonify({'error': 'API key is missing'}), 401
         
-        # Verify API key against database
+        # Verify API key (cached; the database is only checked when the entry expires)
         try:
-            with get_db_connection() as conn:
-                api_key = conn.execute(
-                    "SELECT * FROM api_keys WHERE key = ? AND is_active = 1",
-                    (token,)
-                ).fetchone()
-                
-                if not api_key:
-                    return jsonify({'error': 'Invalid API key'}), 401
-                
-                # Store API key info for use in endpoint
-                request.api_key_info = dict(api_key)
+            api_key = api_key_cache.authenticate(token)
+            if not api_key:
+                return jsonify({'error': 'Invalid API key'}), 401
+            
+            # Store API key info for use in endpoint
+            request.api_key_info = api_key
         except Exception as e:
             return jsonify({'error': 'Authentication failed', 'details': str(e)}), 500
         
         return f(*args, **kwargs)
     return decorated
 
+# ---------- CONDITIONAL REQUESTS ----------
+
+def _etag(*parts) -> str:
+    """Strong ETag for this path's representation identified by ``parts`` (versions, options)"""
+    return hashlib.sha256(json.dumps([request.path, *parts], default=str).encode()).hexdigest()[:32]
+
+def _conditional(response, etag: str):
+    """Tag a response so clients revalidate it with If-None-Match"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def _not_modified(etag: str):
+    """304 response if the client already has ``etag``, otherwise None"""
+    if request.if_none_match.contains_weak(etag):
+        return _conditional(app.response_class(status=304), etag)
+    return None
+
+# ---------- LIST HELPERS ----------
+
+def _query_rows(query: str, params: List):
+    """Rows of a query, read through a cursor kept open while the response streams"""
+    with get_db_connection() as conn:
+        yield from iter_rows(conn, query, params)
+
+def _select_list(fields: Optional[List[str]], columns: Dict[str, str], sort: List[str], default: str) -> str:
+    """SELECT list for ?fields= (the sort columns are always read, for the cursor)"""
+    if not fields:
+        return default
+    sort_fields = [c.split('.')[-1] for c in sort]
+    return ", ".join(columns[f] for f in dict.fromkeys(fields + sort_fields))
+
+def _list_response(columns: str, source: str, where: List[str], params: List,
+                   sort: List[str], descending: bool, fields: Optional[List[str]], tables: List[str],
+                   nullable: Sequence[str] = ()):
+    """
+    Stream one page of a list endpoint, honouring ?limit=, ?after= and ?format=
+    
+    ``sort`` are the ORDER BY columns, ending with a unique one; their values
+    in the last row returned make the next page's cursor. Columns in
+    ``nullable`` are sorted and compared as nulls_as_empty(), so rows where
+    they are NULL come last and are still reached by the cursor. The ETag
+    comes from the versions of ``tables`` (every table the rows are read
+    from), so an unchanged page costs one counter lookup.
+    """
+    ndjson = wants_ndjson(request)
+    limit = parse_limit(request.args.get('limit'),
+                        None if ndjson else API_PAGE_SIZE, None if ndjson else API_MAX_PAGE_SIZE)
+    
+    where, params = list(where), list(params)
+    order = [nulls_as_empty(c) if c in nullable else c for c in sort]
+    after = request.args.get('after')
+    if after:
+        values = ['' if v is None and c in nullable else v
+                  for c, v in zip(sort, decode_cursor(after, len(sort)))]
+        condition, values = keyset_condition(order, values, descending)
+        where.append(condition)
+        params.extend(values)
+    
+    # Read before the rows, so the ETag is never newer than the data it tags
+    with get_db_connection() as conn:
+        etag = _etag(table_versions(conn, tables), sorted(request.args.items(multi=True)), ndjson)
+    not_modified = _not_modified(etag)
+    if not_modified:
+        return not_modified
+    
+    query = f"SELECT {columns} FROM {source}"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY " + ", ".join(f"{c} {'DESC' if descending else 'ASC'}" for c in order)
+    if limit is not None:
+        query += f" LIMIT {limit + 1}"  # one extra row tells whether there is a next page
+    
+    response = stream_rows(_query_rows(query, params), limit, [c.split('.')[-1] for c in sort], fields, ndjson)
+    return _conditional(response, etag)
+
 # ---------- CLIENT ENDPOINTS ----------
 
 @app.route('/api/v1/clients', methods=['GET'])
 @require_api_key
 def get_clients():
-    """Get all clients"""
+    """List clients by name, one page at a time"""
     try:
-        with get_db_connection() as conn:
-            clients = conn.execute("SELECT * FROM clients ORDER BY name ASC").fetchall()
-            return jsonify({
-                'success': True,
-                'data': [dict(client) for client in clients],
-                'count': len(clients)
-            })
+        fields = parse_fields(request.args.get('fields'), list(CLIENT_FIELDS))
+        sort = ['name', 'id']
+        return _list_response(_select_list(fields, CLIENT_FIELDS, sort, '*'), 'clients', [], [],
+                              sort, False, fields, ['clients'])
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -75,9 +186,12 @@ def get_client(client_id):
     try:
         with get_db_connection() as conn:
             client = conn.execute("SELECT * FROM clients WHERE id = ?", (client_id,)).fetchone()
-            if not client:
-                return jsonify({'success': False, 'error': 'Client not found'}), 404
-            return jsonify({'success': True, 'data': dict(client)})
+        if not client:
+            return jsonify({'success': False, 'error': 'Client not found'}), 404
+        
+        # created_at tells apart a client deleted and re-created under the same id
+        etag = _etag(client['row_version'], client['created_at'])
+        return _not_modified(etag) or _conditional(jsonify({'success': True, 'data': dict(client)}), etag)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -112,36 +226,31 @@ def create_client():
 @app.route('/api/v1/invoices', methods=['GET'])
 @require_api_key
 def get_invoices():
-    """Get all invoices with optional filters"""
+    """List invoices, newest first, one page at a time, with optional filters"""
     try:
-        status = request.args.get('status')
-        client_id = request.args.get('client_id')
-        
-        query = """
-            SELECT i.*, c.name as client_name, c.email as client_email 
-            FROM invoices i 
-            JOIN clients c ON i.client_id = c.id 
-            WHERE 1=1
-        """
-        params = []
-        
-        if status:
-            query += " AND i.status = ?"
-            params.append(status)
-        
-        if client_id:
-            query += " AND i.client_id = ?"
-            params.append(client_id)
-        
-        query += " ORDER BY i.date DESC"
-        
-        with get_db_connection() as conn:
-            invoices = conn.execute(query, tuple(params)).fetchall()
-            return jsonify({
-                'success': True,
-                'data': [dict(inv) for inv in invoices],
-                'count': len(invoices)
-            })
+        fields = parse_fields(request.args.get('fields'), list(INVOICE_FIELDS))
+        date_from = parse_date(request.args.get('date_from'), 'date_from')
+        date_to = parse_date(request.args.get('date_to'), 'date_to')
+        
+        # Date bounds use the sort expression too, so they narrow the same index range
+        sort_date = nulls_as_empty('i.date_iso')
+        where, params = [], []
+        for column, value in (('i.status = ?', request.args.get('status')),
+                              ('i.client_id = ?', request.args.get('client_id')),
+                              (f'{sort_date} >= ?', date_from),
+                              (f'{sort_date} <= ? AND i.date_iso IS NOT NULL', date_to)):
+            if value:
+                where.append(column)
+                params.append(value)
+        
+        sort = ['i.date_iso', 'i.id']
+        columns = _select_list(fields, INVOICE_FIELDS, sort,
+                               'i.*, c.name as client_name, c.email as client_email')
+        return _list_response(columns, 'invoices i JOIN clients c ON i.client_id = c.id',
+                              where, params, sort, True, fields, ['invoices', 'clients'],
+                              nullable=['i.date_iso'])
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -152,16 +261,19 @@ def get_invoice(invoice_id):
     try:
         with get_db_connection() as conn:
             invoice = conn.execute("""
-                SELECT i.*, c.name as client_name, c.email as client_email, c.phone as client_phone
+                SELECT i.*, c.name as client_name, c.email as client_email, c.phone as client_phone,
+                       c.row_version as client_row_version
                 FROM invoices i
                 JOIN clients c ON i.client_id = c.id
                 WHERE i.id = ?
             """, (invoice_id,)).fetchone()
-            
-            if not invoice:
-                return jsonify({'success': False, 'error': 'Invoice not found'}), 404
-            
-            return jsonify({'success': True, 'data': dict(invoice)})
+        
+        if not invoice:
+            return jsonify({'success': False, 'error': 'Invoice not found'}), 404
+        
+        invoice = dict(invoice)
+        etag = _etag(invoice['row_version'], invoice['created_at'], invoice.pop('client_row_version'))
+        return _not_modified(etag) or _conditional(jsonify({'success': True, 'data': invoice}), etag)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -181,13 +293,15 @@ def create_invoice():
         created_at = datetime.datetime.now().isoformat()
         
         with get_db_connection() as conn:
-            conn.execute(
-                """INSERT INTO invoices (id, client_id, project_id, services, total, date, status, created_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (invoice_id, data['client_id'], data.get('project_id'), 
-                 str(data['services']), data['total'], data['date'], 
-                 data.get('status', 'unpaid'), created_at)
-            )
+            with track_invoices(conn, "id = ?", (invoice_id,)):
+                conn.execute(
+                    """INSERT INTO invoices (id, client_id, project_id, services, total, date, date_iso, status, created_at) 
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (invoice_id, data['client_id'], data.get('project_id'), 
+                     str(data['services']), data['total'], data['date'], 
+                     invoice_date_iso(data['date'], created_at),
+                     data.get('status', 'unpaid'), created_at)
+                )
             conn.commit()
         
         return jsonify({'success': True, 'data': {'id': invoice_id}}), 201
@@ -213,12 +327,50 @@ def get_invoice_pdf(invoice_id):
             settings = conn.execute("SELECT key, value FROM settings").fetchall()
             settings_dict = {row['key']: row['value'] for row in settings}
         
-        # Generate PDF (using existing function)
-        from app import generate_invoice_pdf
-        pdf_file = generate_invoice_pdf(dict(invoice), settings_dict)
+        # The content key covers everything printed, and rendering is deterministic,
+        # so a client holding the current version is answered without rendering
+        etag = _etag(invoice_content_key(invoice, settings_dict, LOGO_PATH))
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
         
-        return send_file(pdf_file, mimetype='application/pdf', as_attachment=True,
-                        download_name=f'invoice_{invoice_id}.pdf')
+        # Served from the shared PDF cache; rendered in memory on a miss
+        pdf_bytes = cached_invoice_pdf(invoice, settings_dict, LOGO_PATH)
+        
+        response = send_file(io.BytesIO(pdf_bytes), mimetype='application/pdf', as_attachment=True,
+                             download_name=f'invoice_{invoice_id}.pdf')
+        return _conditional(response, etag)
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/v1/invoices/pdf/batch', methods=['POST'])
+@require_api_key
+def get_invoice_pdf_batch():
+    """Render many invoice PDFs in parallel and return them as a ZIP archive"""
+    try:
+        data = request.get_json(silent=True) or {}
+        invoice_ids = data.get('invoice_ids')
+        if invoice_ids is not None:
+            if not isinstance(invoice_ids, list):
+                return jsonify({'success': False, 'error': 'invoice_ids must be a list'}), 400
+        filters = {key: data[key] for key in ('status', 'client_id', 'start_date', 'end_date') if data.get(key)}
+        
+        # Spooled so small archives stay in memory and large ones go to a private temp file
+        archive = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+        with get_db_connection() as conn:
+            result = BatchPdfRenderer.export(
+                conn, archive, invoice_ids=invoice_ids, filters=filters, max_invoices=PDF_BATCH_MAX_IDS,
+                logo_path=LOGO_PATH, workers=PDF_BATCH_WORKERS
+            )
+        archive.seek(0)
+        
+        response = send_file(archive, mimetype='application/zip', as_attachment=True,
+                             download_name='invoices.zip')
+        response.headers['X-Rendered-Count'] = str(result['rendered_count'])
+        response.headers['X-Error-Count'] = str(result['error_count'])
+        return response
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -235,35 +387,124 @@ def record_payment():
         if not all(field in data for field in required_fields):
             return jsonify({'success': False, 'error': 'Missing required fields'}), 400
         
-        import uuid
-        payment_id = str(uuid.uuid4())[:8]
-        created_at = datetime.datetime.now().isoformat()
-        
         with get_db_connection() as conn:
-            # Record payment
-            conn.execute(
-                """INSERT INTO payments (id, invoice_id, amount, date, method, notes, created_at) 
-                   VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                (payment_id, data['invoice_id'], data['amount'], data['date'], 
-                 data['method'], data.get('notes', ''), created_at)
-            )
-            
-            # Update invoice status
-            invoice = conn.execute("SELECT total FROM invoices WHERE id = ?", 
-                                  (data['invoice_id'],)).fetchone()
-            total_paid = conn.execute("SELECT SUM(amount) FROM payments WHERE invoice_id = ?", 
-                                     (data['invoice_id'],)).fetchone()[0] or 0
-            
-            if total_paid >= invoice['total']:
-                conn.execute("UPDATE invoices SET status = 'paid' WHERE id = ?", 
-                           (data['invoice_id'],))
-            elif total_paid > 0:
-                conn.execute("UPDATE invoices SET status = 'partially_paid' WHERE id = ?", 
-                           (data['invoice_id'],))
-            
+            # amount_paid and the invoice status are updated by the same statement
+            payment_id = payments.record_payment(conn, data['invoice_id'], data['amount'], data['date'],
+                                                 data['method'], data.get('notes', ''))
             conn.commit()
+        invalidate_invoice_pdfs([data['invoice_id']])
         
         return jsonify({'success': True, 'data': {'id': payment_id}}), 201
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+# ---------- BATCH ENDPOINTS ----------
+
+class _BatchTooLarge(ValueError):
+    """Batch request over API_BATCH_MAX_BYTES or API_BATCH_MAX_ITEMS"""
+
+def _batch_items() -> List[Dict]:
+    """
+    Items of a batch request: a JSON array, {"items": [...]}, or NDJSON (one item per line)
+    
+    Raises:
+        _BatchTooLarge: If the body or the item count is over the limit
+        ValueError: If the body is not valid JSON/NDJSON or an item is not an object
+    """
+    if (request.content_length or 0) > API_BATCH_MAX_BYTES:
+        raise _BatchTooLarge(f"Request body is larger than {API_BATCH_MAX_BYTES} bytes")
+    body = request.stream.read(API_BATCH_MAX_BYTES + 1)
+    if len(body) > API_BATCH_MAX_BYTES:
+        raise _BatchTooLarge(f"Request body is larger than {API_BATCH_MAX_BYTES} bytes")
+    
+    if request.mimetype == NDJSON_MIMETYPE:
+        items = []
+        for number, line in enumerate(body.decode('utf-8').splitlines(), 1):
+            if line.strip():
+                try:
+                    items.append(json.loads(line))
+                except ValueError as e:
+                    raise ValueError(f"Invalid JSON on line {number}: {e}")
+    else:
+        items = json.loads(body or b'null')
+        if isinstance(items, dict):
+            items = items.get('items')
+        if not isinstance(items, list):
+            raise ValueError('Expected a JSON array of items or an object with an "items" array')
+    
+    if len(items) > API_BATCH_MAX_ITEMS:
+        raise _BatchTooLarge(f"At most {API_BATCH_MAX_ITEMS} items per request")
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"Item {index} is not an object")
+    return items
+
+def _run_batch(operation, created_key: str):
+    """
+    Apply a bulk operation to the items of a batch request
+    
+    Items are processed API_BATCH_TRANSACTION_SIZE at a time, each chunk in
+    its own transaction (so a large upload does not hold the write lock
+    throughout). Within a chunk the bulk operation rejects bad items one by
+    one; the response reports each item by its index in the request.
+    """
+    try:
+        items = _batch_items()
+    except _BatchTooLarge as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    results = []
+    with get_db_connection() as conn:
+        for start in range(0, len(items), API_BATCH_TRANSACTION_SIZE):
+            chunk = items[start:start + API_BATCH_TRANSACTION_SIZE]
+            try:
+                outcome = operation(conn, chunk)
+            except Exception as e:
+                conn.rollback()
+                results.extend({'index': start + i, 'status': 'error', 'error': str(e)} for i in range(len(chunk)))
+                continue
+            results.extend({'index': start + created['index'], 'status': 'created', 'id': created['id']}
+                           for created in outcome[created_key])
+            results.extend({'index': start + error['index'], 'status': 'error', 'error': error['error']}
+                           for error in outcome['errors'])
+    
+    results.sort(key=lambda result: result['index'])
+    created_count = sum(1 for result in results if result['status'] == 'created')
+    return jsonify({
+        'success': True,
+        'created_count': created_count,
+        'error_count': len(results) - created_count,
+        'results': results
+    })
+
+@app.route('/api/v1/batch/invoices', methods=['POST'])
+@require_api_key
+def batch_create_invoices():
+    """Create many invoices (bulk format: client_id, services, amounts, ...) in one request"""
+    try:
+        return _run_batch(BulkInvoiceOperations.bulk_create_invoices, 'created_invoices')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/v1/batch/payments', methods=['POST'])
+@require_api_key
+def batch_record_payments():
+    """Record many payments in one request, updating each paid invoice's status once"""
+    try:
+        return _run_batch(BulkPaymentOperations.bulk_record_payments, 'recorded_payments')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/api/v1/batch/clients', methods=['POST'])
+@require_api_key
+def batch_create_clients():
+    """Create many clients in one request"""
+    try:
+        return _run_batch(BulkClientOperations.bulk_import_clients, 'imported_clients')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -277,33 +518,22 @@ def get_summary():
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
         
-        with get_db_connection() as conn:
-            # Revenue
-            revenue_query = "SELECT SUM(total) as total FROM invoices WHERE status = 'paid'"
-            params = []
-            
-            if start_date and end_date:
-                revenue_query += " AND date BETWEEN ? AND ?"
-                params = [start_date, end_date]
-            
-            revenue = conn.execute(revenue_query, tuple(params)).fetchone()['total'] or 0
-            
-            # Expenses
-            expense_query = "SELECT SUM(amount) as total FROM expenses WHERE 1=1"
-            exp_params = []
-            
-            if start_date and end_date:
-                expense_query += " AND date BETWEEN ? AND ?"
-                exp_params = [start_date, end_date]
-            
-            expenses = conn.execute(expense_query, tuple(exp_params)).fetchone()['total'] or 0
-            
-            # Outstanding
-            outstanding = conn.execute(
-                "SELECT SUM(total) as total FROM invoices WHERE status = 'unpaid'"
-            ).fetchone()['total'] or 0
+        # The range only applies when both ends are given
+        if not (start_date and end_date):
+            start_date = end_date = None
         
-        return jsonify({
+        # Served from the monthly rollups; the range covers whole calendar months
+        with get_db_connection() as conn:
+            etag = _etag(table_versions(conn, ['monthly_rollups']), start_date, end_date)
+            not_modified = _not_modified(etag)
+            if not_modified:
+                return not_modified
+            summary = summarize_rollups(conn, start_date, end_date)
+        revenue = summary['revenue']
+        expenses = summary['expenses']
+        outstanding = summary['outstanding']
+        
+        return _conditional(jsonify({
             'success': True,
             'data': {
                 'revenue': revenue,
@@ -311,7 +541,7 @@ def get_summary():
                 'profit': revenue - expenses,
                 'outstanding': outstanding
             }
-        })
+        }), etag)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -323,7 +553,13 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'version': '2.0.0',
-        'timestamp': datetime.datetime.now().isoformat()
+        'timestamp': datetime.datetime.now().isoformat(),
+        'database': {
+            'type': get_db_type(),
+            'pool': get_pool_stats()
+        },
+        'pdf_cache': get_pdf_cache().stats(),
+        'api_key_cache': api_key_cache.stats()
     })
 
 @app.route('/api/v1/tax/calculate', methods=['POST'])
@@ -395,32 +631,46 @@ def create_api_key():
             if not user or not verify_password(user['password'], auth.password):
                 return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
             
-            # Generate API key
-            import secrets
-            api_key = secrets.token_urlsafe(32)
-            created_at = datetime.datetime.now().isoformat()
-            
+            # Generate API key; only its hash is stored
             data = request.get_json() or {}
-            description = data.get('description', 'API Key')
-            
-            conn.execute(
-                """INSERT INTO api_keys (key, description, is_active, created_at, created_by) 
-                   VALUES (?, ?, ?, ?, ?)""",
-                (api_key, description, 1, created_at, auth.username)
-            )
+            key = api_key_cache.create(conn, data.get('description', 'API Key'), auth.username)
             conn.commit()
         
         return jsonify({
             'success': True,
-            'data': {
-                'api_key': api_key,
-                'description': description,
-                'created_at': created_at
-            }
+            'data': key
         }), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/v1/api-keys/revoke', methods=['POST'])
+def revoke_api_key():
+    """Revoke an API key (requires admin credentials)"""
+    try:
+        auth = request.authorization
+        
+        if not auth or not auth.username or not auth.password:
+            return jsonify({'success': False, 'error': 'Admin credentials required'}), 401
+        
+        data = request.get_json() or {}
+        if not data.get('api_key'):
+            return jsonify({'success': False, 'error': 'api_key is required'}), 400
+        
+        with get_db_connection() as conn:
+            from app import verify_password
+            user = conn.execute("SELECT * FROM users WHERE username = ?", 
+                              (auth.username,)).fetchone()
+            
+            if not user or not verify_password(user['password'], auth.password):
+                return jsonify({'success': False, 'error': 'Invalid credentials'}), 401
+            
+            if not api_key_cache.revoke(conn, data['api_key']):
+                return jsonify({'success': False, 'error': 'API key not found or already revoked'}), 404
+        
+        return jsonify({'success': True, 'data': {'revoked': True}})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 # ---------- ERROR HANDLERS ----------
 
 @app.errorhandler(404)
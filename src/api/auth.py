@@ -0,0 +1,219 @@
+"""
+API key authentication
+
+Keys are stored as SHA-256 digests (api_keys.key_hash), never in plain text.
+ApiKeyCache keeps recent lookups in memory so most requests authenticate
+without touching the database:
+
+- a valid key is trusted for ``ttl`` seconds, so a revoked key stops working
+  in every process within that window (at once in the process that revoked it);
+- an unknown or revoked key is remembered for ``negative_ttl`` seconds, so
+  repeated bad keys do not hit the database either;
+- last_used timestamps are collected in memory and written by a background
+  thread every ``flush_interval`` seconds with one executemany.
+"""
+import atexit
+import datetime
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+DEFAULT_TTL = 30
+DEFAULT_NEGATIVE_TTL = 5
+DEFAULT_FLUSH_INTERVAL = 10
+DEFAULT_MAX_ENTRIES = 10000
+
+# Characters of the raw key kept in plain text to tell keys apart
+KEY_PREFIX_LENGTH = 8
+
+_KEY_COLUMNS = "key_hash, key_prefix, description, is_active, created_at, created_by, last_used"
+
+
+def hash_api_key(api_key: str) -> str:
+    """SHA-256 hex digest stored for an API key"""
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+
+
+def generate_api_key() -> str:
+    """New random API key"""
+    return secrets.token_urlsafe(32)
+
+
+class ApiKeyCache:
+    """In-process cache of API key lookups with batched last_used updates"""
+
+    def __init__(self, db_connection_func: Callable, ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            db_connection_func: Function that returns a database connection
+            ttl: Seconds a valid key is trusted without checking the database
+            negative_ttl: Seconds an invalid key is rejected without checking the database
+            flush_interval: Seconds between last_used flushes
+            max_entries: Cached keys kept (least recently used are dropped first)
+        """
+        self.get_db_connection = db_connection_func
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # digest -> (info or None, expires at)
+        self._pending_last_used: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._stopped = threading.Event()
+        self.hits = 0
+        self.misses = 0
+
+    def authenticate(self, api_key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up an API key
+
+        Returns:
+            Key details (without the key itself), or None if the key is unknown or revoked
+        """
+        digest = hash_api_key(api_key)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                info = entry[0]
+            else:
+                entry = None
+                self.misses += 1
+
+        if entry is None:
+            info = self._load(digest)
+            with self._lock:
+                self._entries[digest] = (info, now + (self.ttl if info else self.negative_ttl))
+                self._entries.move_to_end(digest)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        # The lookup is by digest already; compare again in constant time
+        if info is None or not hmac.compare_digest(info['key_hash'], digest):
+            return None
+
+        with self._lock:
+            self._pending_last_used[digest] = datetime.datetime.now().isoformat()
+        self._start_flusher()
+        return info
+
+    def _load(self, digest: str) -> Optional[Dict[str, Any]]:
+        with self.get_db_connection() as conn:
+            row = conn.execute(
+                f"SELECT {_KEY_COLUMNS} FROM api_keys WHERE key_hash = ? AND is_active = 1",
+                (digest,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def create(self, conn, description: str, created_by: str) -> Dict[str, Any]:
+        """
+        Create and store a new API key (not committed)
+
+        Returns:
+            Key details including the raw ``api_key``, which is not stored and
+            cannot be shown again
+        """
+        api_key = generate_api_key()
+        created_at = datetime.datetime.now().isoformat()
+        conn.execute(
+            """INSERT INTO api_keys (key_hash, key_prefix, description, is_active, created_at, created_by)
+               VALUES (?, ?, ?, 1, ?, ?)""",
+            (hash_api_key(api_key), api_key[:KEY_PREFIX_LENGTH], description, created_at, created_by)
+        )
+        return {'api_key': api_key, 'key_prefix': api_key[:KEY_PREFIX_LENGTH],
+                'description': description, 'created_at': created_at}
+
+    def revoke(self, conn, api_key: str) -> bool:
+        """
+        Deactivate an API key (committed)
+
+        Takes effect at once in this process; other processes see it when
+        their cached entry expires (at most ``ttl`` seconds).
+
+        Returns:
+            True if an active key was revoked
+        """
+        digest = hash_api_key(api_key)
+        cursor = conn.execute("UPDATE api_keys SET is_active = 0 WHERE key_hash = ? AND is_active = 1", (digest,))
+        conn.commit()
+        self.invalidate(digest)
+        return cursor.rowcount > 0
+
+    def invalidate(self, digest: Optional[str] = None):
+        """Drop one cached key (by digest), or every cached key"""
+        with self._lock:
+            if digest is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(digest, None)
+                self._pending_last_used.pop(digest, None)
+
+    def flush(self) -> int:
+        """
+        Write the collected last_used timestamps
+
+        Returns:
+            Number of keys updated
+        """
+        with self._lock:
+            pending, self._pending_last_used = self._pending_last_used, {}
+        if not pending:
+            return 0
+        try:
+            with self.get_db_connection() as conn:
+                conn.executemany("UPDATE api_keys SET last_used = ? WHERE key_hash = ?",
+                                 [(used, digest) for digest, used in pending.items()])
+                conn.commit()
+        except Exception:
+            # Keep the timestamps for the next flush, unless newer ones arrived meanwhile
+            with self._lock:
+                for digest, used in pending.items():
+                    self._pending_last_used.setdefault(digest, used)
+            raise
+        return len(pending)
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run_flusher, daemon=True)
+            self._flusher.start()
+        atexit.register(self.stop)
+
+    def _run_flusher(self):
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Error flushing API key last_used: {e}")
+
+    def stop(self):
+        """Stop the background flush and write what is pending"""
+        self._stopped.set()
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"Error flushing API key last_used: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Cache counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'pending_last_used': len(self._pending_last_used),
+            }
@@ -0,0 +1,169 @@
+"""
+Keyset pagination and streamed responses for the API list endpoints
+
+Pages are addressed by an opaque ``after`` cursor holding the sort key and
+id of the last row returned, so every page is an index range scan no matter
+how deep the client has paged. Rows are read from the database as they are
+written to the response (JSON envelope or NDJSON), so memory use does not
+grow with the result size.
+"""
+import base64
+import datetime
+import json as _json
+from itertools import chain
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Response, json, stream_with_context
+
+# Rows serialized per chunk written to the response
+STREAM_CHUNK_ROWS = 100
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Opaque cursor for the sort key values of a row"""
+    return base64.urlsafe_b64encode(_json.dumps(list(values)).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor: str, size: int) -> List:
+    """
+    Sort key values from a cursor made by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        values = _json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def parse_limit(value: Optional[str], default: Optional[int], maximum: Optional[int]) -> Optional[int]:
+    """
+    Page size from the ``limit`` query parameter
+
+    Raises:
+        ValueError: If the value is not a positive integer up to ``maximum``
+    """
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    if limit < 1 or (maximum is not None and limit > maximum):
+        raise ValueError(f"limit must be between 1 and {maximum}")
+    return limit
+
+
+def parse_fields(value: Optional[str], allowed: Sequence[str]) -> Optional[List[str]]:
+    """
+    Requested columns from the ``fields`` query parameter (None = all)
+
+    Raises:
+        ValueError: If a field is not in ``allowed``
+    """
+    if not value:
+        return None
+    fields = list(dict.fromkeys(f.strip() for f in value.split(',') if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return fields
+
+
+def parse_date(value: Optional[str], name: str) -> Optional[str]:
+    """
+    ISO date ('YYYY-MM-DD') from a query parameter
+
+    Raises:
+        ValueError: If the value is not an ISO date
+    """
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"{name} must be a date in YYYY-MM-DD format")
+
+
+def keyset_condition(columns: Sequence[str], values: Sequence, descending: bool = False) -> Tuple[str, List]:
+    """
+    WHERE clause selecting the rows after ``values`` in ORDER BY ``columns``
+
+    Written as nested OR/AND rather than a row-value comparison so MySQL can
+    use the index too, with a redundant bound on the first column so the
+    planner seeks to the cursor instead of scanning from the start.
+    """
+    op = '<' if descending else '>'
+    clauses, params = [], []
+    for i, column in enumerate(columns):
+        equal = [f"{c} = ?" for c in columns[:i]]
+        clauses.append("(" + " AND ".join(equal + [f"{column} {op} ?"]) + ")")
+        params.extend(list(values[:i]) + [values[i]])
+    return f"{columns[0]} {op}= ? AND (" + " OR ".join(clauses) + ")", [values[0]] + params
+
+
+def wants_ndjson(request) -> bool:
+    """Whether the client asked for NDJSON (``format=ndjson`` or the Accept header)"""
+    if request.args.get('format'):
+        return request.args['format'].lower() == 'ndjson'
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+
+def stream_rows(rows: Iterator[Dict], limit: Optional[int], cursor_keys: Sequence[str],
+                fields: Optional[List[str]] = None, ndjson: bool = False) -> Response:
+    """
+    Stream query rows as a JSON envelope or NDJSON
+
+    ``rows`` should come from a query with ``LIMIT limit + 1``: the extra row
+    only tells whether there is a next page. The JSON envelope ends with
+    ``count`` and ``next_cursor``; NDJSON is one row per line, followed by a
+    ``{"next_cursor": ...}`` line when there are more rows.
+
+    The query runs before this returns, so database errors can still be
+    reported with an error status; after that the response is committed.
+    """
+    def project(row: Dict) -> Dict:
+        row = dict(row)
+        return {f: row[f] for f in fields} if fields else row
+
+    def generate():
+        count, next_cursor, chunk = 0, None, []
+        try:
+            first = next(rows, None)  # runs the query
+            yield '' if ndjson else '{"success": true, "data": ['
+            for row in ([] if first is None else chain([first], rows)):
+                if limit is not None and count == limit:
+                    next_cursor = encode_cursor([last[k] for k in cursor_keys])
+                    break
+                text = json.dumps(project(row))
+                chunk.append(text + '\n' if ndjson else (',' if count else '') + text)
+                count += 1
+                last = row
+                if len(chunk) >= STREAM_CHUNK_ROWS:
+                    yield ''.join(chunk)
+                    chunk = []
+        finally:
+            rows.close()
+        if ndjson:
+            if next_cursor:
+                chunk.append(json.dumps({'next_cursor': next_cursor}) + '\n')
+        else:
+            chunk.append(f'], "count": {count}, "next_cursor": {json.dumps(next_cursor)}}}')
+        yield ''.join(chunk)
+
+    body = stream_with_context(generate())
+    first_chunk = next(body)
+
+    def resume():
+        # yield from, unlike chain(), closes body (and the cursor) if the client goes away
+        yield first_chunk
+        yield from body
+
+    return Response(resume(), mimetype=NDJSON_MIMETYPE if ndjson else 'application/json')
+
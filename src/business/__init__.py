@@ -14,10 +14,13 @@ from .business_logic import (
 from .bulk_operations import (
     BulkInvoiceOperations,
     BulkClientOperations,
+    BulkPaymentOperations,
     BulkReporting
 )
 from .advanced_reporting import AdvancedReporting
 from .scheduler import InvoiceScheduler, NotificationManager
+from .pdf_batch import BatchPdfRenderer
+from .mailer import Mailer, SmtpConnectionPool
 
 __all__ = [
     'InvoiceTemplate',
@@ -30,8 +33,12 @@ __all__ = [
     'BusinessAnalytics',
     'BulkInvoiceOperations',
     'BulkClientOperations',
+    'BulkPaymentOperations',
     'BulkReporting',
     'AdvancedReporting',
     'InvoiceScheduler',
-    'NotificationManager'
+    'NotificationManager',
+    'BatchPdfRenderer',
+    'Mailer',
+    'SmtpConnectionPool'
 ]
@@ -7,6 +7,15 @@ from typing import Dict, List, Any, Optional, Tuple
 from decimal import Decimal
 import json
 
+from ..models.dialect import month_bucket
+
+# Payment totals per invoice, joined into the reports instead of one SUM query per row
+INVOICE_PAYMENTS_CTE = """WITH invoice_payments AS (
+                   SELECT invoice_id, SUM(amount) as paid
+                   FROM payments
+                   GROUP BY invoice_id
+               )"""
+
 
 class AdvancedReporting:
     """Advanced reporting and analytics features"""
@@ -26,39 +35,31 @@ class AdvancedReporting:
         end_date = datetime.datetime.now()
         start_date = end_date - datetime.timedelta(days=months * 30)
         
-        # Get all invoices in date range
-        invoices = conn.execute(
-            """SELECT created_at, total, status
-               FROM invoices
-               WHERE created_at >= ?
-               ORDER BY created_at""",
+        # Bucket invoices by month in the database
+        month = month_bucket('created_at')
+        rows = conn.execute(
+            f"""SELECT {month} as month,
+                       SUM(total) as revenue,
+                       COUNT(*) as invoice_count,
+                       SUM(CASE WHEN status = 'paid' THEN 1 ELSE 0 END) as paid_count
+                FROM invoices
+                WHERE created_at >= ? AND total IS NOT NULL
+                GROUP BY {month}
+                ORDER BY month""",
             (start_date.isoformat(),)
         ).fetchall()
         
         # Organize by month
         monthly_data = {}
-        for invoice in invoices:
-            try:
-                date = datetime.datetime.fromisoformat(invoice['created_at'])
-                month_key = date.strftime('%Y-%m')
-                
-                if month_key not in monthly_data:
-                    monthly_data[month_key] = {
-                        'revenue': 0,
-                        'invoice_count': 0,
-                        'paid_count': 0,
-                        'unpaid_count': 0
-                    }
-                
-                monthly_data[month_key]['revenue'] += invoice['total']
-                monthly_data[month_key]['invoice_count'] += 1
-                
-                if invoice['status'] == 'paid':
-                    monthly_data[month_key]['paid_count'] += 1
-                else:
-                    monthly_data[month_key]['unpaid_count'] += 1
-            except:
+        for row in rows:
+            if not row['month']:
                 continue
+            monthly_data[row['month']] = {
+                'revenue': row['revenue'],
+                'invoice_count': row['invoice_count'],
+                'paid_count': row['paid_count'],
+                'unpaid_count': row['invoice_count'] - row['paid_count']
+            }
         
         # Calculate trends
         months_list = sorted(monthly_data.keys())
@@ -165,15 +166,18 @@ class AdvancedReporting:
         Returns:
             Dictionary with client performance data
         """
-        # Get all clients with their invoice data
+        # Get all clients with their invoice and payment totals in one pass
         clients = conn.execute(
-            """SELECT c.id, c.name, c.email, c.created_at,
+            INVOICE_PAYMENTS_CTE + """
+               SELECT c.id, c.name, c.email, c.created_at,
                       COUNT(i.id) as invoice_count,
                       SUM(i.total) as total_revenue,
                       AVG(i.total) as avg_invoice_value,
-                      MAX(i.created_at) as last_invoice_date
+                      MAX(i.created_at) as last_invoice_date,
+                      SUM(ip.paid) as total_paid
                FROM clients c
                LEFT JOIN invoices i ON c.id = i.client_id
+               LEFT JOIN invoice_payments ip ON ip.invoice_id = i.id
                GROUP BY c.id, c.name, c.email, c.created_at
                ORDER BY total_revenue DESC""",
         ).fetchall()
@@ -203,16 +207,7 @@ class AdvancedReporting:
                 days_since = None
                 is_active = False
             
-            # Get payment data
-            payments = conn.execute(
-                """SELECT SUM(p.amount) as total_paid
-                   FROM payments p
-                   JOIN invoices i ON p.invoice_id = i.id
-                   WHERE i.client_id = ?""",
-                (client['id'],)
-            ).fetchone()
-            
-            total_paid = payments['total_paid'] if payments and payments['total_paid'] else 0
+            total_paid = client['total_paid'] or 0
             total_revenue = client['total_revenue'] or 0
             outstanding = total_revenue - total_paid
             
@@ -253,37 +248,35 @@ class AdvancedReporting:
         Returns:
             Dictionary with project profitability data
         """
-        # Get all projects with invoice and expense data
+        # Get all projects with invoice and expense totals aggregated per project
         projects = conn.execute(
-            """SELECT p.id, p.name, p.client_id, p.budget, p.status,
-                      c.name as client_name
+            """WITH project_invoices AS (
+                   SELECT project_id, SUM(total) as revenue, COUNT(*) as invoice_count
+                   FROM invoices
+                   WHERE project_id IS NOT NULL
+                   GROUP BY project_id
+               ),
+               project_expenses AS (
+                   SELECT project_id, SUM(amount) as total_expenses
+                   FROM expenses
+                   WHERE project_id IS NOT NULL
+                   GROUP BY project_id
+               )
+               SELECT p.id, p.name, p.client_id, p.budget, p.status,
+                      c.name as client_name,
+                      pi.revenue, pi.invoice_count, pe.total_expenses
                FROM projects p
-               LEFT JOIN clients c ON p.client_id = c.id""",
+               LEFT JOIN clients c ON p.client_id = c.id
+               LEFT JOIN project_invoices pi ON pi.project_id = p.id
+               LEFT JOIN project_expenses pe ON pe.project_id = p.id""",
         ).fetchall()
         
         project_metrics = []
         
         for project in projects:
-            # Get project revenue (sum of invoice totals)
-            invoices = conn.execute(
-                """SELECT SUM(total) as revenue, COUNT(*) as invoice_count
-                   FROM invoices
-                   WHERE project_id = ?""",
-                (project['id'],)
-            ).fetchone()
-            
-            revenue = invoices['revenue'] if invoices and invoices['revenue'] else 0
-            invoice_count = invoices['invoice_count'] if invoices else 0
-            
-            # Get project expenses
-            expenses = conn.execute(
-                """SELECT SUM(amount) as total_expenses
-                   FROM expenses
-                   WHERE project_id = ?""",
-                (project['id'],)
-            ).fetchone()
-            
-            total_expenses = expenses['total_expenses'] if expenses and expenses['total_expenses'] else 0
+            revenue = project['revenue'] or 0
+            invoice_count = project['invoice_count'] or 0
+            total_expenses = project['total_expenses'] or 0
             
             # Calculate profitability
             profit = revenue - total_expenses
@@ -338,15 +331,20 @@ class AdvancedReporting:
         end_date = datetime.datetime.now()
         start_date = end_date - datetime.timedelta(days=365)
         
-        invoices = conn.execute(
-            """SELECT created_at, total
-               FROM invoices
-               WHERE created_at >= ?
-               ORDER BY created_at""",
+        month = month_bucket('created_at')
+        rows = conn.execute(
+            f"""SELECT {month} as month, SUM(total) as revenue
+                FROM invoices
+                WHERE created_at >= ? AND total IS NOT NULL
+                GROUP BY {month}
+                ORDER BY month""",
             (start_date.isoformat(),)
         ).fetchall()
         
-        if not invoices:
+        # Organize by month
+        monthly_revenue = {row['month']: row['revenue'] for row in rows if row['month']}
+        
+        if not monthly_revenue:
             return {
                 'success': True,
                 'message': 'Insufficient data for predictions',
@@ -354,20 +352,6 @@ class AdvancedReporting:
                 'predicted_next_quarter': 0
             }
         
-        # Organize by month
-        monthly_revenue = {}
-        for invoice in invoices:
-            try:
-                date = datetime.datetime.fromisoformat(invoice['created_at'])
-                month_key = date.strftime('%Y-%m')
-                
-                if month_key not in monthly_revenue:
-                    monthly_revenue[month_key] = 0
-                
-                monthly_revenue[month_key] += invoice['total']
-            except:
-                continue
-        
         # Simple moving average for prediction
         months = sorted(monthly_revenue.keys())
         if len(months) >= 3:
@@ -427,12 +411,14 @@ class AdvancedReporting:
         """
         current_date = datetime.datetime.now()
         
-        # Get all unpaid and partially paid invoices
+        # Get all unpaid and partially paid invoices with their paid amounts
         invoices = conn.execute(
-            """SELECT i.id, i.total, i.created_at, i.due_date, i.status,
-                      c.name as client_name
+            INVOICE_PAYMENTS_CTE + """
+               SELECT i.id, i.total, i.created_at, i.due_date, i.status,
+                      c.name as client_name, ip.paid
                FROM invoices i
                JOIN clients c ON i.client_id = c.id
+               LEFT JOIN invoice_payments ip ON ip.invoice_id = i.id
                WHERE i.status IN ('unpaid', 'partially_paid')""",
         ).fetchall()
         
@@ -446,12 +432,7 @@ class AdvancedReporting:
         
         for invoice in invoices:
             # Calculate outstanding amount
-            payments = conn.execute(
-                "SELECT SUM(amount) as paid FROM payments WHERE invoice_id = ?",
-                (invoice['id'],)
-            ).fetchone()
-            
-            paid_amount = payments['paid'] if payments and payments['paid'] else 0
+            paid_amount = invoice['paid'] or 0
             outstanding = invoice['total'] - paid_amount
             
             # Determine age
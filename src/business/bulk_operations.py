@@ -3,42 +3,163 @@ Bulk Operations Module for Invoice Utility
 Provides functionality for bulk operations on invoices, clients, and other entities
 """
 import datetime
+import os
+import sqlite3
 import uuid
-from typing import List, Dict, Any, Optional
-from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
+from contextlib import ExitStack, contextmanager
+
+from ..models.payments import lock_invoices
+from ..models.rollups import apply_invoice_rows, track_invoices
+from ..utils.pdf_cache import invalidate_invoice_pdfs
+
+# Rows written per executemany call; each chunk runs in its own savepoint
+BULK_CHUNK_SIZE = 1000
+
+# Ids per IN (...) list; stays under SQLite's default 999 bound parameters
+IN_CHUNK_SIZE = 500
+
+_INSERT_INVOICE_SQL = """INSERT INTO invoices 
+    (id, client_id, services, amounts, total, status, created_at, date_iso,
+     project_id, currency, tax_rate, tax_amount, due_date, notes)
+    VALUES (?, ?, ?, ?, ?, 'unpaid', ?, ?, ?, ?, ?, ?, ?, ?)"""
+
+_INSERT_CLIENT_SQL = """INSERT INTO clients (id, name, email, phone, created_at)
+    VALUES (?, ?, ?, ?, ?)"""
+
+_INSERT_PAYMENT_SQL = """INSERT INTO payments (id, invoice_id, amount, date, method, notes, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?)"""
+
+
+def _generate_ids(count: int) -> List[str]:
+    """Generate short random IDs (same format as str(uuid4())[:8]), unique within the batch"""
+    ids = []
+    seen = set()
+    while len(ids) < count:
+        raw = os.urandom(4 * (count - len(ids))).hex()
+        for i in range(0, len(raw), 8):
+            new_id = raw[i:i + 8]
+            if new_id not in seen:
+                seen.add(new_id)
+                ids.append(new_id)
+    return ids
+
+
+def _chunks(items: List[Any], size: int):
+    """Yield successive slices of at most ``size`` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _placeholders(count: int) -> str:
+    """Placeholder list for an IN (...) clause"""
+    return ", ".join(["?"] * count)
+
+
+def _existing_invoice_ids(conn, invoice_ids: List[str]) -> set:
+    """Return which of the given invoice ids exist"""
+    rows = conn.execute(
+        f"SELECT id FROM invoices WHERE id IN ({_placeholders(len(invoice_ids))})",
+        invoice_ids
+    ).fetchall()
+    return {row['id'] for row in rows}
+
+
+def _begin(conn):
+    """
+    Make sure a transaction is open before using savepoints
+    
+    On SQLite a SAVEPOINT outside a transaction starts one, and releasing it
+    commits, which would turn every chunk into its own transaction.
+    """
+    if isinstance(conn, sqlite3.Connection) and not conn.in_transaction:
+        conn.execute("BEGIN")
+
+
+@contextmanager
+def _savepoint(conn, name: str):
+    """Run a block inside a savepoint, rolling back to it on error"""
+    conn.execute(f"SAVEPOINT {name}")
+    try:
+        yield
+    except Exception:
+        conn.execute(f"ROLLBACK TO SAVEPOINT {name}")
+        conn.execute(f"RELEASE SAVEPOINT {name}")
+        raise
+    conn.execute(f"RELEASE SAVEPOINT {name}")
+
+
+def _insert_chunked(conn, query: str, rows: List[Tuple[int, Tuple]],
+                    chunk_size: int = BULK_CHUNK_SIZE) -> Dict[int, str]:
+    """
+    Insert rows with one executemany call per chunk
+    
+    A chunk that fails is rolled back to its savepoint and replayed row by
+    row, so only the offending rows are rejected and each gets its own error.
+    
+    Args:
+        conn: Database connection
+        query: INSERT statement with ? placeholders
+        rows: (index, params) pairs, where index identifies the input row
+        chunk_size: Rows per executemany call
+        
+    Returns:
+        Dictionary mapping the index of every rejected row to its error
+    """
+    failures = {}
+    _begin(conn)
+    
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        try:
+            with _savepoint(conn, 'bulk_chunk'):
+                conn.executemany(query, [params for _, params in chunk])
+            continue
+        except Exception:
+            pass
+        
+        for index, params in chunk:
+            try:
+                with _savepoint(conn, 'bulk_row'):
+                    conn.execute(query, params)
+            except Exception as e:
+                failures[index] = str(e)
+    
+    return failures
 
 
 class BulkInvoiceOperations:
     """Class for handling bulk invoice operations"""
     
     @staticmethod
-    def bulk_create_invoices(conn, invoice_data_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def bulk_create_invoices(conn, invoice_data_list: List[Dict[str, Any]],
+                             chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Any]:
         """
         Create multiple invoices in a single transaction
         
+        All rows are validated first; the valid ones are then written with
+        chunked executemany calls, one savepoint per chunk.
+        
         Args:
             conn: Database connection
             invoice_data_list: List of invoice data dictionaries
+            chunk_size: Rows written per executemany call
             
         Returns:
             Dictionary with created invoice IDs and any errors
         """
-        created_invoices = []
-        errors = []
+        errors = {}
+        valid_rows = []
+        required_fields = ['client_id', 'services', 'amounts']
         
         for idx, invoice_data in enumerate(invoice_data_list):
             try:
-                invoice_id = str(uuid.uuid4())[:8]
-                created_at = datetime.datetime.now().isoformat()
-                
                 # Validate required fields
-                required_fields = ['client_id', 'services', 'amounts']
                 for field in required_fields:
                     if field not in invoice_data:
                         raise ValueError(f"Missing required field: {field}")
                 
                 # Calculate totals
-                services = invoice_data['services']
                 amounts = invoice_data['amounts']
                 subtotal = sum(amounts)
                 
@@ -47,43 +168,44 @@ class BulkInvoiceOperations:
                 tax_amount = subtotal * (tax_rate / 100)
                 total = subtotal + tax_amount
                 
-                # Get optional fields
-                project_id = invoice_data.get('project_id')
-                currency = invoice_data.get('currency', 'USD')
-                due_date = invoice_data.get('due_date')
-                notes = invoice_data.get('notes', '')
-                
-                # Insert invoice
-                conn.execute(
-                    """INSERT INTO invoices 
-                       (id, client_id, services, amounts, total, status, created_at, 
-                        project_id, currency, tax_rate, tax_amount, due_date, notes)
-                       VALUES (?, ?, ?, ?, ?, 'unpaid', ?, ?, ?, ?, ?, ?, ?)""",
-                    (invoice_id, invoice_data['client_id'], str(services), str(amounts),
-                     total, created_at, project_id, currency, tax_rate, tax_amount, due_date, notes)
-                )
-                
-                created_invoices.append({
-                    'id': invoice_id,
-                    'client_id': invoice_data['client_id'],
-                    'total': total
-                })
-                
+                valid_rows.append((idx, total, tax_rate, tax_amount))
             except Exception as e:
-                errors.append({
-                    'index': idx,
-                    'data': invoice_data,
-                    'error': str(e)
-                })
+                errors[idx] = str(e)
+        
+        invoice_ids = _generate_ids(len(valid_rows))
+        created_at = datetime.datetime.now().isoformat()
+        rows = []
+        for invoice_id, (idx, total, tax_rate, tax_amount) in zip(invoice_ids, valid_rows):
+            invoice_data = invoice_data_list[idx]
+            rows.append((idx, (
+                invoice_id, invoice_data['client_id'], str(invoice_data['services']),
+                str(invoice_data['amounts']), total, created_at, created_at[:10],
+                invoice_data.get('project_id'), invoice_data.get('currency', 'USD'),
+                tax_rate, tax_amount, invoice_data.get('due_date'), invoice_data.get('notes', '')
+            )))
         
+        errors.update(_insert_chunked(conn, _INSERT_INVOICE_SQL, rows, chunk_size))
+        apply_invoice_rows(conn, after=(
+            {'date': None, 'created_at': created_at, 'total': params[4],
+             'status': 'unpaid', 'currency': params[8]}
+            for idx, params in rows if idx not in errors
+        ))
         conn.commit()
         
+        created_invoices = [
+            {'index': idx, 'id': params[0], 'client_id': params[1], 'total': params[4]}
+            for idx, params in rows if idx not in errors
+        ]
+        
         return {
             'success': True,
             'created_count': len(created_invoices),
             'error_count': len(errors),
             'created_invoices': created_invoices,
-            'errors': errors
+            'errors': [
+                {'index': idx, 'data': invoice_data_list[idx], 'error': errors[idx]}
+                for idx in sorted(errors)
+            ]
         }
     
     @staticmethod
@@ -91,6 +213,9 @@ class BulkInvoiceOperations:
         """
         Update status for multiple invoices
         
+        Runs one UPDATE per chunk of ids; ids that do not exist are found by
+        comparing the chunk against the ids actually present.
+        
         Args:
             conn: Database connection
             invoice_ids: List of invoice IDs
@@ -101,27 +226,37 @@ class BulkInvoiceOperations:
         """
         updated_count = 0
         errors = []
+        updated_ids = []
+        _begin(conn)
         
-        for invoice_id in invoice_ids:
+        for chunk in _chunks(invoice_ids, IN_CHUNK_SIZE):
+            unique_ids = list(dict.fromkeys(chunk))
+            placeholders = _placeholders(len(unique_ids))
             try:
-                result = conn.execute(
-                    "UPDATE invoices SET status = ? WHERE id = ?",
-                    (new_status, invoice_id)
-                )
-                if result.rowcount > 0:
+                with _savepoint(conn, 'bulk_chunk'):
+                    found = _existing_invoice_ids(conn, unique_ids)
+                    with track_invoices(conn, f"id IN ({placeholders})", unique_ids):
+                        conn.execute(
+                            f"UPDATE invoices SET status = ? WHERE id IN ({placeholders})",
+                            [new_status] + unique_ids
+                        )
+            except Exception as e:
+                errors.extend({'invoice_id': invoice_id, 'error': str(e)} for invoice_id in chunk)
+                continue
+            
+            updated_ids.extend(found)
+            for invoice_id in chunk:
+                if invoice_id in found:
                     updated_count += 1
                 else:
                     errors.append({
                         'invoice_id': invoice_id,
                         'error': 'Invoice not found'
                     })
-            except Exception as e:
-                errors.append({
-                    'invoice_id': invoice_id,
-                    'error': str(e)
-                })
         
         conn.commit()
+        # The status is printed on the PDF, so cached copies are now stale
+        invalidate_invoice_pdfs(updated_ids)
         
         return {
             'success': True,
@@ -135,6 +270,9 @@ class BulkInvoiceOperations:
         """
         Delete multiple invoices
         
+        Payments and invoices are deleted with one statement each per chunk
+        of ids.
+        
         Args:
             conn: Database connection
             invoice_ids: List of invoice IDs to delete
@@ -144,28 +282,37 @@ class BulkInvoiceOperations:
         """
         deleted_count = 0
         errors = []
+        deleted_ids = []
+        _begin(conn)
         
-        for invoice_id in invoice_ids:
+        for chunk in _chunks(invoice_ids, IN_CHUNK_SIZE):
+            unique_ids = list(dict.fromkeys(chunk))
+            placeholders = _placeholders(len(unique_ids))
             try:
-                # Delete associated payments first
-                conn.execute("DELETE FROM payments WHERE invoice_id = ?", (invoice_id,))
-                
-                # Delete invoice
-                result = conn.execute("DELETE FROM invoices WHERE id = ?", (invoice_id,))
-                if result.rowcount > 0:
+                with _savepoint(conn, 'bulk_chunk'):
+                    found = _existing_invoice_ids(conn, unique_ids)
+                    with track_invoices(conn, f"id IN ({placeholders})", unique_ids):
+                        # Delete associated payments first
+                        conn.execute(f"DELETE FROM payments WHERE invoice_id IN ({placeholders})", unique_ids)
+                        conn.execute(f"DELETE FROM invoices WHERE id IN ({placeholders})", unique_ids)
+            except Exception as e:
+                errors.extend({'invoice_id': invoice_id, 'error': str(e)} for invoice_id in chunk)
+                continue
+            
+            deleted_ids.extend(found)
+            for invoice_id in chunk:
+                if invoice_id in found:
+                    # A repeated id is already gone the second time round
+                    found.discard(invoice_id)
                     deleted_count += 1
                 else:
                     errors.append({
                         'invoice_id': invoice_id,
                         'error': 'Invoice not found'
                     })
-            except Exception as e:
-                errors.append({
-                    'invoice_id': invoice_id,
-                    'error': str(e)
-                })
         
         conn.commit()
+        invalidate_invoice_pdfs(deleted_ids)
         
         return {
             'success': True,
@@ -179,55 +326,60 @@ class BulkInvoiceOperations:
         """
         Send emails for multiple invoices
         
+        Invoices are loaded with one IN query per chunk of ids, every message
+        is written to the email outbox in one executemany call, and the
+        outbox is then sent concurrently over pooled SMTP connections.
+        
         Args:
             conn: Database connection
             invoice_ids: List of invoice IDs
-            email_settings: Email configuration
+            email_settings: Settings dictionary (SMTP_*, EMAIL_SUBJECT/EMAIL_BODY
+                templates and the company details printed on the PDF)
             
         Returns:
             Dictionary with email sending results
         """
-        sent_count = 0
+        from .mailer import get_mailer, invoice_email
+        
+        mailer = get_mailer(email_settings, email_settings.get('LOGO_PATH'))
+        if mailer is None:
+            return {
+                'success': False,
+                'error': 'SMTP settings are not fully configured (SMTP_PASSWORD must be set in the environment)'
+            }
+        
+        unique_ids = list(dict.fromkeys(invoice_ids))
+        invoices = {}
+        for chunk in _chunks(unique_ids, IN_CHUNK_SIZE):
+            rows = conn.execute(
+                f"""SELECT i.id, i.total, c.email as client_email, c.name as name
+                    FROM invoices i
+                    JOIN clients c ON i.client_id = c.id
+                    WHERE i.id IN ({_placeholders(len(chunk))})""",
+                chunk
+            ).fetchall()
+            invoices.update((row['id'], row) for row in rows)
+        
         errors = []
+        messages = []
+        for invoice_id in unique_ids:
+            invoice = invoices.get(invoice_id)
+            if not invoice:
+                errors.append({'invoice_id': invoice_id, 'error': 'Invoice not found'})
+            elif not invoice['client_email']:
+                errors.append({'invoice_id': invoice_id, 'error': 'Client email not available'})
+            else:
+                messages.append(invoice_email(invoice, email_settings, invoice['client_email']))
         
-        for invoice_id in invoice_ids:
-            try:
-                # Get invoice and client details
-                invoice = conn.execute(
-                    """SELECT i.*, c.email as client_email, c.name as client_name
-                       FROM invoices i
-                       JOIN clients c ON i.client_id = c.id
-                       WHERE i.id = ?""",
-                    (invoice_id,)
-                ).fetchone()
-                
-                if not invoice:
-                    errors.append({
-                        'invoice_id': invoice_id,
-                        'error': 'Invoice not found'
-                    })
-                    continue
-                
-                if not invoice['client_email']:
-                    errors.append({
-                        'invoice_id': invoice_id,
-                        'error': 'Client email not available'
-                    })
-                    continue
-                
-                # Here you would implement actual email sending
-                # For now, just mark as success
-                sent_count += 1
-                
-            except Exception as e:
-                errors.append({
-                    'invoice_id': invoice_id,
-                    'error': str(e)
-                })
+        result = mailer.send(conn, messages) if messages else {'sent_count': 0, 'results': []}
+        errors.extend(
+            {'invoice_id': outcome['invoice_id'], 'error': outcome['error']}
+            for outcome in result['results'] if outcome['error'] is not None
+        )
         
         return {
             'success': True,
-            'sent_count': sent_count,
+            'sent_count': result['sent_count'],
             'error_count': len(errors),
             'errors': errors
         }
@@ -237,54 +389,54 @@ class BulkClientOperations:
     """Class for handling bulk client operations"""
     
     @staticmethod
-    def bulk_import_clients(conn, clients_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def bulk_import_clients(conn, clients_data: List[Dict[str, Any]],
+                            chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Any]:
         """
-        Import multiple clients in bulk
+        Import multiple clients in a single transaction
+        
+        Rows are validated first and then written with chunked executemany
+        calls, like bulk_create_invoices.
         
         Args:
             conn: Database connection
             clients_data: List of client data dictionaries
+            chunk_size: Rows written per executemany call
             
         Returns:
-            Dictionary with import results
+            Dictionary with import results and the ID given to each imported row
         """
-        imported_count = 0
-        errors = []
+        errors = {}
+        valid_rows = []
         
         for idx, client_data in enumerate(clients_data):
             try:
                 # Validate required fields
                 if 'name' not in client_data:
                     raise ValueError("Missing required field: name")
-                
-                client_id = str(uuid.uuid4())[:8]
-                created_at = datetime.datetime.now().isoformat()
-                
-                conn.execute(
-                    """INSERT INTO clients (id, name, email, phone, created_at)
-                       VALUES (?, ?, ?, ?, ?)""",
-                    (client_id, client_data['name'], 
-                     client_data.get('email', ''),
-                     client_data.get('phone', ''),
-                     created_at)
-                )
-                
-                imported_count += 1
-                
+                valid_rows.append(idx)
             except Exception as e:
-                errors.append({
-                    'index': idx,
-                    'data': client_data,
-                    'error': str(e)
-                })
+                errors[idx] = str(e)
         
+        created_at = datetime.datetime.now().isoformat()
+        rows = [
+            (idx, (client_id, clients_data[idx]['name'], clients_data[idx].get('email', ''),
+                   clients_data[idx].get('phone', ''), created_at))
+            for client_id, idx in zip(_generate_ids(len(valid_rows)), valid_rows)
+        ]
+        errors.update(_insert_chunked(conn, _INSERT_CLIENT_SQL, rows, chunk_size))
         conn.commit()
         
+        imported_clients = [{'index': idx, 'id': params[0]} for idx, params in rows if idx not in errors]
+        
         return {
             'success': True,
-            'imported_count': imported_count,
+            'imported_count': len(imported_clients),
             'error_count': len(errors),
-            'errors': errors
+            'imported_clients': imported_clients,
+            'errors': [
+                {'index': idx, 'data': clients_data[idx], 'error': errors[idx]}
+                for idx in sorted(errors)
+            ]
         }
     
     @staticmethod
@@ -346,17 +498,102 @@ class BulkClientOperations:
         }
 
 
+class BulkPaymentOperations:
+    """Class for handling bulk payment operations"""
+    
+    @staticmethod
+    def bulk_record_payments(conn, payments_data: List[Dict[str, Any]],
+                             chunk_size: int = BULK_CHUNK_SIZE) -> Dict[str, Any]:
+        """
+        Record multiple payments in a single transaction
+        
+        Payments are validated and checked against existing invoices first,
+        then written with chunked executemany calls. The payments triggers
+        update each invoice's amount_paid and status as its payments go in.
+        
+        Args:
+            conn: Database connection
+            payments_data: List of payment dictionaries (invoice_id, amount, date, method, notes)
+            chunk_size: Rows written per executemany call
+            
+        Returns:
+            Dictionary with recorded payment IDs and any errors
+        """
+        errors = {}
+        valid_rows = []
+        required_fields = ['invoice_id', 'amount', 'date', 'method']
+        
+        for idx, payment_data in enumerate(payments_data):
+            try:
+                for field in required_fields:
+                    if field not in payment_data:
+                        raise ValueError(f"Missing required field: {field}")
+                amount = float(payment_data['amount'])
+                if amount <= 0:
+                    raise ValueError("Payment amount must be positive")
+                valid_rows.append((idx, amount))
+            except Exception as e:
+                errors[idx] = str(e)
+        
+        invoice_ids = list(dict.fromkeys(payments_data[idx]['invoice_id'] for idx, _ in valid_rows))
+        found = lock_invoices(conn, invoice_ids)
+        
+        created_at = datetime.datetime.now().isoformat()
+        rows = []
+        for payment_id, (idx, amount) in zip(_generate_ids(len(valid_rows)), valid_rows):
+            payment_data = payments_data[idx]
+            if payment_data['invoice_id'] not in found:
+                errors[idx] = 'Invoice not found'
+                continue
+            rows.append((idx, (
+                payment_id, payment_data['invoice_id'], amount, payment_data['date'],
+                payment_data['method'], payment_data.get('notes', ''), created_at
+            )))
+        
+        paid_ids = list(dict.fromkeys(params[1] for _, params in rows))
+        with ExitStack() as tracking:
+            for chunk in _chunks(paid_ids, IN_CHUNK_SIZE):
+                tracking.enter_context(track_invoices(conn, f"id IN ({_placeholders(len(chunk))})", chunk))
+            errors.update(_insert_chunked(conn, _INSERT_PAYMENT_SQL, rows, chunk_size))
+        
+        conn.commit()
+        # The status is printed on the PDF, so cached copies may now be stale
+        invalidate_invoice_pdfs(paid_ids)
+        
+        recorded_payments = [
+            {'index': idx, 'id': params[0], 'invoice_id': params[1], 'amount': params[2]}
+            for idx, params in rows if idx not in errors
+        ]
+        
+        return {
+            'success': True,
+            'recorded_count': len(recorded_payments),
+            'error_count': len(errors),
+            'recorded_payments': recorded_payments,
+            'errors': [
+                {'index': idx, 'data': payments_data[idx], 'error': errors[idx]}
+                for idx in sorted(errors)
+            ]
+        }
+
+
 class BulkReporting:
     """Class for bulk reporting and data export"""
     
     @staticmethod
-    def generate_bulk_report(conn, invoice_ids: List[str]) -> Dict[str, Any]:
+    def generate_bulk_report(conn, invoice_ids: List[str],
+                             include_details: bool = True) -> Dict[str, Any]:
         """
         Generate a consolidated report for multiple invoices
         
+        Each chunk of ids is answered by one grouped query (invoices joined
+        to their clients and summed payments) instead of two queries per id.
+        
         Args:
             conn: Database connection
             invoice_ids: List of invoice IDs
+            include_details: Include per-invoice rows; pass False for very
+                large id lists to get the aggregates only
             
         Returns:
             Dictionary with aggregated report data
@@ -364,47 +601,54 @@ class BulkReporting:
         total_amount = 0
         total_paid = 0
         total_outstanding = 0
+        total_invoices = 0
         invoice_details = []
         
-        for invoice_id in invoice_ids:
-            invoice = conn.execute(
-                """SELECT i.*, c.name as client_name
-                   FROM invoices i
-                   JOIN clients c ON i.client_id = c.id
-                   WHERE i.id = ?""",
-                (invoice_id,)
-            ).fetchone()
+        for chunk in _chunks(invoice_ids, IN_CHUNK_SIZE):
+            unique_ids = list(dict.fromkeys(chunk))
+            rows = conn.execute(
+                f"""SELECT i.id, c.name as client_name, i.total, i.status, i.created_at,
+                           COALESCE(SUM(p.amount), 0) as paid
+                    FROM invoices i
+                    JOIN clients c ON i.client_id = c.id
+                    LEFT JOIN payments p ON p.invoice_id = i.id
+                    WHERE i.id IN ({_placeholders(len(unique_ids))})
+                    GROUP BY i.id, c.name, i.total, i.status, i.created_at""",
+                unique_ids
+            ).fetchall()
+            invoices = {row['id']: row for row in rows}
             
-            if invoice:
-                total_amount += invoice['total']
-                
-                # Get paid amount
-                payments = conn.execute(
-                    "SELECT SUM(amount) as paid FROM payments WHERE invoice_id = ?",
-                    (invoice_id,)
-                ).fetchone()
-                
-                paid_amount = payments['paid'] if payments and payments['paid'] else 0
-                total_paid += paid_amount
+            # Walk the ids in request order so totals and details match it
+            for invoice_id in chunk:
+                invoice = invoices.get(invoice_id)
+                if not invoice:
+                    continue
                 
+                paid_amount = invoice['paid'] or 0
                 outstanding = invoice['total'] - paid_amount
+                total_amount += invoice['total']
+                total_paid += paid_amount
                 total_outstanding += outstanding
+                total_invoices += 1
                 
-                invoice_details.append({
-                    'id': invoice['id'],
-                    'client_name': invoice['client_name'],
-                    'total': invoice['total'],
-                    'paid': paid_amount,
-                    'outstanding': outstanding,
-                    'status': invoice['status'],
-                    'created_at': invoice['created_at']
-                })
+                if include_details:
+                    invoice_details.append({
+                        'id': invoice['id'],
+                        'client_name': invoice['client_name'],
+                        'total': invoice['total'],
+                        'paid': paid_amount,
+                        'outstanding': outstanding,
+                        'status': invoice['status'],
+                        'created_at': invoice['created_at']
+                    })
         
-        return {
+        report = {
             'success': True,
-            'total_invoices': len(invoice_details),
+            'total_invoices': total_invoices,
             'total_amount': total_amount,
             'total_paid': total_paid,
-            'total_outstanding': total_outstanding,
-            'invoice_details': invoice_details
+            'total_outstanding': total_outstanding
         }
+        if include_details:
+            report['invoice_details'] = invoice_details
+        return report
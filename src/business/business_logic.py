@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Tuple
 from decimal import Decimal
 import json
 
+from ..models.rollups import summarize_rollups
+
 # ---------- INVOICE TEMPLATES ----------
 class InvoiceTemplate:
     """Class for managing invoice templates"""
@@ -299,38 +301,22 @@ class InvoiceReminder:
     
     @staticmethod
     def get_overdue_invoices(conn, days_overdue: int = 7):
-        """Get invoices that are overdue by specified days"""
-        from datetime import datetime, timedelta
+        """
+        Get invoices that are overdue by specified days
         
-        # Calculate cutoff date
-        cutoff_date = datetime.now() - timedelta(days=days_overdue)
+        A range query on the ISO date_iso column, served by the
+        (status, date_iso) index.
+        """
+        cutoff_date = (datetime.date.today() - datetime.timedelta(days=days_overdue)).isoformat()
         
-        # Get all unpaid invoices
-        invoices = conn.execute(
+        return conn.execute(
             """SELECT i.*, c.name, c.email 
                FROM invoices i
                JOIN clients c ON i.client_id = c.id
-               WHERE i.status = 'unpaid'"""
+               WHERE i.status = 'unpaid' AND i.date_iso <= ?
+               ORDER BY i.date_iso""",
+            (cutoff_date,)
         ).fetchall()
-        
-        # Filter by date - handle both date formats
-        overdue = []
-        for inv in invoices:
-            try:
-                # Try parsing as '%d %B %Y' format first
-                inv_date = datetime.strptime(inv['date'], '%d %B %Y')
-            except (ValueError, TypeError):
-                try:
-                    # Try ISO format
-                    inv_date = datetime.fromisoformat(inv['date'])
-                except (ValueError, TypeError):
-                    # Skip invoices with invalid dates
-                    continue
-            
-            if inv_date.date() <= cutoff_date.date():
-                overdue.append(inv)
-        
-        return overdue
     
     @staticmethod
     def create_reminder(conn, invoice_id: str, reminder_type: str, sent_date: str):
@@ -353,38 +339,21 @@ class BusinessAnalytics:
     
     @staticmethod
     def calculate_metrics(conn, start_date: str, end_date: str) -> Dict:
-        """Calculate key business metrics for a date range"""
-        # Revenue
-        revenue_result = conn.execute(
-            """SELECT SUM(total) as total_revenue, COUNT(*) as invoice_count
-               FROM invoices 
-               WHERE status = 'paid' AND date BETWEEN ? AND ?""",
-            (start_date, end_date)
-        ).fetchone()
-        
-        # Expenses
-        expenses_result = conn.execute(
-            """SELECT SUM(amount) as total_expenses
-               FROM expenses 
-               WHERE date BETWEEN ? AND ?""",
-            (start_date, end_date)
-        ).fetchone()
-        
-        # Outstanding
-        outstanding_result = conn.execute(
-            """SELECT SUM(total) as outstanding
-               FROM invoices 
-               WHERE status = 'unpaid'"""
-        ).fetchone()
+        """
+        Calculate key business metrics for a date range
         
-        revenue = revenue_result['total_revenue'] or 0
-        expenses = expenses_result['total_expenses'] or 0
+        Served from the monthly rollups, so the range covers the calendar
+        months spanned by start_date and end_date.
+        """
+        summary = summarize_rollups(conn, start_date, end_date)
+        revenue = summary['revenue']
+        expenses = summary['expenses']
         
         return {
             "revenue": revenue,
             "expenses": expenses,
             "profit": revenue - expenses,
-            "outstanding": outstanding_result['outstanding'] or 0,
-            "invoice_count": revenue_result['invoice_count'] or 0,
+            "outstanding": summary['outstanding'],
+            "invoice_count": summary['paid_count'],
             "profit_margin": (revenue - expenses) / revenue * 100 if revenue > 0 else 0
         }
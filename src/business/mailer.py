@@ -0,0 +1,431 @@
+"""
+Outbound Email Module for Invoice Utility
+Queues messages in the email_outbox table and sends them over pooled SMTP connections
+"""
+import datetime
+import os
+import queue
+import smtplib
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from typing import Any, Dict, List, Mapping, Optional
+
+from .bulk_operations import IN_CHUNK_SIZE, _chunks, _placeholders
+from .pdf_batch import BatchPdfRenderer, pdf_file_name
+from ..utils.pdf_cache import cached_invoice_pdf
+
+DEFAULT_EMAIL_WORKERS = 4
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_RETRY_DELAY = 1.0  # seconds; doubled after every failed attempt
+
+# Idle connections older than this are checked with NOOP before reuse
+_MAX_IDLE_SECONDS = 30
+
+SMTP_SETTINGS_KEYS = ('SMTP_SERVER', 'SMTP_PORT', 'SMTP_USERNAME', 'SMTP_SENDER_EMAIL')
+
+_INSERT_MESSAGE_SQL = """INSERT INTO email_outbox
+    (id, recipient, subject, body, invoice_id, attach_pdf, status, attempts, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, 'queued', 0, ?, ?)"""
+
+
+def smtp_settings(settings: Mapping[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    SMTP connection settings, or None if they are not fully configured
+
+    The password comes from the SMTP_PASSWORD environment variable, never
+    from the settings table.
+    """
+    config = {key: settings.get(key) for key in SMTP_SETTINGS_KEYS}
+    config['SMTP_PASSWORD'] = os.getenv('SMTP_PASSWORD')
+    if not all(config.values()):
+        return None
+    return config
+
+
+def invoice_email(invoice: Mapping[str, Any], settings: Mapping[str, Any], recipient: str) -> Dict[str, Any]:
+    """Outbox message for an invoice, built from the EMAIL_SUBJECT/EMAIL_BODY templates"""
+    company_name = settings.get("COMPANY_NAME", "")
+    subject_template = settings.get("EMAIL_SUBJECT") or "Invoice from {company_name}"
+    body_template = settings.get("EMAIL_BODY") or "Please find your invoice attached."
+    return {
+        'recipient': recipient,
+        'subject': subject_template.format(company_name=company_name, invoice_id=invoice['id']),
+        'body': body_template.format(
+            client_name=invoice['name'],
+            invoice_id=invoice['id'],
+            total=f"{invoice['total']:,.2f}",
+            company_name=company_name
+        ),
+        'invoice_id': invoice['id'],
+        'attach_pdf': True
+    }
+
+
+def reminder_email(invoice: Mapping[str, Any], settings: Mapping[str, Any], recipient: str) -> Dict[str, Any]:
+    """Outbox message reminding a client of an unpaid invoice (REMINDER_SUBJECT/REMINDER_BODY templates)"""
+    return invoice_email(invoice, dict(
+        settings,
+        EMAIL_SUBJECT=settings.get("REMINDER_SUBJECT") or "Payment reminder: invoice {invoice_id}",
+        EMAIL_BODY=settings.get("REMINDER_BODY") or (
+            "Dear {client_name},<br/><br/>This is a reminder that invoice {invoice_id} "
+            "for ${total} is overdue. The invoice is attached.<br/><br/>{company_name}")
+    ), recipient)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a send failure is worth retrying (4xx replies, dropped connections, timeouts)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                              ConnectionError, socket.timeout))
+
+
+class SmtpConnectionPool:
+    """
+    Pool of logged-in SMTP sessions
+
+    A connection is opened (TLS handshake and login included) only when no
+    idle one is available, and returned to the pool after each message. At
+    most ``size`` connections are open at once.
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 size: int = DEFAULT_EMAIL_WORKERS, use_ssl: Optional[bool] = None, timeout: float = 30):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.use_ssl = self.port == 465 if use_ssl is None else use_ssl
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        if self.use_ssl:
+            smtp = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            smtp.ehlo()
+            if smtp.has_extn('starttls'):
+                smtp.starttls()
+                smtp.ehlo()
+        try:
+            if self.username and self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            self._quit(smtp)
+            raise
+        with self._lock:
+            self.connections_opened += 1
+        return smtp
+
+    @staticmethod
+    def _quit(smtp: smtplib.SMTP):
+        try:
+            smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                smtp, idle_since = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - idle_since < _MAX_IDLE_SECONDS:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except smtplib.SMTPException:
+                pass
+            self._quit(smtp)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is closed instead of returned if the block raises"""
+        with self._slots:
+            smtp = self._checkout()
+            try:
+                yield smtp
+            except Exception:
+                self._quit(smtp)
+                raise
+            self._idle.put((smtp, time.monotonic()))
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                smtp, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(smtp)
+
+
+class Mailer:
+    """Sends outbox messages concurrently with retries over a shared connection pool"""
+
+    def __init__(self, smtp: Mapping[str, Any], workers: int = DEFAULT_EMAIL_WORKERS,
+                 max_retries: int = DEFAULT_MAX_RETRIES, retry_delay: float = DEFAULT_RETRY_DELAY,
+                 logo_path: Optional[str] = None):
+        """
+        Args:
+            smtp: Result of smtp_settings()
+            workers: Messages sent in parallel (also the number of pooled connections)
+            max_retries: Extra attempts for a message after a transient failure
+            retry_delay: Delay before the first retry, doubled for every further one
+            logo_path: Logo embedded in attached invoice PDFs
+        """
+        self.smtp = dict(smtp)
+        self.sender = smtp['SMTP_SENDER_EMAIL']
+        self.workers = max(1, workers)
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.logo_path = logo_path
+        self.pool = SmtpConnectionPool(smtp['SMTP_SERVER'], smtp['SMTP_PORT'], smtp['SMTP_USERNAME'],
+                                       smtp['SMTP_PASSWORD'], size=self.workers)
+
+    @staticmethod
+    def enqueue(conn, messages: List[Mapping[str, Any]]) -> List[str]:
+        """
+        Add messages to the outbox with a single executemany call (not committed)
+
+        Each message has recipient, subject and body (HTML), plus optionally
+        invoice_id and attach_pdf to attach that invoice's PDF when sent.
+
+        Returns:
+            Outbox IDs, in the order of ``messages``
+        """
+        now = datetime.datetime.now().isoformat()
+        ids = [str(uuid.uuid4()) for _ in messages]
+        conn.executemany(_INSERT_MESSAGE_SQL, [
+            (message_id, message['recipient'], message['subject'], message['body'],
+             message.get('invoice_id'), 1 if message.get('attach_pdf') else 0, now, now)
+            for message_id, message in zip(ids, messages)
+        ])
+        return ids
+
+    @staticmethod
+    def requeue(conn, message_ids: List[str]) -> int:
+        """Queue failed (or interrupted 'sending') messages again; returns how many were requeued"""
+        requeued = 0
+        now = datetime.datetime.now().isoformat()
+        for chunk in _chunks(list(dict.fromkeys(message_ids)), IN_CHUNK_SIZE):
+            cursor = conn.execute(
+                f"""UPDATE email_outbox SET status = 'queued', claim_token = NULL, updated_at = ?
+                    WHERE status IN ('failed', 'sending') AND id IN ({_placeholders(len(chunk))})""",
+                [now] + chunk
+            )
+            requeued += cursor.rowcount
+        conn.commit()
+        return requeued
+
+    def _claim(self, conn, message_ids: Optional[List[str]], limit: Optional[int]) -> List[Dict[str, Any]]:
+        """
+        Mark queued messages as 'sending' under a fresh claim token and return them
+
+        The claim is a single conditional UPDATE, so two dispatchers never
+        send the same message.
+        """
+        token = uuid.uuid4().hex
+        now = datetime.datetime.now().isoformat()
+        if message_ids is None:
+            ids = [row['id'] for row in conn.execute(
+                "SELECT id FROM email_outbox WHERE status = 'queued' ORDER BY created_at"
+                + (f" LIMIT {int(limit)}" if limit else "")
+            ).fetchall()]
+        else:
+            ids = list(dict.fromkeys(message_ids))
+
+        claimed = []
+        for chunk in _chunks(ids, IN_CHUNK_SIZE):
+            placeholders = _placeholders(len(chunk))
+            conn.execute(
+                f"""UPDATE email_outbox SET status = 'sending', claim_token = ?, updated_at = ?
+                    WHERE status = 'queued' AND id IN ({placeholders})""",
+                [token, now] + chunk
+            )
+            claimed.extend(dict(row) for row in conn.execute(
+                f"SELECT * FROM email_outbox WHERE claim_token = ? AND id IN ({placeholders})",
+                [token] + chunk
+            ).fetchall())
+        conn.commit()
+        return claimed
+
+    def _build(self, message: Mapping[str, Any], attachment: Optional[bytes]) -> MIMEMultipart:
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = message['recipient']
+        msg['Subject'] = message['subject']
+        msg.attach(MIMEText(message['body'], 'html'))
+        if attachment is not None:
+            part = MIMEApplication(attachment, _subtype="pdf")
+            part.add_header('Content-Disposition', 'attachment', filename=pdf_file_name(message['invoice_id']))
+            msg.attach(part)
+        return msg
+
+    def _send(self, msg: MIMEMultipart) -> Dict[str, Any]:
+        """Send one message, retrying transient failures with exponential backoff"""
+        attempts = 0
+        while True:
+            attempts += 1
+            try:
+                with self.pool.connection() as smtp:
+                    smtp.send_message(msg)
+                return {'attempts': attempts, 'error': None}
+            except Exception as e:
+                if attempts > self.max_retries or not _is_transient(e):
+                    return {'attempts': attempts, 'error': str(e)}
+                time.sleep(self.retry_delay * 2 ** (attempts - 1))
+
+    def dispatch(self, conn, message_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Send queued outbox messages
+
+        PDFs are attached from the shared PDF cache in this thread; only the
+        SMTP work runs on the worker threads. Outcomes are written back with
+        one executemany per status.
+
+        Args:
+            conn: Database connection
+            message_ids: Outbox IDs to send (default: every queued message)
+            limit: Maximum number of queued messages to send when no IDs are given
+
+        Returns:
+            Dictionary with sent_count, failed_count and per-message results
+        """
+        messages = self._claim(conn, message_ids, limit)
+        invoice_of = {message['id']: message['invoice_id'] for message in messages}
+        results = {}
+
+        try:
+            invoice_ids = [m['invoice_id'] for m in messages if m['attach_pdf'] and m['invoice_id']]
+            invoices = {invoice['id']: invoice
+                        for invoice in BatchPdfRenderer.fetch_invoices(conn, invoice_ids=invoice_ids)}
+            settings = ({row['key']: row['value'] for row in conn.execute("SELECT key, value FROM settings").fetchall()}
+                        if invoices else {})
+
+            outgoing = []
+            for message in messages:
+                attachment = None
+                if message['attach_pdf'] and message['invoice_id']:
+                    invoice = invoices.get(message['invoice_id'])
+                    if invoice is None:
+                        results[message['id']] = {'attempts': 0, 'error': 'Invoice not found'}
+                        continue
+                    try:
+                        attachment = cached_invoice_pdf(invoice, settings, self.logo_path)
+                    except Exception as e:
+                        results[message['id']] = {'attempts': 0, 'error': f"Attachment failed: {e}"}
+                        continue
+                outgoing.append((message['id'], self._build(message, attachment)))
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for message_id, result in zip([m for m, _ in outgoing],
+                                              executor.map(self._send, [msg for _, msg in outgoing])):
+                    results[message_id] = result
+        except BaseException:
+            conn.rollback()  # a failed statement would abort the outcome writes below on PostgreSQL
+            raise
+        finally:
+            # Claimed messages are never left in 'sending': outcomes are recorded
+            # and anything not attempted goes back to the queue
+            sent, failed = self._record_outcomes(conn, [m['id'] for m in messages], results)
+
+        return {
+            'success': True,
+            'sent_count': len(sent),
+            'failed_count': len(failed),
+            'results': [
+                {'id': message_id, 'invoice_id': invoice_of[message_id],
+                 'status': 'sent' if result['error'] is None else 'failed', **result}
+                for message_id, result in results.items()
+            ]
+        }
+
+    def _record_outcomes(self, conn, message_ids: List[str], results: Dict[str, Dict[str, Any]]):
+        """Write dispatch results back to the outbox and requeue claimed messages without one"""
+        now = datetime.datetime.now().isoformat()
+        sent = [(result['attempts'], now, now, message_id)
+                for message_id, result in results.items() if result['error'] is None]
+        failed = [(result['attempts'], result['error'], now, message_id)
+                  for message_id, result in results.items() if result['error'] is not None]
+        unattempted = [(now, message_id) for message_id in message_ids if message_id not in results]
+        if sent:
+            conn.executemany(
+                """UPDATE email_outbox SET status = 'sent', attempts = attempts + ?, last_error = NULL,
+                   sent_at = ?, updated_at = ?, claim_token = NULL WHERE id = ?""", sent)
+        if failed:
+            conn.executemany(
+                """UPDATE email_outbox SET status = 'failed', attempts = attempts + ?, last_error = ?,
+                   updated_at = ?, claim_token = NULL WHERE id = ?""", failed)
+        if unattempted:
+            conn.executemany(
+                """UPDATE email_outbox SET status = 'queued', updated_at = ?, claim_token = NULL
+                   WHERE id = ? AND status = 'sending'""", unattempted)
+        conn.commit()
+        return sent, failed
+
+    def send(self, conn, messages: List[Mapping[str, Any]]) -> Dict[str, Any]:
+        """Enqueue messages and send them right away; unsent ones stay in the outbox as failed"""
+        message_ids = self.enqueue(conn, messages)
+        conn.commit()
+        return self.dispatch(conn, message_ids)
+
+    def close(self):
+        """Close the pooled SMTP connections"""
+        self.pool.close()
+
+
+def get_outbox_messages(conn, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+    """Most recent outbox messages, optionally filtered by status"""
+    query = """SELECT id, recipient, subject, invoice_id, status, attempts, last_error, created_at, sent_at
+               FROM email_outbox"""
+    params = []
+    if status:
+        query += " WHERE status = ?"
+        params.append(status)
+    query += f" ORDER BY created_at DESC LIMIT {int(limit)}"
+    return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+
+_mailer: Optional[Mailer] = None
+_mailer_lock = threading.Lock()
+
+
+def get_mailer(settings: Mapping[str, Any], logo_path: Optional[str] = None) -> Optional[Mailer]:
+    """
+    Process-wide mailer for the configured SMTP server, or None if SMTP is not configured
+
+    The mailer (and its pooled connections) is rebuilt only when the SMTP
+    settings change. EMAIL_WORKERS, EMAIL_MAX_RETRIES and EMAIL_RETRY_DELAY
+    tune it from the environment.
+    """
+    global _mailer
+    smtp = smtp_settings(settings)
+    if smtp is None:
+        return None
+    with _mailer_lock:
+        if _mailer is None or _mailer.smtp != smtp or _mailer.logo_path != logo_path:
+            if _mailer is not None:
+                _mailer.close()
+            _mailer = Mailer(
+                smtp,
+                workers=int(os.getenv('EMAIL_WORKERS', str(DEFAULT_EMAIL_WORKERS))),
+                max_retries=int(os.getenv('EMAIL_MAX_RETRIES', str(DEFAULT_MAX_RETRIES))),
+                retry_delay=float(os.getenv('EMAIL_RETRY_DELAY', str(DEFAULT_RETRY_DELAY))),
+                logo_path=logo_path
+            )
+        return _mailer
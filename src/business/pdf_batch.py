@@ -0,0 +1,235 @@
+"""
+Batch PDF Rendering Module for Invoice Utility
+Renders many invoice PDFs in parallel into a ZIP archive or a directory
+"""
+import datetime
+import json
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .bulk_operations import IN_CHUNK_SIZE, _chunks, _placeholders
+from ..utils.pdf_renderer import get_invoice_renderer
+
+# Invoices sent to a worker per task; large enough to amortise the pickling
+PDF_BATCH_CHUNK_SIZE = 25
+
+_INVOICE_QUERY = """SELECT i.id, i.date, i.total, i.status, i.services, c.name, c.email, c.phone
+    FROM invoices i
+    JOIN clients c ON i.client_id = c.id"""
+
+
+def pdf_file_name(invoice_id: str) -> str:
+    """Archive/file name for an invoice PDF, safe to use as a path component"""
+    return f"invoice_{re.sub(r'[^A-Za-z0-9_.-]', '_', invoice_id)}.pdf"
+
+
+def _render_chunk(settings: Dict[str, Any], logo_path: Optional[str],
+                  invoices: List[Dict[str, Any]]) -> List[Tuple[str, Optional[bytes], Optional[str]]]:
+    """
+    Render a chunk of invoices in a worker process
+
+    Each worker keeps its own renderer (see get_invoice_renderer), so styles
+    and the logo are prepared once per process, not per chunk.
+
+    Returns:
+        (invoice_id, pdf_bytes, None) or (invoice_id, None, error) per invoice
+    """
+    renderer = get_invoice_renderer(settings, logo_path)
+    results = []
+    for invoice in invoices:
+        try:
+            results.append((invoice['id'], renderer.render(invoice), None))
+        except Exception as e:
+            results.append((invoice['id'], None, str(e)))
+    return results
+
+
+class _ZipWriter:
+    """Writes rendered PDFs into a ZIP archive (a path or a binary file object)"""
+
+    def __init__(self, target):
+        self.archive = zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED)
+
+    def write(self, name: str, data: bytes):
+        self.archive.writestr(name, data)
+
+    def close(self):
+        self.archive.close()
+
+
+class _DirectoryWriter:
+    """Writes rendered PDFs as files in a directory"""
+
+    def __init__(self, target: str):
+        os.makedirs(target, exist_ok=True)
+        self.directory = target
+
+    def write(self, name: str, data: bytes):
+        with open(os.path.join(self.directory, name), 'wb') as f:
+            f.write(data)
+
+    def close(self):
+        pass
+
+
+class BatchPdfRenderer:
+    """Class for rendering invoice PDFs in bulk"""
+
+    @staticmethod
+    def fetch_invoices(conn, invoice_ids: Optional[List[str]] = None, status: Optional[str] = None,
+                       client_id: Optional[str] = None, start_date: Optional[str] = None,
+                       end_date: Optional[str] = None, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Fetch invoices with their client details for rendering
+
+        Either a list of invoice IDs (fetched with one IN query per
+        IN_CHUNK_SIZE ids, returned in request order) or filters on status,
+        client and creation date (ISO, inclusive). ``limit`` caps the number
+        of rows the filters return.
+        """
+        if invoice_ids is not None:
+            unique_ids = list(dict.fromkeys(invoice_ids))
+            found = {}
+            for chunk in _chunks(unique_ids, IN_CHUNK_SIZE):
+                rows = conn.execute(
+                    f"{_INVOICE_QUERY} WHERE i.id IN ({_placeholders(len(chunk))})", chunk
+                ).fetchall()
+                found.update((row['id'], dict(row)) for row in rows)
+            return [found[invoice_id] for invoice_id in unique_ids if invoice_id in found]
+
+        query = f"{_INVOICE_QUERY} WHERE 1=1"
+        params = []
+        if status:
+            query += " AND i.status = ?"
+            params.append(status)
+        if client_id:
+            query += " AND i.client_id = ?"
+            params.append(client_id)
+        if start_date:
+            query += " AND i.created_at >= ?"
+            params.append(start_date)
+        if end_date:
+            if len(end_date) == 10:
+                # A plain date includes the whole day
+                end_date = (datetime.date.fromisoformat(end_date) + datetime.timedelta(days=1)).isoformat()
+            query += " AND i.created_at < ?"
+            params.append(end_date)
+        query += " ORDER BY i.created_at, i.id"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    @staticmethod
+    def render_batch(invoices: List[Dict[str, Any]], settings: Dict[str, Any], output,
+                     output_format: str = 'zip', logo_path: Optional[str] = None,
+                     workers: Optional[int] = None, chunk_size: int = PDF_BATCH_CHUNK_SIZE,
+                     progress: Optional[Callable[[int, int], None]] = None,
+                     errors: Optional[List[Dict[str, str]]] = None) -> Dict[str, Any]:
+        """
+        Render invoices to PDF across a process pool
+
+        Args:
+            invoices: Rows from fetch_invoices
+            settings: Settings dictionary (company details printed on the PDF)
+            output: ZIP path or binary file object, or a directory path
+            output_format: 'zip' or 'directory'
+            logo_path: Logo to embed, if any
+            workers: Worker processes (default: CPU count); 1 renders in this process
+            chunk_size: Invoices per worker task
+            progress: Called with (processed so far, total) after each chunk
+            errors: Errors already known for this batch (e.g. missing IDs),
+                reported together with the rendering errors
+
+        Returns:
+            Dictionary with rendered_count, error_count, per-invoice errors
+            and elapsed seconds. A ZIP also gets an errors.json entry when
+            any invoice failed.
+        """
+        if output_format not in ('zip', 'directory'):
+            raise ValueError(f"Unknown output format: {output_format}")
+        writer = _ZipWriter(output) if output_format == 'zip' else _DirectoryWriter(output)
+        settings = dict(settings)
+        errors = list(errors or [])
+        total = len(invoices) + len(errors)
+        rendered = 0
+        start = time.perf_counter()
+
+        def collect(results):
+            nonlocal rendered
+            for invoice_id, pdf, error in results:
+                if error is None:
+                    writer.write(pdf_file_name(invoice_id), pdf)
+                    rendered += 1
+                else:
+                    errors.append({'id': invoice_id, 'error': error})
+            if progress:
+                progress(rendered + len(errors), total)
+
+        try:
+            chunks = list(_chunks(invoices, max(1, chunk_size)))
+            workers = workers or os.cpu_count() or 1
+            if workers == 1 or len(chunks) <= 1:
+                for chunk in chunks:
+                    collect(_render_chunk(settings, logo_path, chunk))
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+                    futures = {pool.submit(_render_chunk, settings, logo_path, chunk): chunk
+                               for chunk in chunks}
+                    for future in as_completed(futures):
+                        try:
+                            collect(future.result())
+                        except Exception as e:
+                            # The worker itself failed (e.g. it was killed); fail its whole chunk
+                            collect([(invoice['id'], None, str(e)) for invoice in futures[future]])
+
+            if errors and output_format == 'zip':
+                writer.write('errors.json', json.dumps(errors, indent=2).encode('utf-8'))
+        finally:
+            writer.close()
+
+        return {
+            'total': total,
+            'rendered_count': rendered,
+            'error_count': len(errors),
+            'errors': errors,
+            'elapsed': time.perf_counter() - start
+        }
+
+    @staticmethod
+    def export(conn, output, invoice_ids: Optional[List[str]] = None, filters: Optional[Dict[str, Any]] = None,
+               max_invoices: Optional[int] = None, **options) -> Dict[str, Any]:
+        """
+        Fetch invoices by ID or filter and render them with render_batch
+
+        Args:
+            conn: Database connection
+            output: See render_batch
+            invoice_ids: Invoice IDs to render; IDs that do not exist are reported as errors
+            filters: status, client_id, start_date and/or end_date (used when no IDs are given)
+            max_invoices: Most invoices to render
+            **options: output_format, logo_path, workers, chunk_size, progress
+
+        Returns:
+            render_batch result
+
+        Raises:
+            ValueError: If more than max_invoices invoices are requested or match the filters
+        """
+        if max_invoices is not None and invoice_ids is not None and len(invoice_ids) > max_invoices:
+            raise ValueError(f"At most {max_invoices} invoice_ids per request")
+        limit = max_invoices + 1 if max_invoices is not None and invoice_ids is None else None
+        invoices = BatchPdfRenderer.fetch_invoices(conn, invoice_ids=invoice_ids, limit=limit, **(filters or {}))
+        if limit is not None and len(invoices) > max_invoices:
+            raise ValueError(f"More than {max_invoices} invoices match the filters; narrow them or pass invoice_ids")
+        settings = {row['key']: row['value'] for row in conn.execute("SELECT key, value FROM settings").fetchall()}
+
+        missing = []
+        if invoice_ids is not None:
+            found = {invoice['id'] for invoice in invoices}
+            missing = [{'id': invoice_id, 'error': 'Invoice not found'}
+                       for invoice_id in dict.fromkeys(invoice_ids) if invoice_id not in found]
+        return BatchPdfRenderer.render_batch(invoices, settings, output, errors=missing, **options)
@@ -3,11 +3,16 @@ Invoice Scheduler Module
 Handles automated recurring invoice generation and scheduling
 """
 import datetime
+import json
+import os
 import uuid
 from typing import Dict, List, Any, Optional
 import threading
 import time
 
+from ..models.rollups import track_invoices
+from .mailer import get_mailer, invoice_email, reminder_email
+
 
 class InvoiceScheduler:
     """
@@ -187,17 +192,18 @@ class InvoiceScheduler:
                    datetime.timedelta(days=payment_terms_days)).isoformat()
         
         # Insert invoice
-        conn.execute(
-            """INSERT INTO invoices 
-               (id, client_id, services, amounts, total, status, created_at, 
-                due_date, currency, notes)
-               VALUES (?, ?, ?, ?, ?, 'unpaid', ?, ?, ?, ?)""",
-            (invoice_id, recurring_invoice['client_id'], 
-             str(services), str(amounts),
-             recurring_invoice['total'], created_at,
-             due_date, recurring_invoice.get('currency', 'USD'),
-             'Auto-generated from recurring invoice')
-        )
+        with track_invoices(conn, "id = ?", (invoice_id,)):
+            conn.execute(
+                """INSERT INTO invoices 
+                   (id, client_id, services, amounts, total, status, created_at, 
+                    date_iso, due_date, currency, notes)
+                   VALUES (?, ?, ?, ?, ?, 'unpaid', ?, ?, ?, ?, ?)""",
+                (invoice_id, recurring_invoice['client_id'], 
+                 str(services), str(amounts),
+                 recurring_invoice['total'], created_at, created_at[:10],
+                 due_date, recurring_invoice.get('currency', 'USD'),
+                 'Auto-generated from recurring invoice')
+            )
         
         return invoice_id
     
@@ -320,14 +326,80 @@ class NotificationManager:
     Manages email and other notifications for automated invoices
     """
     
-    def __init__(self, db_connection_func):
+    def __init__(self, db_connection_func, logo_path: Optional[str] = None):
         """
         Initialize notification manager
         
         Args:
             db_connection_func: Function that returns a database connection
+            logo_path: Logo embedded in attached PDFs (default: LOGO_PATH env var)
         """
         self.get_db_connection = db_connection_func
+        self.logo_path = logo_path or os.getenv('LOGO_PATH', 'logo.png')
+    
+    def _notify(self, conn, invoices: List[Dict[str, Any]], notification_type: str) -> Dict[str, Any]:
+        """
+        Email a batch of invoices through the outbox and record what was sent
+        
+        Messages are sent concurrently by the shared mailer; the reminder and
+        audit rows for every delivered message are then written with one
+        executemany each, in a single transaction.
+        
+        Args:
+            conn: Database connection
+            invoices: Rows with id, total, client_name and client_email
+            notification_type: Type of notification (created, reminder, overdue)
+            
+        Returns:
+            Dictionary with sent_count, per-invoice errors and the sent invoice IDs
+        """
+        settings = {row['key']: row['value'] for row in conn.execute("SELECT key, value FROM settings").fetchall()}
+        mailer = get_mailer(settings, self.logo_path)
+        if mailer is None:
+            return {
+                'success': False,
+                'error': 'SMTP settings are not fully configured (SMTP_PASSWORD must be set in the environment)'
+            }
+        
+        errors = []
+        messages = []
+        for invoice in invoices:
+            if not invoice['client_email']:
+                errors.append({'invoice_id': invoice['id'], 'error': 'Client email not available'})
+                continue
+            build = invoice_email if notification_type == 'created' else reminder_email
+            messages.append(build(dict(invoice, name=invoice['client_name']), settings, invoice['client_email']))
+        
+        result = mailer.send(conn, messages) if messages else {'results': []}
+        sent = [outcome['invoice_id'] for outcome in result['results'] if outcome['error'] is None]
+        errors.extend(
+            {'invoice_id': outcome['invoice_id'], 'error': outcome['error']}
+            for outcome in result['results'] if outcome['error'] is not None
+        )
+        
+        now = datetime.datetime.now().isoformat()
+        recipients = {invoice['id']: invoice['client_email'] for invoice in invoices}
+        conn.executemany(
+            """INSERT INTO invoice_reminders (id, invoice_id, reminder_type, sent_date, created_at)
+               VALUES (?, ?, ?, ?, ?)""",
+            [(str(uuid.uuid4()), invoice_id, notification_type, now, now) for invoice_id in sent]
+        )
+        conn.executemany(
+            """INSERT INTO audit_logs (id, username, action, entity_type, entity_id, details, timestamp)
+               VALUES (?, 'system', 'notification_sent', 'invoice', ?, ?, ?)""",
+            [(str(uuid.uuid4()), invoice_id,
+              json.dumps({'client_email': recipients[invoice_id], 'type': notification_type}), now)
+             for invoice_id in sent]
+        )
+        conn.commit()
+        
+        return {
+            'success': True,
+            'sent_count': len(sent),
+            'error_count': len(errors),
+            'errors': errors,
+            'sent_invoice_ids': sent
+        }
     
     def send_invoice_notification(self, invoice_id: str, notification_type: str = 'created') -> Dict[str, Any]:
         """
@@ -344,7 +416,7 @@ class NotificationManager:
             with self.get_db_connection() as conn:
                 # Get invoice and client details
                 invoice = conn.execute(
-                    """SELECT i.*, c.email as client_email, c.name as client_name
+                    """SELECT i.id, i.total, c.email as client_email, c.name as client_name
                        FROM invoices i
                        JOIN clients c ON i.client_id = c.id
                        WHERE i.id = ?""",
@@ -357,31 +429,15 @@ class NotificationManager:
                         'error': 'Invoice not found'
                     }
                 
-                if not invoice['client_email']:
+                result = self._notify(conn, [dict(invoice)], notification_type)
+                if not result['success']:
+                    return result
+                if result['errors']:
                     return {
                         'success': False,
-                        'error': 'Client email not available'
+                        'error': result['errors'][0]['error']
                     }
                 
-                # Here you would implement actual email sending
-                # For now, just log the notification
-                notification_log = {
-                    'invoice_id': invoice_id,
-                    'client_email': invoice['client_email'],
-                    'type': notification_type,
-                    'sent_at': datetime.datetime.now().isoformat()
-                }
-                
-                # Store notification in audit log
-                conn.execute(
-                    """INSERT INTO audit_logs (id, user, action, entity, entity_id, timestamp, details)
-                       VALUES (?, 'system', 'notification_sent', 'invoice', ?, ?, ?)""",
-                    (str(uuid.uuid4())[:8], invoice_id, 
-                     datetime.datetime.now().isoformat(),
-                     str(notification_log))
-                )
-                conn.commit()
-                
                 return {
                     'success': True,
                     'message': f'Notification sent to {invoice["client_email"]}',
@@ -394,45 +450,46 @@ class NotificationManager:
                 'error': str(e)
             }
     
-    def send_batch_reminders(self, days_overdue: int = 7) -> Dict[str, Any]:
+    def send_batch_reminders(self, days_overdue: int = 7, remind_every_days: int = 7) -> Dict[str, Any]:
         """
         Send reminders for overdue invoices
         
+        Overdue invoices and their client emails are loaded with one join;
+        invoices already reminded within the last ``remind_every_days`` days
+        are left out, so nobody is reminded twice in that window.
+        
         Args:
             days_overdue: Minimum days overdue to send reminder
+            remind_every_days: Minimum days between two reminders for the same invoice
             
         Returns:
             Dictionary with batch send results
         """
-        sent_count = 0
-        errors = []
+        now = datetime.datetime.now()
+        cutoff_date = (now - datetime.timedelta(days=days_overdue)).isoformat()
+        reminded_since = (now - datetime.timedelta(days=remind_every_days)).isoformat()
         
         with self.get_db_connection() as conn:
-            # Get overdue invoices
-            cutoff_date = (datetime.datetime.now() - 
-                          datetime.timedelta(days=days_overdue)).isoformat()
-            
             invoices = conn.execute(
-                """SELECT i.id, i.due_date
+                """SELECT i.id, i.total, c.email as client_email, c.name as client_name
                    FROM invoices i
+                   JOIN clients c ON i.client_id = c.id
                    WHERE i.status IN ('unpaid', 'partially_paid')
-                   AND i.due_date < ?""",
-                (cutoff_date,)
+                   AND i.due_date < ?
+                   AND NOT EXISTS (
+                       SELECT 1 FROM invoice_reminders r
+                       WHERE r.invoice_id = i.id AND r.reminder_type = 'reminder' AND r.sent_date >= ?
+                   )""",
+                (cutoff_date, reminded_since)
             ).fetchall()
             
-            for invoice in invoices:
-                result = self.send_invoice_notification(invoice['id'], 'reminder')
-                if result['success']:
-                    sent_count += 1
-                else:
-                    errors.append({
-                        'invoice_id': invoice['id'],
-                        'error': result.get('error')
-                    })
+            result = self._notify(conn, [dict(invoice) for invoice in invoices], 'reminder')
         
+        if not result['success']:
+            return result
         return {
             'success': True,
-            'sent_count': sent_count,
-            'error_count': len(errors),
-            'errors': errors
+            'sent_count': result['sent_count'],
+            'error_count': result['error_count'],
+            'errors': result['errors']
         }
@@ -5,12 +5,27 @@ from .database import (
     get_db_connection, 
     DatabaseConfig, 
     get_db_type,
-    is_sqlite
+    is_sqlite,
+    close_all_connections,
+    get_pool_stats,
+    get_statement_cache_stats,
+    iter_rows
 )
 from .db_schema import (
     init_enhanced_schema, 
     add_default_tax_settings, 
-    check_database_health
+    check_database_health,
+    run_migrations
+)
+from .dialect import month_bucket
+from .versions import table_versions
+from .payments import record_payment, reconcile_amount_paid
+from .rollups import (
+    track_invoices,
+    track_expenses,
+    rebuild_monthly_rollups,
+    get_monthly_rollups,
+    summarize_rollups
 )
 
 __all__ = [
@@ -19,6 +34,20 @@ __all__ = [
     'init_enhanced_schema', 
     'add_default_tax_settings', 
     'check_database_health',
+    'run_migrations',
     'get_db_type',
-    'is_sqlite'
+    'is_sqlite',
+    'close_all_connections',
+    'get_pool_stats',
+    'get_statement_cache_stats',
+    'iter_rows',
+    'month_bucket',
+    'track_invoices',
+    'track_expenses',
+    'rebuild_monthly_rollups',
+    'get_monthly_rollups',
+    'summarize_rollups',
+    'table_versions',
+    'record_payment',
+    'reconcile_amount_paid'
 ]
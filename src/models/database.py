@@ -1,12 +1,19 @@
 """
 Database abstraction layer supporting SQLite, PostgreSQL, and MySQL
 """
+import itertools
 import os
 import sqlite3
+import threading
+import weakref
+from collections import OrderedDict
 from contextlib import contextmanager
 from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+from .pool import ConnectionPool
+from .statements import StatementCache
+
 @dataclass
 class DatabaseConfig:
     """Database configuration from environment variables"""
@@ -14,6 +21,7 @@ class DatabaseConfig:
     
     # SQLite
     db_name: str = os.getenv("DB_NAME", "invoices.db")
+    sqlite_profile: str = os.getenv("DB_SQLITE_PROFILE", "default").lower()  # default, concurrent
     
     # PostgreSQL/MySQL
     db_host: str = os.getenv("DB_HOST", "localhost")
@@ -25,15 +33,44 @@ class DatabaseConfig:
     # Connection pool settings
     pool_size: int = int(os.getenv("DB_POOL_SIZE", "5"))
     max_overflow: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    pool_timeout: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))  # seconds to wait for a free connection
+    pool_idle_timeout: float = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))  # seconds before idle overflow connections close
+    pool_leak_timeout: float = float(os.getenv("DB_POOL_LEAK_TIMEOUT", "0"))  # log connections held longer than this (0 = off)
+    
+    # Statement cache settings
+    statement_cache_size: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))  # distinct statements kept per process/connection
+    prepare_threshold: int = int(os.getenv("DB_PREPARE_THRESHOLD", "5"))  # executions before a server-side prepare (0 = off)
 
 db_config = DatabaseConfig()
 
+# Parameter sets sent per round trip by the PostgreSQL executemany()
+EXECUTEMANY_PAGE_SIZE = 500
+
+# Rows fetched per round trip by iter_rows()
+ITER_BATCH_SIZE = 500
+
+# PRAGMAs applied once to every new SQLite connection, by profile.
+# "concurrent" uses a write-ahead log so readers never block on the writer,
+# which is what lets app.py, run_api.py and the scheduler share one file.
+SQLITE_PROFILES = {
+    "default": {
+        "busy_timeout": 5000,
+    },
+    "concurrent": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 268435456,  # 256 MB
+        "cache_size": -65536,  # 64 MB (negative values are KiB)
+        "temp_store": "MEMORY",
+    },
+}
+
 # Try to import database drivers (optional for backward compatibility)
 try:
     if db_config.db_type == "postgresql":
         import psycopg2
-        from psycopg2 import pool
-        from psycopg2.extras import RealDictCursor
+        from psycopg2.extras import RealDictCursor, execute_batch
         POSTGRESQL_AVAILABLE = True
     else:
         POSTGRESQL_AVAILABLE = False
@@ -43,90 +80,330 @@ except ImportError:
 try:
     if db_config.db_type == "mysql":
         import mysql.connector
-        from mysql.connector import pooling
         MYSQL_AVAILABLE = True
     else:
         MYSQL_AVAILABLE = False
 except ImportError:
     MYSQL_AVAILABLE = False
 
-# Global connection pool
+# Global connection pool for PostgreSQL/MySQL
 _connection_pool = None
+_connection_pool_lock = threading.Lock()
+
+# Parsed statements shared by all PostgreSQL/MySQL connections
+_statement_cache = StatementCache(db_config.statement_cache_size)
+
+# Unique names for PostgreSQL server-side cursors
+_cursor_names = itertools.count()
+
+# Server-side prepared statements per raw connection, invalidated after schema changes
+_prepared_statements = weakref.WeakKeyDictionary()
+_prepared_statements_lock = threading.Lock()
+_prepared_generation = 0
+
+# SQLite connection pool (created lazily, rebuilt if DB_NAME or the profile changes)
+_sqlite_pool = None
+_sqlite_pool_key = None
+_sqlite_pool_lock = threading.Lock()
+
+
+def get_sqlite_pragmas(profile: Optional[str] = None) -> Dict[str, Any]:
+    """Get the PRAGMA settings for a SQLite performance profile"""
+    profile = (profile or db_config.sqlite_profile).lower()
+    if profile not in SQLITE_PROFILES:
+        raise ValueError(f"Unknown SQLite profile '{profile}'. Must be one of {list(SQLITE_PROFILES)}")
+    return SQLITE_PROFILES[profile]
+
+
+def _create_sqlite_connection():
+    """Open a SQLite connection and apply one-time session setup"""
+    conn = sqlite3.connect(db_config.db_name, check_same_thread=False,
+                           cached_statements=db_config.statement_cache_size)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    for pragma, value in get_sqlite_pragmas().items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+    return conn
+
+
+def _validate_sqlite_connection(conn):
+    """Health check for pooled SQLite connections"""
+    conn.execute("SELECT 1").fetchone()
+
+
+def _reset_sqlite_connection(conn):
+    """Discard uncommitted work before a connection goes back to the pool"""
+    if conn.in_transaction:
+        conn.rollback()
+
+
+class _PreparedStatements:
+    """Prepared statements that exist on one raw connection"""
+    
+    def __init__(self):
+        self.generation = _prepared_generation
+        self.entries = OrderedDict()  # statement name -> driver handle (or None)
+
+
+def _connection_statements(conn) -> _PreparedStatements:
+    """Get the prepared statement registry for a raw connection"""
+    with _prepared_statements_lock:
+        state = _prepared_statements.get(conn)
+        if state is None:
+            state = _prepared_statements[conn] = _PreparedStatements()
+        return state
+
+
+def _should_prepare(statement) -> bool:
+    """Prepare statements server-side once they have proven to be repeated"""
+    return (db_config.prepare_threshold > 0 and statement.preparable
+            and not statement.prepare_failed
+            and statement.executions >= db_config.prepare_threshold)
+
+
+def invalidate_prepared_statements():
+    """
+    Drop server-side prepared statements on every pooled connection.
+    
+    Call after DDL: PostgreSQL refuses to run a prepared SELECT * whose
+    result columns changed. Connections deallocate lazily on next use.
+    """
+    global _prepared_generation
+    with _prepared_statements_lock:
+        _prepared_generation += 1
+
+
+def get_statement_cache_stats() -> Dict[str, int]:
+    """Get hit/miss counters for the shared statement cache"""
+    return {
+        'hits': _statement_cache.hits,
+        'misses': _statement_cache.misses,
+        'size': len(_statement_cache)
+    }
+
+
+def _create_postgresql_connection():
+    """Open a PostgreSQL connection"""
+    conn = psycopg2.connect(
+        host=db_config.db_host,
+        port=db_config.db_port,
+        database=db_config.db_database,
+        user=db_config.db_user,
+        password=db_config.db_password
+    )
+    conn.autocommit = False
+    return conn
+
+
+def _validate_postgresql_connection(conn):
+    """Pre-ping a pooled PostgreSQL connection"""
+    if conn.closed:
+        raise psycopg2.InterfaceError("connection already closed")
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    conn.rollback()
+
+
+def _create_mysql_connection():
+    """Open a MySQL connection"""
+    return mysql.connector.connect(
+        host=db_config.db_host,
+        port=db_config.db_port,
+        database=db_config.db_database,
+        user=db_config.db_user,
+        password=db_config.db_password,
+        autocommit=False
+    )
+
+
+def _validate_mysql_connection(conn):
+    """Pre-ping a pooled MySQL connection"""
+    conn.ping(reconnect=False)
+
+
+def _rollback_connection(conn):
+    """Discard uncommitted work before a connection goes back to the pool"""
+    conn.rollback()
+
+
+def _new_pool(creator, validate, reset, name):
+    """Create a ConnectionPool with the configured limits"""
+    return ConnectionPool(
+        creator,
+        pool_size=db_config.pool_size,
+        max_overflow=db_config.max_overflow,
+        timeout=db_config.pool_timeout,
+        idle_timeout=db_config.pool_idle_timeout,
+        validate=validate,
+        reset=reset,
+        leak_timeout=db_config.pool_leak_timeout or None,
+        name=name
+    )
+
+
+def _get_sqlite_pool():
+    """Get the SQLite connection pool, creating it on first use"""
+    global _sqlite_pool, _sqlite_pool_key
+    
+    pool_key = (db_config.db_name, db_config.sqlite_profile)
+    with _sqlite_pool_lock:
+        if _sqlite_pool is None or _sqlite_pool_key != pool_key:
+            if _sqlite_pool is not None:
+                _sqlite_pool.dispose()
+            _sqlite_pool = _new_pool(
+                _create_sqlite_connection,
+                _validate_sqlite_connection,
+                _reset_sqlite_connection,
+                "sqlite"
+            )
+            _sqlite_pool_key = pool_key
+        return _sqlite_pool
+
 
 def init_connection_pool():
     """Initialize database connection pool for PostgreSQL/MySQL"""
     global _connection_pool
     
-    if db_config.db_type == "postgresql" and POSTGRESQL_AVAILABLE:
-        _connection_pool = psycopg2.pool.SimpleConnectionPool(
-            1,
-            db_config.pool_size + db_config.max_overflow,
-            host=db_config.db_host,
-            port=db_config.db_port,
-            database=db_config.db_database,
-            user=db_config.db_user,
-            password=db_config.db_password
-        )
-    elif db_config.db_type == "mysql" and MYSQL_AVAILABLE:
-        _connection_pool = mysql.connector.pooling.MySQLConnectionPool(
-            pool_name="invoice_pool",
-            pool_size=db_config.pool_size,
-            host=db_config.db_host,
-            port=db_config.db_port,
-            database=db_config.db_database,
-            user=db_config.db_user,
-            password=db_config.db_password
-        )
+    with _connection_pool_lock:
+        if _connection_pool is not None:
+            return
+        if db_config.db_type == "postgresql" and POSTGRESQL_AVAILABLE:
+            _connection_pool = _new_pool(
+                _create_postgresql_connection,
+                _validate_postgresql_connection,
+                _rollback_connection,
+                "postgresql"
+            )
+        elif db_config.db_type == "mysql" and MYSQL_AVAILABLE:
+            _connection_pool = _new_pool(
+                _create_mysql_connection,
+                _validate_mysql_connection,
+                _rollback_connection,
+                "mysql"
+            )
+
+
+def _get_pool():
+    """Get the connection pool for the configured database type"""
+    if db_config.db_type == "postgresql" and POSTGRESQL_AVAILABLE or \
+            db_config.db_type == "mysql" and MYSQL_AVAILABLE:
+        if _connection_pool is None:
+            init_connection_pool()
+        return _connection_pool
+    # SQLite, or fallback to SQLite if the requested database is not available
+    return _get_sqlite_pool()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Get statistics for the active connection pool
+    
+    Returns:
+        Dictionary with in-use/idle/overflow counts, checkout waits and wait time
+    """
+    return _get_pool().stats()
+
+
+def close_all_connections():
+    """Close every pooled connection (e.g. before replacing the database file)"""
+    global _sqlite_pool, _sqlite_pool_key, _connection_pool
+    
+    with _sqlite_pool_lock:
+        if _sqlite_pool is not None:
+            _sqlite_pool.dispose()
+        _sqlite_pool = None
+        _sqlite_pool_key = None
+    
+    with _connection_pool_lock:
+        if _connection_pool is not None:
+            _connection_pool.dispose()
+        _connection_pool = None
+
 
 @contextmanager
 def get_db_connection():
     """
     Context manager for database connections with error handling.
     Supports SQLite, PostgreSQL, and MySQL
+    
+    Connections come from a thread-safe pool: they are opened and configured
+    once, pre-pinged on checkout, handed out to one caller at a time and
+    rolled back when returned.
     """
-    conn = None
-    cursor = None
+    pool = _get_pool()
+    conn = pool.acquire()
+    wrapper = None
+    broken = False
     
     try:
-        if db_config.db_type == "sqlite":
-            conn = sqlite3.connect(db_config.db_name, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA foreign_keys = ON")
-            yield conn
-            
-        elif db_config.db_type == "postgresql" and POSTGRESQL_AVAILABLE:
-            if _connection_pool is None:
-                init_connection_pool()
-            conn = _connection_pool.getconn()
-            conn.autocommit = False
-            yield PostgreSQLConnectionWrapper(conn)
-            
+        if db_config.db_type == "postgresql" and POSTGRESQL_AVAILABLE:
+            wrapper = PostgreSQLConnectionWrapper(conn)
+            yield wrapper
         elif db_config.db_type == "mysql" and MYSQL_AVAILABLE:
-            if _connection_pool is None:
-                init_connection_pool()
-            conn = _connection_pool.get_connection()
-            yield MySQLConnectionWrapper(conn)
-            
+            wrapper = MySQLConnectionWrapper(conn)
+            yield wrapper
         else:
-            # Fallback to SQLite if the requested database is not available
-            conn = sqlite3.connect(db_config.db_name, check_same_thread=False)
-            conn.row_factory = sqlite3.Row
-            conn.execute("PRAGMA foreign_keys = ON")
             yield conn
             
     except Exception as e:
-        if conn:
-            try:
-                conn.rollback()
-            except:
-                pass
+        try:
+            conn.rollback()
+        except:
+            broken = True
         raise
     finally:
-        if conn:
-            if db_config.db_type == "postgresql" and POSTGRESQL_AVAILABLE and _connection_pool:
-                _connection_pool.putconn(conn)
-            else:
-                conn.close()
+        if wrapper is not None:
+            wrapper.close()
+        pool.release(conn, discard=broken)
+
+
+def iter_rows(conn, query: str, params: Tuple = (), batch_size: int = ITER_BATCH_SIZE):
+    """
+    Iterate over the rows of a query without loading the whole result
+    
+    PostgreSQL reads through a server-side cursor and MySQL through an
+    unbuffered one, batch_size rows at a time; SQLite steps the statement
+    as rows are consumed. Use it for results that may not fit in memory,
+    and finish (or close) the iterator before running another statement
+    on the same connection.
+    """
+    if hasattr(conn, 'iterate'):
+        yield from conn.iterate(query, params, batch_size)
+        return
+    
+    cursor = conn.execute(query, tuple(params))
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cursor.close()
+
+
+class _BufferedResult:
+    """Rows already read from a statement, exposed through the cursor API"""
+    
+    def __init__(self, rows, rowcount: int):
+        self._rows = rows
+        self._position = 0
+        self.rowcount = rowcount
+    
+    def fetchone(self):
+        if self._position >= len(self._rows):
+            return None
+        row = self._rows[self._position]
+        self._position += 1
+        return row
+    
+    def fetchall(self):
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+    
+    def close(self):
+        pass
 
 
 class PostgreSQLConnectionWrapper:
@@ -137,13 +414,92 @@ class PostgreSQLConnectionWrapper:
         self._cursor = None
     
     def execute(self, query: str, params: Tuple = None):
-        """Execute a query with parameter substitution"""
-        # Convert ? placeholders to %s for PostgreSQL
-        query = query.replace("?", "%s")
+        """
+        Execute a query with parameter substitution
+        
+        The ? -> %s translation is cached per SQL text, and statements that
+        keep being repeated are PREPAREd on the connection so later runs
+        skip parsing and planning on the server too.
+        """
+        statement = _statement_cache.get(query)
+        params = tuple(params) if params else ()
+        self._close_cursor()
+        self._cursor = self._conn.cursor(cursor_factory=RealDictCursor)
+        
+        if _should_prepare(statement) and self._prepare(statement):
+            self._cursor.execute(statement.execute_sql, params or None)
+        elif statement.param_count:
+            self._cursor.execute(statement.pyformat, params)
+        else:
+            self._cursor.execute(statement.sql)
+        return self
+    
+    def executemany(self, query: str, params_seq):
+        """
+        Execute a statement once per parameter tuple
+        
+        Parameter sets are sent to the server in pages (execute_batch), so a
+        bulk insert costs one round trip per page instead of one per row.
+        """
+        statement = _statement_cache.get(query)
+        self._close_cursor()
         self._cursor = self._conn.cursor(cursor_factory=RealDictCursor)
-        self._cursor.execute(query, params or ())
+        execute_batch(self._cursor, statement.pyformat, [tuple(p) for p in params_seq],
+                      page_size=EXECUTEMANY_PAGE_SIZE)
         return self
     
+    def iterate(self, query: str, params: Tuple = None, batch_size: int = ITER_BATCH_SIZE):
+        """Yield result rows through a named (server-side) cursor, batch_size rows per round trip"""
+        statement = _statement_cache.get(query)
+        params = tuple(params) if params else ()
+        cursor = self._conn.cursor(name=f"iter_rows_{next(_cursor_names)}", cursor_factory=RealDictCursor)
+        cursor.itersize = batch_size
+        try:
+            if statement.param_count:
+                cursor.execute(statement.pyformat, params)
+            else:
+                cursor.execute(statement.sql)
+            for row in cursor:
+                yield dict(row)
+        finally:
+            cursor.close()
+    
+    def _prepare(self, statement) -> bool:
+        """Make sure the statement is prepared on this connection"""
+        state = _connection_statements(self._conn)
+        
+        with self._conn.cursor() as cursor:
+            if state.generation != _prepared_generation:
+                if state.entries:
+                    cursor.execute("DEALLOCATE ALL")
+                state.entries.clear()
+                state.generation = _prepared_generation
+            
+            if statement.name in state.entries:
+                state.entries.move_to_end(statement.name)
+                return True
+            
+            # A failed PREPARE would abort the caller's transaction, so fence it
+            cursor.execute("SAVEPOINT prepare_statement")
+            try:
+                cursor.execute(f"PREPARE {statement.name} AS {statement.numbered}")
+            except psycopg2.Error:
+                cursor.execute("ROLLBACK TO SAVEPOINT prepare_statement")
+                statement.prepare_failed = True
+                return False
+            cursor.execute("RELEASE SAVEPOINT prepare_statement")
+            
+            state.entries[statement.name] = None
+            while len(state.entries) > db_config.statement_cache_size:
+                oldest, _ = state.entries.popitem(last=False)
+                cursor.execute(f"DEALLOCATE {oldest}")
+        return True
+    
+    @property
+    def rowcount(self) -> int:
+        """Number of rows affected by the last statement"""
+        return self._cursor.rowcount if self._cursor else -1
+    
     def fetchone(self):
         """Fetch one result"""
         if self._cursor:
@@ -168,10 +524,18 @@ class PostgreSQLConnectionWrapper:
     
     def close(self):
         """Close connection"""
-        if self._cursor:
-            self._cursor.close()
+        self._close_cursor()
         # Don't close the actual connection, let the pool manage it
     
+    def _close_cursor(self):
+        """Close the cursor left over from the previous statement"""
+        if self._cursor:
+            try:
+                self._cursor.close()
+            except Exception:
+                pass
+            self._cursor = None
+    
     def backup(self, target_conn):
         """Backup not supported for PostgreSQL"""
         raise NotImplementedError("Backup is only supported for SQLite")
@@ -185,13 +549,113 @@ class MySQLConnectionWrapper:
         self._cursor = None
     
     def execute(self, query: str, params: Tuple = None):
-        """Execute a query with parameter substitution"""
-        # Convert ? placeholders to %s for MySQL
-        query = query.replace("?", "%s")
-        self._cursor = self._conn.cursor(dictionary=True)
-        self._cursor.execute(query, params or ())
+        """
+        Execute a query with parameter substitution
+        
+        The ? -> %s translation is cached per SQL text, and statements that
+        keep being repeated run through a prepared cursor kept on the
+        connection, so the server parses them once.
+        """
+        statement = _statement_cache.get(query)
+        params = tuple(params) if params else ()
+        self._close_cursor()
+        
+        if statement.param_count and _should_prepare(statement):
+            result = self._execute_prepared(statement, params)
+            if result is not None:
+                self._cursor = result
+                return self
+        
+        self._cursor = self._conn.cursor(dictionary=True, buffered=True)
+        if statement.param_count:
+            self._cursor.execute(statement.pyformat, params)
+        else:
+            self._cursor.execute(statement.sql)
+        return self
+    
+    def executemany(self, query: str, params_seq):
+        """
+        Execute a statement once per parameter tuple
+        
+        mysql-connector rewrites an INSERT ... VALUES run this way into
+        multi-row VALUES statements, so rows are sent in large batches.
+        """
+        statement = _statement_cache.get(query)
+        self._close_cursor()
+        self._cursor = self._conn.cursor(dictionary=True, buffered=True)
+        self._cursor.executemany(statement.pyformat, [tuple(p) for p in params_seq])
         return self
     
+    def iterate(self, query: str, params: Tuple = None, batch_size: int = ITER_BATCH_SIZE):
+        """Yield result rows through an unbuffered cursor, so they are read off the socket as consumed"""
+        statement = _statement_cache.get(query)
+        params = tuple(params) if params else ()
+        self._close_cursor()
+        cursor = self._conn.cursor(dictionary=True, buffered=False)
+        try:
+            if statement.param_count:
+                cursor.execute(statement.pyformat, params)
+            else:
+                cursor.execute(statement.sql)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield from rows
+        finally:
+            # Rows left unread would block the next statement on this connection
+            try:
+                self._conn.consume_results()
+            except Exception:
+                pass
+            cursor.close()
+    
+    def _execute_prepared(self, statement, params):
+        """Run a statement through this connection's prepared cursor for it"""
+        state = _connection_statements(self._conn)
+        
+        if state.generation != _prepared_generation:
+            for cursor in state.entries.values():
+                try:
+                    cursor.close()
+                except Exception:
+                    pass
+            state.entries.clear()
+            state.generation = _prepared_generation
+        
+        cursor = state.entries.get(statement.name)
+        is_new = cursor is None
+        if is_new:
+            cursor = self._conn.cursor(prepared=True, dictionary=True)
+        
+        try:
+            # The prepared cursor only re-prepares when handed a different
+            # string object, so always pass the cached statement text
+            cursor.execute(statement.sql, params)
+        except mysql.connector.Error:
+            if not is_new:
+                raise
+            # Not supported by the binary protocol; use the text protocol from now on
+            statement.prepare_failed = True
+            cursor.close()
+            return None
+        
+        rows = cursor.fetchall() if cursor.with_rows else []
+        result = _BufferedResult(rows, cursor.rowcount)
+        
+        if is_new:
+            state.entries[statement.name] = cursor
+        state.entries.move_to_end(statement.name)
+        while len(state.entries) > db_config.statement_cache_size:
+            _, oldest = state.entries.popitem(last=False)
+            oldest.close()
+        return result
+    
+    @property
+    def rowcount(self) -> int:
+        """Number of rows affected by the last statement"""
+        return self._cursor.rowcount if self._cursor else -1
+    
     def fetchone(self):
         """Fetch one result"""
         if self._cursor:
@@ -214,10 +678,18 @@ class MySQLConnectionWrapper:
     
     def close(self):
         """Close connection"""
-        if self._cursor:
-            self._cursor.close()
+        self._close_cursor()
         # Don't close the actual connection, let the pool manage it
     
+    def _close_cursor(self):
+        """Close the cursor left over from the previous statement"""
+        if self._cursor:
+            try:
+                self._cursor.close()
+            except Exception:
+                pass
+            self._cursor = None
+    
     def backup(self, target_conn):
         """Backup not supported for MySQL"""
         raise NotImplementedError("Backup is only supported for SQLite")
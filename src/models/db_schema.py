@@ -1,10 +1,328 @@
 """
 Database schema initialization and migration utilities
 """
-from .database import get_db_connection, is_sqlite
+from .database import get_db_connection, get_db_type, is_sqlite, invalidate_prepared_statements
+from .dialect import nulls_as_empty
+from .rollups import invoice_date_iso, rebuild_monthly_rollups, to_iso_date
+from .versions import GENERATION_TABLES, VERSIONED_TABLES, version_trigger_statements
+from .payments import amount_paid_trigger_statements
+import datetime
+import hashlib
 import sqlite3
 
 
+# Secondary indexes for the hot query predicates:
+# (name, table, columns, partial-index WHERE clause or None)
+HOT_PATH_INDEXES = [
+    ('idx_invoices_client_id', 'invoices', ['client_id'], None),
+    ('idx_invoices_status', 'invoices', ['status'], None),
+    ('idx_invoices_date', 'invoices', ['date'], None),
+    ('idx_invoices_created_at', 'invoices', ['created_at'], None),
+    ('idx_invoices_unpaid', 'invoices', ['client_id', 'date'], "status = 'unpaid'"),
+    ('idx_payments_invoice_id', 'payments', ['invoice_id'], None),
+    ('idx_expenses_date', 'expenses', ['date'], None),
+    ('idx_audit_logs_entity', 'audit_logs', ['entity_type', 'entity_id', 'timestamp'], None),
+    ('idx_shared_invoices_token', 'shared_invoices', ['invoice_id', 'access_token'], None),
+    ('idx_recurring_invoices_active', 'recurring_invoices', ['is_active'], None),
+]
+
+# Columns that are not TEXT (MySQL needs a prefix length to index TEXT columns)
+_NON_TEXT_COLUMNS = {'is_active'}
+_MYSQL_INDEX_PREFIX = 64
+
+
+def index_exists(conn, name: str, table: str) -> bool:
+    """Check whether an index exists on the current database"""
+    db_type = get_db_type()
+    if db_type == "postgresql":
+        row = conn.execute("SELECT 1 FROM pg_indexes WHERE indexname = ?", (name,)).fetchone()
+    elif db_type == "mysql":
+        row = conn.execute(
+            """SELECT 1 FROM information_schema.statistics
+               WHERE table_schema = DATABASE() AND table_name = ? AND index_name = ?""",
+            (table, name)
+        ).fetchone()
+    else:
+        row = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (name,)
+        ).fetchone()
+    return row is not None
+
+
+def create_index(conn, name: str, table: str, columns, where=None):
+    """
+    Create an index if it does not already exist.
+    
+    Partial indexes (``where``) are used on SQLite and PostgreSQL; MySQL has
+    no partial indexes, so it gets the full composite index instead. Entries
+    of ``columns`` containing parentheses are expressions and are indexed as
+    such (MySQL 8.0.13+ for functional key parts).
+    """
+    db_type = get_db_type()
+    
+    if db_type == "mysql":
+        if index_exists(conn, name, table):
+            return
+        cols = ", ".join(
+            f"({c})" if '(' in c else c if c in _NON_TEXT_COLUMNS else f"{c}({_MYSQL_INDEX_PREFIX})"
+            for c in columns
+        )
+        conn.execute(f"CREATE INDEX {name} ON {table} ({cols})")
+        return
+    
+    cols = ", ".join(f"({c})" if '(' in c else c for c in columns)
+    sql = f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({cols})"
+    if where:
+        sql += f" WHERE {where}"
+    conn.execute(sql)
+
+
+def _migration_hot_path_indexes(conn):
+    """Add secondary indexes for the columns every hot path filters on"""
+    for name, table, columns, where in HOT_PATH_INDEXES:
+        create_index(conn, name, table, columns, where)
+
+
+def column_exists(conn, table: str, column: str) -> bool:
+    """Check whether a table has a column, without raising inside a transaction"""
+    db_type = get_db_type()
+    if db_type in ("postgresql", "mysql"):
+        schema_filter = "table_schema = DATABASE()" if db_type == "mysql" else "table_schema = current_schema()"
+        row = conn.execute(
+            f"""SELECT 1 FROM information_schema.columns
+                WHERE {schema_filter} AND table_name = ? AND column_name = ?""",
+            (table, column)
+        ).fetchone()
+        return row is not None
+    return any(row['name'] == column for row in conn.execute(f"PRAGMA table_info({table})").fetchall())
+
+
+def add_column(conn, table: str, column: str, definition: str):
+    """Add a column to a table if it is missing"""
+    if not column_exists(conn, table, column):
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migration_invoice_bulk_columns(conn):
+    """Add the invoice columns written by bulk creation and recurring invoices"""
+    add_column(conn, 'invoices', 'amounts', 'TEXT')
+    add_column(conn, 'invoices', 'due_date', 'TEXT')
+    add_column(conn, 'invoices', 'notes', 'TEXT')
+
+
+def _migration_project_reporting(conn):
+    """Link expenses to projects and index the project rollup columns"""
+    add_column(conn, 'expenses', 'project_id', 'TEXT')
+    create_index(conn, 'idx_invoices_project_id', 'invoices', ['project_id'])
+    create_index(conn, 'idx_expenses_project_id', 'expenses', ['project_id'])
+
+
+def _migration_monthly_rollups(conn):
+    """Create the monthly_rollups table and fill it from existing data"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS monthly_rollups (
+        month VARCHAR(7) NOT NULL,
+        currency VARCHAR(10) NOT NULL,
+        invoiced REAL DEFAULT 0,
+        invoice_count INTEGER DEFAULT 0,
+        revenue_paid REAL DEFAULT 0,
+        paid_count INTEGER DEFAULT 0,
+        outstanding REAL DEFAULT 0,
+        unpaid_count INTEGER DEFAULT 0,
+        expenses REAL DEFAULT 0,
+        expense_count INTEGER DEFAULT 0,
+        updated_at TEXT,
+        PRIMARY KEY (month, currency)
+    )''')
+    rebuild_monthly_rollups(conn)
+
+
+def _migration_email_outbox(conn):
+    """Create the email_outbox table that queues outgoing email"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS email_outbox (
+        id VARCHAR(64) PRIMARY KEY,
+        recipient TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        body TEXT NOT NULL,
+        invoice_id TEXT,
+        attach_pdf INTEGER DEFAULT 0,
+        status TEXT NOT NULL,
+        attempts INTEGER DEFAULT 0,
+        last_error TEXT,
+        claim_token VARCHAR(64),
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL,
+        sent_at TEXT
+    )''')
+    create_index(conn, 'idx_email_outbox_status', 'email_outbox', ['status', 'created_at'])
+
+
+def _migration_invoice_reminder_lookup(conn):
+    """Index the recent-reminder check made before sending reminders"""
+    create_index(conn, 'idx_invoice_reminders_invoice', 'invoice_reminders',
+                 ['invoice_id', 'reminder_type', 'sent_date'])
+
+
+# Rows rewritten per executemany call by data backfills
+_BACKFILL_BATCH_SIZE = 1000
+
+
+def _migration_invoice_iso_dates(conn):
+    """
+    Add invoices.date_iso and normalise legacy dates so date ranges are index lookups
+
+    The app stores invoice dates as '%d %B %Y', which do not sort, so
+    date_iso holds the same date as 'YYYY-MM-DD' (falling back to
+    created_at). Legacy due dates in that format are rewritten as ISO too.
+    """
+    add_column(conn, 'invoices', 'date_iso', 'TEXT')
+    
+    rows = conn.execute("SELECT id, date, created_at, due_date FROM invoices WHERE date_iso IS NULL").fetchall()
+    updates = []
+    for row in rows:
+        due_date = row['due_date']
+        if due_date and not due_date[:4].isdigit():
+            due_date = to_iso_date(due_date) or due_date
+        updates.append((invoice_date_iso(row['date'], row['created_at']), due_date, row['id']))
+    for start in range(0, len(updates), _BACKFILL_BATCH_SIZE):
+        conn.executemany("UPDATE invoices SET date_iso = ?, due_date = ? WHERE id = ?",
+                         updates[start:start + _BACKFILL_BATCH_SIZE])
+    
+    create_index(conn, 'idx_invoices_status_date_iso', 'invoices', ['status', 'date_iso'])
+    create_index(conn, 'idx_invoices_status_due_date', 'invoices', ['status', 'due_date'])
+
+
+_API_KEYS_TABLE = '''CREATE TABLE IF NOT EXISTS {table} (
+    key_hash VARCHAR(64) PRIMARY KEY,
+    key_prefix VARCHAR(16),
+    description TEXT,
+    is_active INTEGER DEFAULT 1,
+    created_at TEXT NOT NULL,
+    created_by TEXT NOT NULL,
+    last_used TEXT
+)'''
+
+
+def _migration_hashed_api_keys(conn):
+    """Replace plain-text API keys with their SHA-256 digests"""
+    if not column_exists(conn, 'api_keys', 'key'):
+        return
+    
+    rows = conn.execute(
+        "SELECT key, description, is_active, created_at, created_by, last_used FROM api_keys"
+    ).fetchall()
+    conn.execute(_API_KEYS_TABLE.format(table='api_keys_hashed'))
+    conn.executemany(
+        """INSERT INTO api_keys_hashed
+           (key_hash, key_prefix, description, is_active, created_at, created_by, last_used)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        [(hashlib.sha256(row['key'].encode('utf-8')).hexdigest(), row['key'][:8], row['description'],
+          row['is_active'], row['created_at'], row['created_by'], row['last_used']) for row in rows]
+    )
+    conn.execute("DROP TABLE api_keys")
+    conn.execute("ALTER TABLE api_keys_hashed RENAME TO api_keys")
+
+
+def _migration_keyset_pagination(conn):
+    """Index the (sort key, id) orders the API pages through"""
+    create_index(conn, 'idx_invoices_date_iso_id', 'invoices', ['date_iso', 'id'])
+    create_index(conn, 'idx_invoices_client_date_iso', 'invoices', ['client_id', 'date_iso', 'id'])
+    create_index(conn, 'idx_clients_name_id', 'clients', ['name', 'id'])
+
+
+def _migration_row_versions(conn):
+    """Add row_version columns and table generation counters, kept current by triggers"""
+    for table in VERSIONED_TABLES:
+        add_column(conn, table, 'row_version', 'INTEGER NOT NULL DEFAULT 1')
+    
+    conn.execute('''CREATE TABLE IF NOT EXISTS table_generations (
+        table_name VARCHAR(64) PRIMARY KEY,
+        generation INTEGER NOT NULL DEFAULT 0
+    )''')
+    existing = {row['table_name'] for row in conn.execute("SELECT table_name FROM table_generations").fetchall()}
+    conn.executemany("INSERT INTO table_generations (table_name, generation) VALUES (?, 0)",
+                     [(table,) for table in GENERATION_TABLES if table not in existing])
+    
+    for table in GENERATION_TABLES:
+        for statement in version_trigger_statements(table):
+            conn.execute(statement)
+
+
+def _migration_invoice_amount_paid(conn):
+    """Add invoices.amount_paid, backfilled from payments and kept current by triggers"""
+    add_column(conn, 'invoices', 'amount_paid', 'REAL NOT NULL DEFAULT 0')
+    # Statuses are left alone: some were set by hand
+    conn.execute(
+        """UPDATE invoices SET amount_paid = (
+               SELECT COALESCE(SUM(amount), 0) FROM payments WHERE payments.invoice_id = invoices.id)
+           WHERE id IN (SELECT invoice_id FROM payments)"""
+    )
+    for statement in amount_paid_trigger_statements():
+        conn.execute(statement)
+
+
+
+def _migration_keyset_null_dates(conn):
+    """Page invoices on nulls_as_empty(date_iso), so rows without a date are reachable"""
+    for name in ('idx_invoices_date_iso_id', 'idx_invoices_client_date_iso'):
+        if get_db_type() == "mysql":
+            if index_exists(conn, name, 'invoices'):
+                conn.execute(f"DROP INDEX {name} ON invoices")
+        else:
+            conn.execute(f"DROP INDEX IF EXISTS {name}")
+    sort_date = nulls_as_empty('date_iso')
+    create_index(conn, 'idx_invoices_sort_date_id', 'invoices', [sort_date, 'id'])
+    create_index(conn, 'idx_invoices_client_sort_date', 'invoices', ['client_id', sort_date, 'id'])
+
+
+# Versioned migrations, applied in order and recorded in schema_migrations
+MIGRATIONS = [
+    (1, 'hot_path_indexes', _migration_hot_path_indexes),
+    (2, 'invoice_bulk_columns', _migration_invoice_bulk_columns),
+    (3, 'project_reporting', _migration_project_reporting),
+    (4, 'monthly_rollups', _migration_monthly_rollups),
+    (5, 'email_outbox', _migration_email_outbox),
+    (6, 'invoice_reminder_lookup', _migration_invoice_reminder_lookup),
+    (7, 'invoice_iso_dates', _migration_invoice_iso_dates),
+    (8, 'hashed_api_keys', _migration_hashed_api_keys),
+    (9, 'keyset_pagination', _migration_keyset_pagination),
+    (10, 'row_versions', _migration_row_versions),
+    (11, 'invoice_amount_paid', _migration_invoice_amount_paid),
+    (12, 'keyset_null_dates', _migration_keyset_null_dates),
+]
+
+
+def run_migrations(conn):
+    """
+    Apply pending versioned migrations
+    
+    Returns:
+        List of migration versions that were applied
+    """
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        applied_at TEXT NOT NULL
+    )''')
+    
+    applied = {
+        row['version'] for row in conn.execute("SELECT version FROM schema_migrations").fetchall()
+    }
+    
+    newly_applied = []
+    for version, name, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        migrate(conn)
+        conn.execute(
+            "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?, ?, ?)",
+            (version, name, datetime.datetime.now().isoformat())
+        )
+        conn.commit()
+        newly_applied.append(version)
+    
+    return newly_applied
+
+
 def init_enhanced_schema():
     """Initialize enhanced database schema with business features"""
     with get_db_connection() as conn:
@@ -132,15 +450,8 @@ def init_enhanced_schema():
             FOREIGN KEY (invoice_id) REFERENCES invoices (id) ON DELETE CASCADE
         )''')
         
-        # API Keys Table for REST API authentication
-        conn.execute('''CREATE TABLE IF NOT EXISTS api_keys (
-            key TEXT PRIMARY KEY,
-            description TEXT,
-            is_active INTEGER DEFAULT 1,
-            created_at TEXT NOT NULL,
-            created_by TEXT NOT NULL,
-            last_used TEXT
-        )''')
+        # API Keys Table for REST API authentication (keys are stored hashed)
+        conn.execute(_API_KEYS_TABLE.format(table='api_keys'))
         
         # Migration: Add new columns to existing tables
         try:
@@ -169,6 +480,11 @@ def init_enhanced_schema():
                 pass
         
         conn.commit()
+        
+        run_migrations(conn)
+    
+    # Prepared statements planned against the old table shapes are now stale
+    invalidate_prepared_statements()
 
 
 def add_default_tax_settings(conn):
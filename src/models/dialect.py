@@ -0,0 +1,80 @@
+"""
+SQL dialect helpers for expressions that differ between SQLite, PostgreSQL and MySQL
+"""
+from typing import Optional
+
+from .database import get_db_type
+
+
+def month_bucket(column: str, db_type: Optional[str] = None) -> str:
+    """
+    SQL expression that turns an ISO timestamp column into a 'YYYY-MM' month key
+
+    Dates are stored as ISO-8601 text, so PostgreSQL casts before formatting.
+    Rows whose value cannot be parsed give NULL on SQLite.
+
+    Args:
+        column: Column (or expression) holding the timestamp
+        db_type: Database type; defaults to the configured one
+
+    Returns:
+        SQL expression producing the same key as strftime('%Y-%m') in Python
+    """
+    db_type = db_type or get_db_type()
+    if db_type == "postgresql":
+        return f"to_char(date_trunc('month', CAST({column} AS timestamp)), 'YYYY-MM')"
+    if db_type == "mysql":
+        return f"DATE_FORMAT({column}, '%Y-%m')"
+    return f"strftime('%Y-%m', {column})"
+
+
+def upsert_increment(table: str, key_columns, add_columns, set_columns=(),
+                     db_type: Optional[str] = None) -> str:
+    """
+    INSERT statement that adds to an existing row's counters instead of failing
+
+    Args:
+        table: Table with a primary key or unique index on ``key_columns``
+        key_columns: Columns identifying the row
+        add_columns: Columns incremented by the inserted values on conflict
+        set_columns: Columns overwritten with the inserted values on conflict
+        db_type: Database type; defaults to the configured one
+
+    Returns:
+        SQL with one ? placeholder per key, add and set column, in that order
+    """
+    db_type = db_type or get_db_type()
+    columns = list(key_columns) + list(add_columns) + list(set_columns)
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) "
+           f"VALUES ({', '.join(['?'] * len(columns))})")
+
+    if db_type == "mysql":
+        updates = [f"{c} = {c} + VALUES({c})" for c in add_columns]
+        updates += [f"{c} = VALUES({c})" for c in set_columns]
+        return f"{sql} ON DUPLICATE KEY UPDATE {', '.join(updates)}"
+
+    updates = [f"{c} = {table}.{c} + excluded.{c}" for c in add_columns]
+    updates += [f"{c} = excluded.{c}" for c in set_columns]
+    return f"{sql} ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {', '.join(updates)}"
+
+
+def nulls_as_empty(column: str, db_type: Optional[str] = None) -> str:
+    """
+    SQL expression for a nullable text column that treats NULL as ''
+
+    Backends disagree on where NULLs sort (first in PostgreSQL DESC order,
+    last in SQLite and MySQL) and NULL never matches a comparison, so keyset
+    pages sort and compare on this instead. MySQL cannot index a TEXT
+    expression, so it is cast to a CHAR there; index it with the same call.
+
+    Args:
+        column: Column holding text (or NULL)
+        db_type: Database type; defaults to the configured one
+
+    Returns:
+        SQL expression giving the column's value, or '' for NULL
+    """
+    db_type = db_type or get_db_type()
+    if db_type == "mysql":
+        return f"CAST(COALESCE({column}, '') AS CHAR(64))"
+    return f"COALESCE({column}, '')"
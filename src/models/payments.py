@@ -0,0 +1,199 @@
+"""
+Invoice balances maintained from the payments table
+
+invoices.amount_paid holds the sum of the invoice's payments. Triggers on
+payments keep it current: each inserted, deleted or moved payment adjusts
+the invoice with one conditional UPDATE that sets amount_paid and the
+status ('paid', 'partially_paid' or 'unpaid') together. Recording a payment
+is then a single INSERT, atomic under concurrent payments to the same
+invoice, and costs the same however many payments the invoice already has.
+
+reconcile_amount_paid() compares amount_paid with SUM(payments.amount) and
+repairs any drift, e.g. after payments were written with the triggers
+missing (MySQL does not fire triggers for foreign key cascades) or a
+backup was restored.
+"""
+import datetime
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .database import get_db_type, is_sqlite
+from .rollups import track_invoices
+
+# Invoices per IN (...) list when locking
+_LOCK_CHUNK_SIZE = 500
+
+# amount_paid and SUM(payments) may differ by float rounding
+RECONCILE_TOLERANCE = 0.005
+
+
+def _status_case(paid: str) -> str:
+    """SQL for the status of an invoice once ``paid`` has been received"""
+    return (f"CASE WHEN {paid} >= total THEN 'paid' "
+            f"WHEN {paid} > 0 THEN 'partially_paid' ELSE 'unpaid' END")
+
+
+def _apply_payment(delta: str, invoice_id: str) -> str:
+    """
+    UPDATE adding ``delta`` to an invoice's amount_paid and setting its status
+
+    status is assigned first: MySQL evaluates single-table assignments left
+    to right, so it must still see the old amount_paid, as SQLite and
+    PostgreSQL always do.
+    """
+    return (f"UPDATE invoices SET status = {_status_case(f'amount_paid + {delta}')}, "
+            f"amount_paid = amount_paid + {delta} WHERE id = {invoice_id}")
+
+
+def _sqlite_triggers() -> List[str]:
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_payments_amount_paid_insert AFTER INSERT ON payments
+            BEGIN
+                {_apply_payment('NEW.amount', 'NEW.invoice_id')};
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_payments_amount_paid_delete AFTER DELETE ON payments
+            BEGIN
+                {_apply_payment('-OLD.amount', 'OLD.invoice_id')};
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_payments_amount_paid_update
+            AFTER UPDATE OF amount, invoice_id ON payments
+            BEGIN
+                {_apply_payment('-OLD.amount', 'OLD.invoice_id')};
+                {_apply_payment('NEW.amount', 'NEW.invoice_id')};
+            END""",
+    ]
+
+
+def _postgresql_triggers() -> List[str]:
+    return [
+        f"""CREATE OR REPLACE FUNCTION apply_payment_amount() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                {_apply_payment('-OLD.amount', 'OLD.invoice_id')};
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                {_apply_payment('NEW.amount', 'NEW.invoice_id')};
+            END IF;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+        "DROP TRIGGER IF EXISTS trg_payments_amount_paid ON payments",
+        """CREATE TRIGGER trg_payments_amount_paid
+            AFTER INSERT OR DELETE OR UPDATE OF amount, invoice_id ON payments
+            FOR EACH ROW EXECUTE PROCEDURE apply_payment_amount()""",
+    ]
+
+
+def _mysql_triggers() -> List[str]:
+    return [
+        "DROP TRIGGER IF EXISTS trg_payments_amount_paid_insert",
+        f"""CREATE TRIGGER trg_payments_amount_paid_insert AFTER INSERT ON payments FOR EACH ROW
+            {_apply_payment('NEW.amount', 'NEW.invoice_id')}""",
+        "DROP TRIGGER IF EXISTS trg_payments_amount_paid_delete",
+        f"""CREATE TRIGGER trg_payments_amount_paid_delete AFTER DELETE ON payments FOR EACH ROW
+            {_apply_payment('-OLD.amount', 'OLD.invoice_id')}""",
+        "DROP TRIGGER IF EXISTS trg_payments_amount_paid_update",
+        f"""CREATE TRIGGER trg_payments_amount_paid_update AFTER UPDATE ON payments FOR EACH ROW
+            BEGIN
+                {_apply_payment('-OLD.amount', 'OLD.invoice_id')};
+                {_apply_payment('NEW.amount', 'NEW.invoice_id')};
+            END""",
+    ]
+
+
+def amount_paid_trigger_statements(db_type: Optional[str] = None) -> List[str]:
+    """
+    DDL for the payments triggers that maintain invoices.amount_paid and status
+
+    Safe to run again: existing triggers are kept (SQLite) or replaced.
+    """
+    db_type = db_type or get_db_type()
+    if db_type == "postgresql":
+        return _postgresql_triggers()
+    if db_type == "mysql":
+        return _mysql_triggers()
+    return _sqlite_triggers()
+
+
+def lock_invoices(conn, invoice_ids: Iterable[str]) -> Set[str]:
+    """
+    Take the write lock for paying the given invoices, before reading them
+
+    Payment writers read the invoice first (for the rollups), so two of
+    them racing on one invoice must not both read the old row. PostgreSQL
+    and MySQL lock the rows with SELECT ... FOR UPDATE; SQLite has a single
+    write lock, taken up front with BEGIN IMMEDIATE (a deferred transaction
+    that read first could not upgrade once another writer committed).
+
+    Returns:
+        The IDs that exist
+    """
+    invoice_ids = list(dict.fromkeys(invoice_ids))
+    suffix = ""
+    if is_sqlite():
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+    else:
+        suffix = " FOR UPDATE"
+    found = set()
+    for start in range(0, len(invoice_ids), _LOCK_CHUNK_SIZE):
+        chunk = invoice_ids[start:start + _LOCK_CHUNK_SIZE]
+        rows = conn.execute(
+            f"SELECT id FROM invoices WHERE id IN ({', '.join('?' * len(chunk))}) ORDER BY id{suffix}",
+            chunk
+        ).fetchall()
+        found.update(row['id'] for row in rows)
+    return found
+
+
+def record_payment(conn, invoice_id: str, amount: float, date: Any, method: str,
+                   notes: str = '') -> str:
+    """
+    Record a payment; the invoice's amount_paid and status follow in the same statement
+
+    The caller commits.
+
+    Returns:
+        ID of the new payment
+
+    Raises:
+        ValueError: If the invoice does not exist
+    """
+    if not lock_invoices(conn, [invoice_id]):
+        raise ValueError(f"Invoice {invoice_id} not found")
+    payment_id = str(uuid.uuid4())[:8]
+    with track_invoices(conn, "id = ?", (invoice_id,)):
+        conn.execute(
+            """INSERT INTO payments (id, invoice_id, amount, date, method, notes, created_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?)""",
+            (payment_id, invoice_id, amount, date, method, notes, datetime.datetime.now().isoformat())
+        )
+    return payment_id
+
+
+def reconcile_amount_paid(conn, fix: bool = True) -> List[Dict[str, Any]]:
+    """
+    Check invoices.amount_paid against the sum of each invoice's payments
+
+    With ``fix``, drifted invoices get the correct amount_paid and the
+    status that goes with it, and the change is committed.
+
+    Returns:
+        One dict per drifted invoice: id, amount_paid, payments_total, status
+    """
+    drifted = [dict(row) for row in conn.execute(
+        """SELECT i.id, i.amount_paid, COALESCE(p.paid, 0) AS payments_total, i.status
+           FROM invoices i
+           LEFT JOIN (SELECT invoice_id, SUM(amount) AS paid FROM payments GROUP BY invoice_id) p
+               ON p.invoice_id = i.id
+           WHERE ABS(COALESCE(i.amount_paid, 0) - COALESCE(p.paid, 0)) > ?""",
+        (RECONCILE_TOLERANCE,)
+    ).fetchall()]
+    if fix and drifted:
+        for row in drifted:
+            with track_invoices(conn, "id = ?", (row['id'],)):
+                conn.execute(
+                    f"UPDATE invoices SET status = {_status_case('?')}, amount_paid = ? WHERE id = ?",
+                    (row['payments_total'], row['payments_total'], row['payments_total'], row['id'])
+                )
+        conn.commit()
+    return drifted
@@ -0,0 +1,289 @@
+"""
+Generic thread-safe connection pool used by the database abstraction layer
+"""
+import logging
+import threading
+import time
+import traceback
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Checkout/checkin pool of DB-API connections.
+
+    Up to ``pool_size`` connections are kept open indefinitely; up to
+    ``max_overflow`` more are opened under load and closed again once they
+    have been idle for ``idle_timeout`` seconds. Connections are created
+    lazily by ``creator`` (which is also where any one-time session setup
+    such as PRAGMAs belongs) and pre-pinged with ``validate`` on checkout.
+
+    Every checkout records where it happened, so connections held for longer
+    than ``leak_timeout`` seconds are logged together with the acquiring
+    stack trace.
+    """
+
+    def __init__(self, creator: Callable[[], Any], pool_size: int = 5,
+                 max_overflow: int = 10, timeout: float = 30.0,
+                 idle_timeout: float = 300.0,
+                 validate: Optional[Callable[[Any], None]] = None,
+                 reset: Optional[Callable[[Any], None]] = None,
+                 leak_timeout: Optional[float] = None,
+                 name: str = "pool"):
+        """
+        Initialize the pool
+
+        Args:
+            creator: Function that opens and configures a new connection
+            pool_size: Number of connections kept open when idle
+            max_overflow: Extra connections allowed under load
+            timeout: Seconds to wait for a free connection on checkout
+            idle_timeout: Seconds an idle overflow connection is kept before closing
+            validate: Pre-ping health check; should raise if the connection is unusable
+            reset: Called on checkin to discard leftover transaction state
+            leak_timeout: Seconds after which a checked-out connection is reported as leaked
+            name: Pool name used in log messages
+        """
+        self._creator = creator
+        self.pool_size = max(0, pool_size)
+        self.max_overflow = max(0, max_overflow)
+        self.max_size = max(1, self.pool_size + self.max_overflow)
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.leak_timeout = leak_timeout
+        self.name = name
+        self._validate = validate
+        self._reset = reset
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, returned_at), most recent on the right
+        self._checked_out = {}  # id(connection) -> (acquired_at, stack, thread name)
+        self._reported_leaks = set()
+        self._size = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._timeouts = 0
+        self._invalidated = 0
+
+    def acquire(self):
+        """Check a connection out of the pool, creating one if allowed"""
+        start = time.monotonic()
+
+        while True:
+            conn = self._take_idle_or_reserve(start)
+
+            if conn is None:
+                # A slot was reserved; open the connection outside the lock so
+                # slow connects don't block checkins
+                try:
+                    conn = self._creator()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._lock.notify()
+                    raise
+                break
+
+            # Pre-ping outside the lock; a network round-trip must not serialize checkouts
+            if self._is_healthy(conn):
+                break
+
+            with self._lock:
+                self._invalidated += 1
+                self._discard(conn)
+                self._lock.notify()
+
+        with self._lock:
+            self._track_checkout(conn)
+        return conn
+
+    def _take_idle_or_reserve(self, start: float):
+        """
+        Pop the most recently used idle connection, or reserve a slot for a new one
+
+        Returns:
+            An idle connection, or None if the caller should open a new connection
+        """
+        deadline = start + self.timeout
+        waited = False
+
+        with self._lock:
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError(f"Connection pool '{self.name}' has been disposed")
+
+                    self._expire_idle()
+
+                    if self._idle:
+                        conn, _ = self._idle.pop()
+                        return conn
+
+                    if self._size < self.max_size:
+                        self._size += 1
+                        return None
+
+                    if not waited:
+                        waited = True
+                        self._waits += 1
+                        self._report_leaks()
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeoutError(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool '{self.name}': {self._size} open, {len(self._checked_out)} in use)"
+                        )
+                    self._lock.wait(remaining)
+            finally:
+                if waited:
+                    self._wait_time += time.monotonic() - start
+
+    def release(self, conn, discard: bool = False):
+        """
+        Return a connection to the pool
+
+        Args:
+            conn: Connection previously obtained from acquire()
+            discard: Close the connection instead of keeping it (e.g. after an error)
+        """
+        if not discard and self._reset:
+            try:
+                self._reset(conn)
+            except Exception:
+                discard = True
+
+        with self._lock:
+            self._checked_out.pop(id(conn), None)
+            self._reported_leaks.discard(id(conn))
+            if discard or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._expire_idle()
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and back in"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get pool statistics
+
+        Returns:
+            Dictionary with open/in-use/idle counts and checkout wait metrics
+        """
+        with self._lock:
+            return {
+                'name': self.name,
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'open': self._size,
+                'in_use': len(self._checked_out),
+                'idle': len(self._idle),
+                'overflow': max(0, self._size - self.pool_size),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time': self._wait_time,
+                'timeouts': self._timeouts,
+                'invalidated': self._invalidated
+            }
+
+    def find_leaks(self) -> List[Dict[str, Any]]:
+        """
+        List connections checked out for longer than leak_timeout
+
+        Returns:
+            List of dictionaries with the holding thread, age and acquiring stack
+        """
+        if not self.leak_timeout:
+            return []
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    'connection_id': conn_id,
+                    'thread': thread_name,
+                    'held_for': now - acquired_at,
+                    'acquired_at': ''.join(stack)
+                }
+                for conn_id, (acquired_at, stack, thread_name) in self._checked_out.items()
+                if now - acquired_at > self.leak_timeout
+            ]
+
+    def dispose(self):
+        """Close all idle connections and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
+
+    def _track_checkout(self, conn):
+        """Record where a connection was checked out (lock held)"""
+        self._checkouts += 1
+        stack = traceback.format_stack()[:-2] if self.leak_timeout else []
+        self._checked_out[id(conn)] = (time.monotonic(), stack, threading.current_thread().name)
+        if self.leak_timeout:
+            self._report_leaks()
+
+    def _report_leaks(self):
+        """Log each leaked connection once, with the stack that acquired it (lock held)"""
+        if not self.leak_timeout:
+            return
+        now = time.monotonic()
+        for conn_id, (acquired_at, stack, thread_name) in self._checked_out.items():
+            held_for = now - acquired_at
+            if held_for > self.leak_timeout and conn_id not in self._reported_leaks:
+                self._reported_leaks.add(conn_id)
+                logger.warning(
+                    "Connection pool '%s': connection held for %.1fs by thread %s "
+                    "was not returned. Acquired at:\n%s",
+                    self.name, held_for, thread_name, ''.join(stack)
+                )
+
+    def _is_healthy(self, conn) -> bool:
+        """Run the pre-ping health check, treating any error as a dead connection"""
+        if self._validate is None:
+            return True
+        try:
+            self._validate(conn)
+            return True
+        except Exception:
+            return False
+
+    def _expire_idle(self):
+        """Close overflow connections idle for longer than idle_timeout (lock held)"""
+        if self.idle_timeout is None or self.idle_timeout <= 0:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._size > self.pool_size and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.popleft()
+            self._discard(conn)
+
+    def _discard(self, conn):
+        """Close a connection and free its slot (lock held)"""
+        self._size -= 1
+        try:
+            conn.close()
+        except Exception:
+            pass
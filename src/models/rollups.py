@@ -0,0 +1,254 @@
+"""
+Monthly rollups of invoicing, revenue and expenses
+
+The monthly_rollups table holds one row per (month, currency) so dashboard
+totals are read in O(months) instead of being recomputed from every invoice.
+It is kept up to date incrementally: writers wrap their invoice or expense
+changes in track_invoices()/track_expenses(), which apply the difference
+between the affected rows before and after the change. rebuild_monthly_rollups()
+recomputes everything from the raw tables to repair drift.
+"""
+import datetime
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .dialect import upsert_increment
+
+DEFAULT_CURRENCY = 'USD'
+
+# Summed columns, in table order
+ROLLUP_COLUMNS = (
+    'invoiced', 'invoice_count',
+    'revenue_paid', 'paid_count',
+    'outstanding', 'unpaid_count',
+    'expenses', 'expense_count',
+)
+
+_COUNT_COLUMNS = {c for c in ROLLUP_COLUMNS if c.endswith('_count')}
+
+# Invoice dates are written as '%d %B %Y' by the app; the API and imports use ISO
+_DATE_FORMATS = ('%d %B %Y', '%Y-%m-%d')
+
+_INVOICE_COLUMNS = "id, date, created_at, total, status, currency"
+_EXPENSE_COLUMNS = "id, date, amount"
+
+
+def to_iso_date(value: Any) -> Optional[str]:
+    """
+    Normalise a stored date to 'YYYY-MM-DD'
+
+    Returns:
+        ISO date, or None if the value is not a recognised date
+    """
+    if not value:
+        return None
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime('%Y-%m-%d')
+    text = str(value).strip()
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(text, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    try:
+        return datetime.datetime.fromisoformat(text).strftime('%Y-%m-%d')
+    except ValueError:
+        return None
+
+
+def invoice_date_iso(date: Any, created_at: Any) -> Optional[str]:
+    """Value of invoices.date_iso: the invoice date, falling back to created_at"""
+    return to_iso_date(date) or to_iso_date(created_at)
+
+
+def to_month(value: Any) -> Optional[str]:
+    """
+    Get the 'YYYY-MM' month of a stored date
+
+    Returns:
+        Month key, or None if the value is not a recognised date
+    """
+    iso_date = to_iso_date(value)
+    return iso_date[:7] if iso_date else None
+
+
+def invoice_contribution(invoice) -> Optional[Tuple[Tuple[str, str], Dict[str, float]]]:
+    """
+    What one invoice adds to its month's rollup
+
+    The month comes from the invoice date, falling back to created_at.
+
+    Returns:
+        ((month, currency), {column: amount}) or None if the invoice has no usable date
+    """
+    month = to_month(invoice['date']) or to_month(invoice['created_at'])
+    if month is None:
+        return None
+    total = invoice['total'] or 0
+    status = invoice['status']
+    values = {'invoiced': total, 'invoice_count': 1}
+    if status == 'paid':
+        values.update(revenue_paid=total, paid_count=1)
+    elif status == 'unpaid':
+        values.update(outstanding=total, unpaid_count=1)
+    return (month, invoice['currency'] or DEFAULT_CURRENCY), values
+
+
+def expense_contribution(expense) -> Optional[Tuple[Tuple[str, str], Dict[str, float]]]:
+    """What one expense adds to its month's rollup (expenses are in the default currency)"""
+    month = to_month(expense['date'])
+    if month is None:
+        return None
+    return (month, DEFAULT_CURRENCY), {'expenses': expense['amount'] or 0, 'expense_count': 1}
+
+
+def _accumulate(totals, contributions, sign: int):
+    """Add (or with sign=-1 subtract) contributions into a per-key totals dict"""
+    for contribution in contributions:
+        if contribution is None:
+            continue
+        key, values = contribution
+        for column, value in values.items():
+            totals[key][column] += sign * value
+
+
+def apply_rollup_deltas(conn, totals: Dict[Tuple[str, str], Dict[str, float]]):
+    """Add per-(month, currency) deltas to monthly_rollups"""
+    rows = []
+    updated_at = datetime.datetime.now().isoformat()
+    for (month, currency), values in totals.items():
+        if not any(values.values()):
+            continue
+        rows.append((month, currency) + tuple(
+            int(round(values.get(c, 0))) if c in _COUNT_COLUMNS else values.get(c, 0)
+            for c in ROLLUP_COLUMNS
+        ) + (updated_at,))
+    if rows:
+        conn.executemany(
+            upsert_increment('monthly_rollups', ('month', 'currency'), ROLLUP_COLUMNS, ('updated_at',)),
+            rows
+        )
+
+
+def apply_invoice_rows(conn, before: Iterable = (), after: Iterable = ()):
+    """Apply the rollup change of invoices going from ``before`` to ``after`` rows"""
+    totals = defaultdict(lambda: defaultdict(float))
+    _accumulate(totals, (invoice_contribution(row) for row in before), -1)
+    _accumulate(totals, (invoice_contribution(row) for row in after), 1)
+    apply_rollup_deltas(conn, totals)
+
+
+def apply_expense_rows(conn, before: Iterable = (), after: Iterable = ()):
+    """Apply the rollup change of expenses going from ``before`` to ``after`` rows"""
+    totals = defaultdict(lambda: defaultdict(float))
+    _accumulate(totals, (expense_contribution(row) for row in before), -1)
+    _accumulate(totals, (expense_contribution(row) for row in after), 1)
+    apply_rollup_deltas(conn, totals)
+
+
+@contextmanager
+def track_invoices(conn, where: str, params=()):
+    """
+    Keep monthly_rollups in step with a write to invoices
+
+    The rows matching ``where`` are read before and after the block and the
+    difference is applied to the rollup in the same transaction. ``where``
+    must select by something the write does not change (usually the id).
+
+    Example:
+        with track_invoices(conn, "id = ?", (invoice_id,)):
+            conn.execute("UPDATE invoices SET status = 'paid' WHERE id = ?", (invoice_id,))
+    """
+    query = f"SELECT {_INVOICE_COLUMNS} FROM invoices WHERE {where}"
+    before = conn.execute(query, params).fetchall()
+    yield
+    after = conn.execute(query, params).fetchall()
+    apply_invoice_rows(conn, before, after)
+
+
+@contextmanager
+def track_expenses(conn, where: str, params=()):
+    """Keep monthly_rollups in step with a write to expenses (see track_invoices)"""
+    query = f"SELECT {_EXPENSE_COLUMNS} FROM expenses WHERE {where}"
+    before = conn.execute(query, params).fetchall()
+    yield
+    after = conn.execute(query, params).fetchall()
+    apply_expense_rows(conn, before, after)
+
+
+def rebuild_monthly_rollups(conn) -> int:
+    """
+    Recompute monthly_rollups from the invoices and expenses tables
+
+    Returns:
+        Number of (month, currency) rows written
+    """
+    totals = defaultdict(lambda: defaultdict(float))
+    _accumulate(totals, (invoice_contribution(row) for row in
+                         conn.execute(f"SELECT {_INVOICE_COLUMNS} FROM invoices").fetchall()), 1)
+    _accumulate(totals, (expense_contribution(row) for row in
+                         conn.execute(f"SELECT {_EXPENSE_COLUMNS} FROM expenses").fetchall()), 1)
+
+    conn.execute("DELETE FROM monthly_rollups")
+    apply_rollup_deltas(conn, totals)
+    conn.commit()
+    return len(totals)
+
+
+def get_monthly_rollups(conn, start_month: Optional[str] = None, end_month: Optional[str] = None,
+                        currency: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Rollup rows per month, summed over currencies unless one is given
+
+    Args:
+        conn: Database connection
+        start_month: First month to include ('YYYY-MM')
+        end_month: Last month to include ('YYYY-MM')
+        currency: Only include this currency
+
+    Returns:
+        List of dictionaries with month and every rollup column, oldest first
+    """
+    query = "SELECT month, " + ", ".join(f"SUM({c}) as {c}" for c in ROLLUP_COLUMNS) + \
+            " FROM monthly_rollups WHERE 1=1"
+    params = []
+    if start_month:
+        query += " AND month >= ?"
+        params.append(start_month)
+    if end_month:
+        query += " AND month <= ?"
+        params.append(end_month)
+    if currency:
+        query += " AND currency = ?"
+        params.append(currency)
+    query += " GROUP BY month ORDER BY month"
+    return [dict(row) for row in conn.execute(query, tuple(params)).fetchall()]
+
+
+def summarize_rollups(conn, start_date: Optional[str] = None,
+                      end_date: Optional[str] = None) -> Dict[str, float]:
+    """
+    Revenue, expenses and outstanding totals from the rollup
+
+    Revenue and expenses cover the calendar months spanned by start_date and
+    end_date (all months if not given); outstanding is always the current
+    total of unpaid invoices.
+
+    Returns:
+        Dictionary with revenue, expenses, profit, outstanding and counts
+    """
+    months = get_monthly_rollups(conn, to_month(start_date) if start_date else None,
+                                 to_month(end_date) if end_date else None)
+    revenue = sum(m['revenue_paid'] or 0 for m in months)
+    expenses = sum(m['expenses'] or 0 for m in months)
+    outstanding = conn.execute("SELECT SUM(outstanding) as total FROM monthly_rollups").fetchone()['total'] or 0
+    return {
+        'revenue': revenue,
+        'expenses': expenses,
+        'profit': revenue - expenses,
+        'outstanding': outstanding,
+        'paid_count': int(sum(m['paid_count'] or 0 for m in months)),
+        'invoice_count': int(sum(m['invoice_count'] or 0 for m in months)),
+        'months': len(months)
+    }
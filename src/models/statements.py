@@ -0,0 +1,157 @@
+"""
+SQL statement cache: placeholder translation and prepared statement bookkeeping
+"""
+import itertools
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List
+
+# Statements that PostgreSQL's PREPARE and MySQL's binary protocol accept
+PREPARABLE_KEYWORDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH')
+
+_statement_ids = itertools.count(1)
+
+
+@dataclass
+class CachedStatement:
+    """A parsed SQL statement, shared by every connection that runs it"""
+    sql: str  # Original text with qmark (?) placeholders
+    pyformat: str  # %s placeholders with literal % escaped, for psycopg2/mysql-connector
+    numbered: str  # $1..$n placeholders, for PostgreSQL PREPARE
+    param_count: int
+    preparable: bool
+    name: str = field(default_factory=lambda: f"stmt_{next(_statement_ids)}")
+    executions: int = 0
+    prepare_failed: bool = False
+
+    @property
+    def execute_sql(self) -> str:
+        """EXECUTE command for the PostgreSQL prepared statement (pyformat args)"""
+        if not self.param_count:
+            return f"EXECUTE {self.name}"
+        return f"EXECUTE {self.name} ({', '.join(['%s'] * self.param_count)})"
+
+
+def split_placeholders(query: str) -> List[str]:
+    """
+    Split a query on its ``?`` placeholders.
+
+    Question marks inside string literals, quoted identifiers and comments
+    are left alone, so ``WHERE note = 'why?'`` has no placeholders.
+
+    Returns:
+        The SQL fragments between placeholders (placeholder count + 1 items)
+    """
+    fragments = []
+    current = []
+    i = 0
+    length = len(query)
+
+    while i < length:
+        char = query[i]
+
+        if char in ("'", '"', '`'):
+            # Quoted literal or identifier; a doubled quote is an escaped quote
+            end = i + 1
+            while end < length:
+                if query[end] == char:
+                    if end + 1 < length and query[end + 1] == char:
+                        end += 2
+                        continue
+                    break
+                end += 1
+            current.append(query[i:end + 1])
+            i = end + 1
+        elif query.startswith('--', i):
+            end = query.find('\n', i)
+            end = length if end == -1 else end
+            current.append(query[i:end])
+            i = end
+        elif query.startswith('/*', i):
+            end = query.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            current.append(query[i:end])
+            i = end
+        elif char == '?':
+            fragments.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(char)
+            i += 1
+
+    fragments.append(''.join(current))
+    return fragments
+
+
+def parse_statement(query: str) -> CachedStatement:
+    """Translate a qmark-style query for the pyformat drivers and PREPARE"""
+    fragments = split_placeholders(query)
+    param_count = len(fragments) - 1
+
+    # psycopg2 and mysql-connector run %-formatting over the whole query
+    # (literals included) whenever parameters are passed
+    escaped = [fragment.replace('%', '%%') for fragment in fragments]
+    pyformat = '%s'.join(escaped)
+
+    numbered = fragments[0]
+    for index, fragment in enumerate(fragments[1:], start=1):
+        numbered += f"${index}{fragment}"
+
+    first_word = query.lstrip().split(None, 1)[0].upper() if query.strip() else ''
+    return CachedStatement(
+        sql=query,
+        pyformat=pyformat,
+        numbered=numbered,
+        param_count=param_count,
+        preparable=first_word in PREPARABLE_KEYWORDS
+    )
+
+
+class StatementCache:
+    """Thread-safe LRU cache of parsed statements keyed by SQL text"""
+
+    def __init__(self, max_size: int = 512):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of distinct statements kept
+        """
+        self.max_size = max(1, max_size)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, query: str) -> CachedStatement:
+        """Get the parsed statement for a query, parsing it on first use"""
+        with self._lock:
+            statement = self._entries.get(query)
+            if statement is not None:
+                self._entries.move_to_end(query)
+                self.hits += 1
+                statement.executions += 1
+                return statement
+            self.misses += 1
+
+        statement = parse_statement(query)
+        statement.executions = 1
+
+        with self._lock:
+            existing = self._entries.get(query)
+            if existing is not None:
+                return existing
+            self._entries[query] = statement
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return statement
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        """Drop all cached statements"""
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,133 @@
+"""
+Row versions and per-table generation counters for conditional requests
+
+Versioned tables carry a row_version column that goes up by one on every
+update of the row, and every tracked table has a counter in
+table_generations that changes whenever any of its rows is inserted,
+updated or deleted. Both are maintained by database triggers, so every
+writer (the Streamlit app, the API, bulk operations, cascaded deletes on
+SQLite and PostgreSQL) is covered without having to remember them.
+
+On SQLite inserts are not counted: a trigger write per inserted row made
+bulk imports about 40% slower. A new row always gets a higher rowid than
+any existing one, so table_versions() pairs the counter with MAX(rowid).
+
+The API builds ETags from these values, so it can answer a repeated
+request with 304 Not Modified after reading a counter instead of the data.
+"""
+from typing import Dict, Iterable, List, Optional
+
+from .database import get_db_type, is_sqlite
+
+# Tables with a row_version column
+VERSIONED_TABLES = ('invoices', 'clients', 'payments', 'settings')
+
+# Tables with a generation counter
+GENERATION_TABLES = VERSIONED_TABLES + ('monthly_rollups',)
+
+
+def _sqlite_triggers(table: str, versioned: bool) -> List[str]:
+    statements = []
+    if versioned:
+        # AFTER trigger writing the row again: SQLite triggers cannot assign NEW.
+        # Recursive triggers are off, and the WHEN guard would stop a second pass anyway.
+        statements.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_row_version
+            AFTER UPDATE ON {table} FOR EACH ROW WHEN NEW.row_version IS OLD.row_version
+            BEGIN
+                UPDATE {table} SET row_version = COALESCE(OLD.row_version, 0) + 1 WHERE rowid = NEW.rowid;
+            END""")
+    for event in ('UPDATE', 'DELETE'):  # inserts show up in MAX(rowid)
+        statements.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_generation_{event.lower()}
+            AFTER {event} ON {table}
+            BEGIN
+                UPDATE table_generations SET generation = generation + 1 WHERE table_name = '{table}';
+            END""")
+    return statements
+
+
+def _postgresql_triggers(table: str, versioned: bool) -> List[str]:
+    statements = [
+        """CREATE OR REPLACE FUNCTION bump_row_version() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.row_version IS NOT DISTINCT FROM OLD.row_version THEN
+                NEW.row_version := COALESCE(OLD.row_version, 0) + 1;
+            END IF;
+            RETURN NEW;
+        END $$ LANGUAGE plpgsql""",
+        """CREATE OR REPLACE FUNCTION bump_table_generation() RETURNS trigger AS $$
+        BEGIN
+            UPDATE table_generations SET generation = generation + 1 WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END $$ LANGUAGE plpgsql""",
+    ]
+    if versioned:
+        statements += [
+            f"DROP TRIGGER IF EXISTS trg_{table}_row_version ON {table}",
+            f"""CREATE TRIGGER trg_{table}_row_version BEFORE UPDATE ON {table}
+                FOR EACH ROW EXECUTE PROCEDURE bump_row_version()""",
+        ]
+    # Statement-level, so a bulk write bumps the counter once
+    statements += [
+        f"DROP TRIGGER IF EXISTS trg_{table}_generation ON {table}",
+        f"""CREATE TRIGGER trg_{table}_generation AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+            FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_generation()""",
+    ]
+    return statements
+
+
+def _mysql_triggers(table: str, versioned: bool) -> List[str]:
+    # MySQL does not fire triggers for foreign key cascades, and has no
+    # statement-level triggers, so the counter moves once per row
+    statements = []
+    if versioned:
+        statements += [
+            f"DROP TRIGGER IF EXISTS trg_{table}_row_version",
+            f"""CREATE TRIGGER trg_{table}_row_version BEFORE UPDATE ON {table} FOR EACH ROW
+                SET NEW.row_version = IF(NEW.row_version <=> OLD.row_version,
+                                         COALESCE(OLD.row_version, 0) + 1, NEW.row_version)""",
+        ]
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        name = f"trg_{table}_generation_{event.lower()}"
+        statements += [
+            f"DROP TRIGGER IF EXISTS {name}",
+            f"""CREATE TRIGGER {name} AFTER {event} ON {table} FOR EACH ROW
+                UPDATE table_generations SET generation = generation + 1 WHERE table_name = '{table}'""",
+        ]
+    return statements
+
+
+def version_trigger_statements(table: str, db_type: Optional[str] = None) -> List[str]:
+    """
+    DDL for the triggers that maintain a table's row_version and generation
+
+    Safe to run again: existing triggers are kept (SQLite) or replaced.
+    """
+    db_type = db_type or get_db_type()
+    versioned = table in VERSIONED_TABLES
+    if db_type == "postgresql":
+        return _postgresql_triggers(table, versioned)
+    if db_type == "mysql":
+        return _mysql_triggers(table, versioned)
+    return _sqlite_triggers(table, versioned)
+
+
+def table_versions(conn, tables: Iterable[str]) -> Dict[str, str]:
+    """
+    Token per table that changes whenever any of its rows changes
+
+    Returns:
+        Table name -> opaque version string
+    """
+    tables = list(tables)
+    rows = conn.execute(
+        f"SELECT table_name, generation FROM table_generations WHERE table_name IN ({', '.join('?' * len(tables))})",
+        tables
+    ).fetchall()
+    generations = {row['table_name']: row['generation'] for row in rows}
+    versions = {}
+    for table in tables:
+        version = str(generations.get(table, 0))
+        if is_sqlite():
+            version += f".{conn.execute(f'SELECT MAX(rowid) FROM {table}').fetchone()[0] or 0}"
+        versions[table] = version
+    return versions
@@ -1,4 +1,26 @@
 """
 Utility Functions
 """
-__all__ = []
+from .pdf_renderer import (
+    InvoicePdfRenderer,
+    get_invoice_renderer,
+    render_invoice_pdf,
+    invoice_content_key
+)
+from .pdf_cache import (
+    PdfCache,
+    get_pdf_cache,
+    cached_invoice_pdf,
+    invalidate_invoice_pdfs
+)
+
+__all__ = [
+    'InvoicePdfRenderer',
+    'get_invoice_renderer',
+    'render_invoice_pdf',
+    'invoice_content_key',
+    'PdfCache',
+    'get_pdf_cache',
+    'cached_invoice_pdf',
+    'invalidate_invoice_pdfs'
+]
@@ -0,0 +1,208 @@
+"""
+Rendered invoice PDF cache
+
+PDFs are stored on disk as <invoice id>__<content key>.pdf, where the content
+key (invoice_content_key) hashes everything printed on the document. The
+directory is shared by every process (Streamlit app, API, workers), so a PDF
+rendered for the dashboard is served again to the API or an email.
+
+Any change to the printed content gives a new key, so stale files are never
+served; they just age out. Status changes (which switch the watermark)
+remove the invoice's files right away via invalidate(). The directory is
+bounded by size and evicts the least recently used files first.
+"""
+import os
+import re
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from .pdf_renderer import invoice_content_key, render_invoice_pdf
+
+DEFAULT_PDF_CACHE_DIR = os.path.join(tempfile.gettempdir(), "invoice_utility_pdf_cache")
+DEFAULT_PDF_CACHE_MAX_MB = 256
+
+# Eviction trims the cache to this fraction of the limit, so it does not run on every write
+_EVICTION_TARGET = 0.9
+_KEY_LENGTH = 64
+
+
+def _safe_id(invoice_id: str) -> str:
+    """Invoice ID made safe for use in a file name"""
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(invoice_id))
+
+
+class PdfCache:
+    """Size-bounded LRU cache of rendered PDFs in a directory"""
+
+    def __init__(self, directory: str = DEFAULT_PDF_CACHE_DIR,
+                 max_bytes: int = DEFAULT_PDF_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = None  # bytes on disk, estimated between scans
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _path(self, invoice_id: str, key: str) -> str:
+        return os.path.join(self.directory, f"{_safe_id(invoice_id)}__{key}.pdf")
+
+    def _entries(self):
+        """(last used, size, path) for every cached file"""
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.pdf'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # removed by another process
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def get(self, invoice_id: str, key: str) -> Optional[bytes]:
+        """Cached PDF bytes, or None on a miss"""
+        path = self._path(invoice_id, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return data
+
+    def put(self, invoice_id: str, key: str, data: bytes):
+        """Store PDF bytes, evicting least recently used files if over the size limit"""
+        path = self._path(invoice_id, key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # atomic, so readers never see a partial file
+
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used files until under the eviction target (lock held)"""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = self.max_bytes * _EVICTION_TARGET
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+        self._size = size
+
+    def invalidate(self, invoice_ids: Iterable[str]) -> int:
+        """
+        Remove every cached PDF of the given invoices
+
+        Returns:
+            Number of files removed
+        """
+        # One directory scan for the whole set: a glob per invoice lists the
+        # directory every time, which dominated bulk payment imports
+        wanted = {_safe_id(invoice_id) for invoice_id in invoice_ids}
+        if not wanted:
+            return 0
+        removed = 0
+        for entry in os.scandir(self.directory):
+            stem, _, key = entry.name[:-len('.pdf')].rpartition('__')
+            if not entry.name.endswith('.pdf') or len(key) != _KEY_LENGTH or stem not in wanted:
+                continue
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            removed += 1
+            with self._lock:
+                if self._size is not None:
+                    self._size -= size
+        with self._lock:
+            self.invalidations += removed
+        return removed
+
+    def clear(self):
+        """Remove every cached PDF"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._size = 0
+
+    def get_or_render(self, invoice: Mapping[str, Any], settings: Mapping[str, Any],
+                      logo_path: Optional[str] = None) -> bytes:
+        """PDF bytes for an invoice, rendering and storing them on a miss"""
+        key = invoice_content_key(invoice, settings, logo_path)
+        data = self.get(invoice['id'], key)
+        if data is None:
+            data = render_invoice_pdf(invoice, settings, logo_path)
+            self.put(invoice['id'], key, data)
+        return data
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters for this process and the current size on disk"""
+        entries = self._entries()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(entries),
+                'size_bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes,
+            }
+
+
+_cache: Optional[PdfCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> PdfCache:
+    """
+    Process-wide PDF cache
+
+    Configured by PDF_CACHE_DIR (default: a directory in the system temp
+    dir) and PDF_CACHE_MAX_MB (default 256).
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = PdfCache(
+                os.getenv('PDF_CACHE_DIR', DEFAULT_PDF_CACHE_DIR),
+                int(os.getenv('PDF_CACHE_MAX_MB', str(DEFAULT_PDF_CACHE_MAX_MB))) * 1024 * 1024
+            )
+        return _cache
+
+
+def cached_invoice_pdf(invoice: Mapping[str, Any], settings: Mapping[str, Any],
+                       logo_path: Optional[str] = None) -> bytes:
+    """Invoice PDF bytes from the shared cache, rendered on a miss"""
+    return get_pdf_cache().get_or_render(invoice, settings, logo_path)
+
+
+def invalidate_invoice_pdfs(invoice_ids: Iterable[str]) -> int:
+    """Drop cached PDFs of invoices whose status changed or that were deleted"""
+    return get_pdf_cache().invalidate(invoice_ids)
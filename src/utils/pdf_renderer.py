@@ -0,0 +1,251 @@
+"""
+Invoice PDF rendering
+
+InvoicePdfRenderer builds the paragraph styles and decodes the company logo
+once, then renders any number of invoices into memory. get_invoice_renderer()
+keeps one renderer per process and replaces it when the printed settings or
+the logo file change, so callers never pay the setup cost per document.
+"""
+import ast
+import hashlib
+import io
+import json
+import os
+import threading
+from functools import lru_cache
+from typing import Any, Mapping, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import Flowable, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus.flowables import HRFlowable
+
+# Invoice fields and settings printed on the document
+PDF_INVOICE_FIELDS = ('id', 'date', 'total', 'status', 'services', 'name', 'email', 'phone')
+PDF_SETTINGS_KEYS = ('COMPANY_NAME', 'COMPANY_ADDRESS', 'COMPANY_PHONE', 'COMPANY_EMAIL', 'COMPANY_TIN', 'BANK_DETAILS')
+
+LOGO_SIZE = 60
+# The logo is stored at this many pixels per point (~300 dpi), however large the source file is
+LOGO_PIXELS_PER_POINT = 4
+
+_PRIMARY = colors.HexColor("#0057A0")
+_TERMS = ("<b>Terms & Conditions:</b><br/>1. Payment due in 7 days.<br/>"
+          "2. Late payments may incur fees.<br/>3. All transactions are final.")
+_SERVICES_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), _PRIMARY),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, 0), 'LEFT'),
+    ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('TOPPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.whitesmoke),
+    ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey)
+])
+_TOTAL_TABLE_STYLE = TableStyle([
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('BACKGROUND', (0, 0), (-1, -1), colors.HexColor("#DEEEF9")),
+    ('GRID', (0, 0), (-1, -1), 1, colors.lightgrey)
+])
+_TOP_ALIGNED = TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP')])
+
+
+@lru_cache(maxsize=1)
+def invoice_styles():
+    """Sample stylesheet plus the invoice's custom styles, built once per process"""
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='RightAlign', alignment=2))
+    styles.add(ParagraphStyle(name='TotalLabel', alignment=2, fontName='Helvetica-Bold'))
+    styles.add(ParagraphStyle(name='TotalValue', alignment=2, fontName='Helvetica-Bold', textColor=_PRIMARY))
+    return styles
+
+
+def logo_version(logo_path: Optional[str]) -> Optional[float]:
+    """Modification time of the logo, or None if there is no logo"""
+    if logo_path and os.path.exists(logo_path):
+        return os.path.getmtime(logo_path)
+    return None
+
+
+def invoice_content_key(invoice: Mapping[str, Any], settings: Mapping[str, Any],
+                        logo_path: Optional[str] = None) -> str:
+    """
+    Content hash of an invoice's PDF
+
+    Covers every invoice field and setting printed on the document plus the
+    logo version, so two invoices with the same key render identically.
+    """
+    content = {
+        'invoice': {field: invoice[field] for field in PDF_INVOICE_FIELDS},
+        'settings': {key: settings.get(key) for key in PDF_SETTINGS_KEYS},
+        'logo': logo_version(logo_path),
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _load_logo(logo_path: str) -> ImageReader:
+    """
+    Decode the logo once, scaled down to print resolution
+
+    Every document embeds the image data again, so a large source file
+    would otherwise be re-compressed for each PDF.
+    """
+    from PIL import Image as PILImage
+
+    with PILImage.open(logo_path) as source:
+        image = source.copy()
+    max_pixels = LOGO_SIZE * LOGO_PIXELS_PER_POINT
+    image.thumbnail((max_pixels, max_pixels))
+    reader = ImageReader(image)
+    reader.getRGBData()  # decode now, not concurrently on first render
+    return reader
+
+
+class _Logo(Flowable):
+    """Draws an already decoded image, so the logo is not re-read for every document"""
+
+    def __init__(self, reader: ImageReader, width: float, height: float):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+class InvoicePdfRenderer:
+    """Renders invoice PDFs for one set of company settings and logo"""
+
+    def __init__(self, settings: Mapping[str, Any], logo_path: Optional[str] = None):
+        self.settings = {key: settings.get(key) for key in PDF_SETTINGS_KEYS}
+        self.logo_path = logo_path
+        self.logo_mtime = logo_version(logo_path)
+        self.styles = invoice_styles()
+
+        self._logo = _load_logo(logo_path) if self.logo_mtime is not None else None
+
+        s = {key: value or '' for key, value in self.settings.items()}
+        self._company_html = (f"<b>{s['COMPANY_NAME']}</b><br/>{s['COMPANY_ADDRESS']}<br/>"
+                              f"{s['COMPANY_PHONE']} | {s['COMPANY_EMAIL']}<br/>{s['COMPANY_TIN']}")
+        self._bank_details_html = s['BANK_DETAILS']
+
+    def is_current(self, settings: Mapping[str, Any], logo_path: Optional[str]) -> bool:
+        """Whether this renderer still matches the given settings and logo file"""
+        return (logo_path == self.logo_path
+                and logo_version(logo_path) == self.logo_mtime
+                and all(settings.get(key) == self.settings[key] for key in PDF_SETTINGS_KEYS))
+
+    def render(self, invoice: Mapping[str, Any]) -> bytes:
+        """Render one invoice and return the PDF bytes"""
+        buffer = io.BytesIO()
+        self.render_to(invoice, buffer)
+        return buffer.getvalue()
+
+    def render_to(self, invoice: Mapping[str, Any], stream):
+        """Render one invoice into a binary file-like object"""
+        styles = self.styles
+        # invariant: no creation timestamp or random document ID, so the same
+        # content always gives the same bytes (the API's PDF ETags rely on it)
+        doc = SimpleDocTemplate(stream, pagesize=A4, rightMargin=2*cm, leftMargin=2*cm,
+                                topMargin=2*cm, bottomMargin=2*cm, invariant=True)
+        elements = []
+
+        logo = _Logo(self._logo, LOGO_SIZE, LOGO_SIZE) if self._logo else ''
+        header_table = Table([[logo, Paragraph(self._company_html, styles['RightAlign'])]],
+                             colWidths=[10*cm, 7.5*cm])
+        header_table.setStyle(_TOP_ALIGNED)
+        elements.append(header_table)
+
+        elements.append(Spacer(1, 1*cm))
+        elements.append(Paragraph("INVOICE", styles['h1']))
+        elements.append(HRFlowable(width="100%", thickness=1, color=colors.grey))
+        elements.append(Spacer(1, 0.5*cm))
+
+        status_html = ("<font color='green'><b>PAID</b></font>" if invoice['status'] == 'paid'
+                       else "<font color='red'><b>UNPAID</b></font>")
+        details_table = Table([[
+            Paragraph(f"<b>Bill To:</b><br/>{invoice['name']}<br/>{invoice['email'] or ''}<br/>{invoice['phone'] or ''}",
+                      styles['Normal']),
+            Paragraph(f"<b>Invoice ID:</b> {invoice['id']}<br/><b>Date:</b> {invoice['date']}<br/><b>Status:</b> {status_html}",
+                      styles['RightAlign'])
+        ]], colWidths=[9*cm, 8.5*cm])
+        details_table.setStyle(_TOP_ALIGNED)
+        elements.append(details_table)
+        elements.append(Spacer(1, 1*cm))
+
+        data = [["SERVICE DESCRIPTION", "PRICE"]]
+        for service, price in parse_services(invoice['services']):
+            data.append([Paragraph(service, styles['Normal']), f"${price:,.2f}"])
+        services_table = Table(data, colWidths=[14*cm, 3.5*cm], repeatRows=1)
+        services_table.setStyle(_SERVICES_TABLE_STYLE)
+        elements.append(services_table)
+
+        total_table = Table([[Paragraph("TOTAL:", styles['TotalLabel']),
+                              Paragraph(f"${invoice['total']:,.2f}", styles['TotalValue'])]],
+                            colWidths=[14*cm, 3.5*cm])
+        total_table.setStyle(_TOTAL_TABLE_STYLE)
+        elements.append(total_table)
+        elements.append(Spacer(1, 1.5*cm))
+
+        payment_terms_table = Table([[Paragraph(self._bank_details_html, styles['Normal']),
+                                      Paragraph(_TERMS, styles['Normal'])]],
+                                    colWidths=[8.5*cm, 9*cm])
+        payment_terms_table.setStyle(_TOP_ALIGNED)
+        elements.append(payment_terms_table)
+        elements.append(Spacer(1, 1*cm))
+        elements.append(Paragraph("Thank you for your business!", styles['Italic']))
+
+        status = invoice['status']
+
+        def add_watermark(canvas, doc):
+            canvas.saveState()
+            canvas.setFont("Helvetica-Bold", 100)
+            canvas.setFillColor(colors.green if status == 'paid' else colors.red, alpha=0.1)
+            canvas.translate(A4[0]/2, A4[1]/2)
+            canvas.rotate(45)
+            canvas.drawCentredString(0, 0, status.upper())
+            canvas.restoreState()
+
+        doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
+
+
+def parse_services(services):
+    """Parse the stored services list, substituting a placeholder row if it is corrupt"""
+    try:
+        parsed = ast.literal_eval(services)
+        if not isinstance(parsed, list):
+            return [("Error parsing services", 0.0)]
+        return parsed
+    except (ValueError, SyntaxError):
+        return [("Error: Service data is corrupt.", 0.0)]
+
+
+_renderer: Optional[InvoicePdfRenderer] = None
+_renderer_lock = threading.Lock()
+
+
+def get_invoice_renderer(settings: Mapping[str, Any], logo_path: Optional[str] = None) -> InvoicePdfRenderer:
+    """
+    Process-wide renderer for the given settings and logo
+
+    The renderer is rebuilt only when a printed setting or the logo file
+    changes.
+    """
+    global _renderer
+    with _renderer_lock:
+        if _renderer is None or not _renderer.is_current(settings, logo_path):
+            _renderer = InvoicePdfRenderer(settings, logo_path)
+        return _renderer
+
+
+def render_invoice_pdf(invoice: Mapping[str, Any], settings: Mapping[str, Any],
+                       logo_path: Optional[str] = None) -> bytes:
+    """Render an invoice to PDF bytes with the shared renderer"""
+    return get_invoice_renderer(settings, logo_path).render(invoice)
@@ -1,3 +1,39 @@
 """
 Test Suite
+
+Shared helpers for the tests that run against a temporary SQLite database.
 """
+import os
+import tempfile
+from typing import List
+
+from src.models import database
+from src.models.db_schema import init_enhanced_schema
+
+ORIGINAL_DB_NAME = database.db_config.db_name
+
+# Files made by use_temp_database, deleted by restore_database
+_temp_databases: List[str] = []
+
+
+def use_temp_database(schema: bool = True) -> str:
+    """Point the database layer at a new temporary SQLite file, with the full schema unless ``schema`` is False"""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    _temp_databases.append(path)
+    database.close_all_connections()
+    database.db_config.db_name = path
+    if schema:
+        init_enhanced_schema()
+    return path
+
+
+def restore_database():
+    """Close connections, delete the temporary databases and restore the configured one"""
+    database.close_all_connections()
+    database.db_config.db_name = ORIGINAL_DB_NAME
+    while _temp_databases:
+        path = _temp_databases.pop()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
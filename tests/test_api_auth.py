@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for cached API key authentication
+"""
+import sys
+import os
+import time
+from contextlib import contextmanager
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.db_schema import run_migrations
+from src.api.auth import ApiKeyCache, hash_api_key
+from tests import restore_database, use_temp_database
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+
+
+class CountingConnections:
+    """Connection factory that counts checkouts"""
+
+    def __init__(self):
+        self.count = 0
+
+    @contextmanager
+    def __call__(self):
+        self.count += 1
+        with database.get_db_connection() as conn:
+            yield conn
+
+
+def test_cached_authentication():
+    """Valid and invalid keys are served from the cache until their entry expires"""
+    print("Testing cached authentication...")
+    use_temp_database()
+    connections = CountingConnections()
+    cache = ApiKeyCache(connections, ttl=60, negative_ttl=60, flush_interval=3600)
+    with database.get_db_connection() as conn:
+        key = cache.create(conn, 'Test', 'admin')
+        conn.commit()
+        stored = conn.execute("SELECT key_hash, key_prefix FROM api_keys").fetchone()
+    assert stored['key_hash'] == hash_api_key(key['api_key']) and key['api_key'] not in stored
+
+    for _ in range(3):
+        assert cache.authenticate(key['api_key'])['description'] == 'Test'
+        assert cache.authenticate('not-a-key') is None
+    assert connections.count == 2
+    assert cache.stats()['hits'] == 4
+    cache.stop()
+    print("✓ 6 lookups, 2 database queries")
+
+
+def test_revocation_window():
+    """Revocation is immediate in the revoking process and bounded by the TTL elsewhere"""
+    print("\nTesting revocation...")
+    use_temp_database()
+    revoking = ApiKeyCache(database.get_db_connection, ttl=60, flush_interval=3600)
+    other = ApiKeyCache(database.get_db_connection, ttl=0.2, flush_interval=3600)
+    with database.get_db_connection() as conn:
+        api_key = revoking.create(conn, 'Test', 'admin')['api_key']
+        conn.commit()
+    assert revoking.authenticate(api_key) and other.authenticate(api_key)
+
+    with database.get_db_connection() as conn:
+        assert revoking.revoke(conn, api_key)
+    assert revoking.authenticate(api_key) is None
+    assert other.authenticate(api_key) is not None  # still cached
+    time.sleep(0.25)
+    assert other.authenticate(api_key) is None
+    revoking.stop()
+    other.stop()
+    print("✓ Revoked key rejected within the TTL")
+
+
+def test_last_used_batched():
+    """last_used timestamps are written in one flush, not per request"""
+    print("\nTesting batched last_used...")
+    use_temp_database()
+    cache = ApiKeyCache(database.get_db_connection, flush_interval=3600)
+    with database.get_db_connection() as conn:
+        keys = [cache.create(conn, f"Key {i}", 'admin')['api_key'] for i in range(3)]
+        conn.commit()
+    for api_key in keys * 5:
+        cache.authenticate(api_key)
+
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM api_keys WHERE last_used IS NOT NULL").fetchone()[0] == 0
+        assert cache.flush() == 3
+        assert conn.execute("SELECT COUNT(*) FROM api_keys WHERE last_used IS NOT NULL").fetchone()[0] == 3
+    assert cache.flush() == 0
+    cache.stop()
+    print("✓ 15 requests, one flush of 3 rows")
+
+
+def test_legacy_keys_migrated():
+    """Plain-text keys from older databases keep working after being hashed"""
+    print("\nTesting legacy key migration...")
+    use_temp_database()
+    with database.get_db_connection() as conn:
+        conn.execute("DROP TABLE api_keys")
+        conn.execute("""CREATE TABLE api_keys (key TEXT PRIMARY KEY, description TEXT, is_active INTEGER DEFAULT 1,
+                        created_at TEXT NOT NULL, created_by TEXT NOT NULL, last_used TEXT)""")
+        conn.execute("INSERT INTO api_keys (key, description, created_at, created_by) VALUES ('legacy-key-123', 'Old', '2026', 'admin')")
+        conn.execute("DELETE FROM schema_migrations WHERE version = 8")
+        conn.commit()
+        assert run_migrations(conn) == [8]
+        row = conn.execute("SELECT * FROM api_keys").fetchone()
+    assert 'key' not in row.keys() and row['key_prefix'] == 'legacy-k'
+
+    cache = ApiKeyCache(database.get_db_connection, flush_interval=3600)
+    assert cache.authenticate('legacy-key-123')['description'] == 'Old'
+    cache.stop()
+    print("✓ Legacy key hashed and still accepted")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("API Key Authentication Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_cached_authentication,
+        test_revocation_window,
+        test_last_used_batched,
+        test_legacy_keys_migrated,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch create endpoints of the REST API
+"""
+import sys
+import os
+import json
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.api import api
+from tests import restore_database, use_temp_database
+
+
+def use_api_database():
+    """Fresh schema with one client, one invoice and an API key"""
+    use_temp_database()
+    api.api_key_cache.invalidate()
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, email, created_at) VALUES ('C1', 'Acme', 'a@example.com', '2026-01-01')")
+        conn.execute("""INSERT INTO invoices (id, client_id, services, total, status, date, date_iso, created_at)
+                        VALUES ('INV-1', 'C1', '[]', 100.0, 'unpaid', '', '2026-01-05', '2026-01-05')""")
+        api_key = api.api_key_cache.create(conn, 'Test', 'admin')['api_key']
+        conn.commit()
+    return api.app.test_client(), {'X-API-Key': api_key}
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    api.api_key_cache.stop()
+    restore_database()
+
+
+def test_batch_clients_and_invoices():
+    """Valid items are created across transaction chunks; bad ones are reported by index"""
+    print("Testing batch clients and invoices...")
+    client, headers = use_api_database()
+    transaction_size = api.API_BATCH_TRANSACTION_SIZE
+    api.API_BATCH_TRANSACTION_SIZE = 4
+    try:
+        clients = [{'name': f'Client {i}'} for i in range(10)]
+        clients[6] = {'email': 'nameless@example.com'}
+        response = client.post('/api/v1/batch/clients', json=clients, headers=headers)
+        body = json.loads(response.data)
+        assert response.status_code == 200 and body['created_count'] == 9 and body['error_count'] == 1
+        assert [r['index'] for r in body['results']] == list(range(10))
+        assert body['results'][6]['status'] == 'error'
+
+        invoices = [{'client_id': 'C1', 'services': ['Design'], 'amounts': [50.0 + i]} for i in range(6)]
+        invoices[2] = {'client_id': 'C1', 'services': ['Design']}
+        response = client.post('/api/v1/batch/invoices', json={'items': invoices}, headers=headers)
+        body = json.loads(response.data)
+        assert body['created_count'] == 5 and body['results'][2]['status'] == 'error', body
+    finally:
+        api.API_BATCH_TRANSACTION_SIZE = transaction_size
+
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0] == 10
+        assert conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 6
+    print("✓ 9 clients and 5 invoices created in chunks of 4")
+
+
+def test_batch_payments_ndjson():
+    """NDJSON payments update each invoice's status once, after all its payments"""
+    print("\nTesting batch payments...")
+    client, headers = use_api_database()
+    lines = [
+        {'invoice_id': 'INV-1', 'amount': 40, 'date': '2026-01-06', 'method': 'Cash'},
+        {'invoice_id': 'INV-404', 'amount': 10, 'date': '2026-01-06', 'method': 'Cash'},
+        {'invoice_id': 'INV-1', 'amount': -5, 'date': '2026-01-06', 'method': 'Cash'},
+        {'invoice_id': 'INV-1', 'amount': 60, 'date': '2026-01-07', 'method': 'Bank'},
+    ]
+    response = client.post('/api/v1/batch/payments', data='\n'.join(json.dumps(l) for l in lines) + '\n',
+                           content_type='application/x-ndjson', headers=headers)
+    body = json.loads(response.data)
+    assert [r['status'] for r in body['results']] == ['created', 'error', 'error', 'created'], body
+    assert body['results'][1]['error'] == 'Invoice not found'
+
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT status FROM invoices WHERE id = 'INV-1'").fetchone()[0] == 'paid'
+        assert conn.execute("SELECT SUM(amount) FROM payments").fetchone()[0] == 100
+    print("✓ 2 of 4 payments recorded, invoice marked paid")
+
+
+def test_batch_limits():
+    """Malformed bodies get 400; too many items or bytes get 413"""
+    print("\nTesting batch limits...")
+    client, headers = use_api_database()
+    bad = [('{"name": ', 'application/json'), ('[1, 2]', 'application/json'),
+           ('{"name": "A"}\n{oops', 'application/x-ndjson'), ('{"items": 3}', 'application/json')]
+    for data, content_type in bad:
+        response = client.post('/api/v1/batch/clients', data=data, content_type=content_type, headers=headers)
+        assert response.status_code == 400, data
+
+    max_items, max_bytes = api.API_BATCH_MAX_ITEMS, api.API_BATCH_MAX_BYTES
+    try:
+        api.API_BATCH_MAX_ITEMS = 3
+        response = client.post('/api/v1/batch/clients', json=[{'name': 'A'}] * 4, headers=headers)
+        assert response.status_code == 413
+        api.API_BATCH_MAX_BYTES = 64
+        response = client.post('/api/v1/batch/clients', json=[{'name': 'A' * 100}], headers=headers)
+        assert response.status_code == 413
+    finally:
+        api.API_BATCH_MAX_ITEMS, api.API_BATCH_MAX_BYTES = max_items, max_bytes
+
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM clients").fetchone()[0] == 1
+    print("✓ Rejected without writing anything")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("API Batch Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_batch_clients_and_invoices,
+        test_batch_payments_ndjson,
+        test_batch_limits,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
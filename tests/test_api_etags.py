@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Test script for row versions, table generations and conditional GETs in the REST API
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.rollups import rebuild_monthly_rollups
+from src.models.versions import table_versions
+from src.api import api
+from src.utils.pdf_cache import get_pdf_cache
+from tests import restore_database, use_temp_database
+
+
+def use_api_database():
+    """Fresh schema with one client, two invoices and an API key"""
+    use_temp_database()
+    api.api_key_cache.invalidate()
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, email, created_at) VALUES ('C1', 'Acme', 'a@example.com', '2026-01-01')")
+        conn.executemany(
+            """INSERT INTO invoices (id, client_id, services, total, status, date, date_iso, created_at)
+               VALUES (?, 'C1', ?, 100.0, 'unpaid', '05 January 2026', '2026-01-05', '2026-01-05T10:00:00')""",
+            [('INV-1', str([('Design', 100.0)])), ('INV-2', str([('Build', 100.0)]))]
+        )
+        api_key = api.api_key_cache.create(conn, 'Test', 'admin')['api_key']
+        conn.commit()
+    return api.app.test_client(), {'X-API-Key': api_key}
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    api.api_key_cache.stop()
+    restore_database()
+
+
+def revalidate(client, headers, path, etag):
+    """Status of a conditional GET for ``path`` with ``etag``"""
+    with client.get(path, headers={**headers, 'If-None-Match': etag}) as response:
+        return response.status_code
+
+
+def test_versions_follow_writes():
+    """Updates bump row_version; inserts, updates and cascaded deletes change table versions"""
+    print("Testing row versions and table generations...")
+    use_api_database()
+    seen = []
+    with database.get_db_connection() as conn:
+        def snapshot():
+            seen.append(table_versions(conn, ['invoices', 'clients', 'payments']))
+
+        snapshot()
+        conn.execute("UPDATE invoices SET status = 'paid' WHERE id = 'INV-1'")
+        conn.execute("UPDATE invoices SET total = 5 WHERE id = 'INV-1'")
+        assert conn.execute("SELECT row_version FROM invoices WHERE id = 'INV-1'").fetchone()[0] == 3
+        assert conn.execute("SELECT row_version FROM invoices WHERE id = 'INV-2'").fetchone()[0] == 1
+        snapshot()
+        conn.execute("INSERT INTO payments (id, invoice_id, amount, created_at) VALUES ('P1', 'INV-2', 10, '2026-01-06')")
+        snapshot()
+        conn.execute("DELETE FROM clients WHERE id = 'C1'")  # cascades to invoices and payments
+        snapshot()
+        conn.commit()
+
+    assert seen[0]['invoices'] != seen[1]['invoices'] and seen[0]['clients'] == seen[1]['clients']
+    assert seen[1]['payments'] != seen[2]['payments'] and seen[1]['clients'] == seen[2]['clients']
+    assert seen[1]['invoices'] != seen[2]['invoices']  # the payment updated amount_paid
+    assert all(seen[2][table] != seen[3][table] for table in ('invoices', 'clients', 'payments'))
+    print("✓ Versions move with every write, including cascades")
+
+
+def test_conditional_get():
+    """Unchanged resources answer If-None-Match with 304; any change gives a new ETag"""
+    print("\nTesting conditional GETs...")
+    client, headers = use_api_database()
+    paths = ['/api/v1/invoices/INV-1', '/api/v1/clients/C1', '/api/v1/clients',
+             '/api/v1/invoices?fields=id,total', '/api/v1/reports/summary']
+    etags = {}
+    for path in paths:
+        with client.get(path, headers=headers) as response:
+            assert response.status_code == 200 and response.headers['ETag'], path
+            etags[path] = response.headers['ETag']
+        assert revalidate(client, headers, path, etags[path]) == 304, path
+    assert len(set(etags.values())) == len(paths), etags
+
+    # Same path, different representation
+    assert revalidate(client, headers, '/api/v1/invoices?fields=id', etags['/api/v1/invoices?fields=id,total']) == 200
+
+    # A client rename reaches the invoice (client_name) and both client views, but not the summary
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE clients SET name = 'Acme Ltd' WHERE id = 'C1'")
+        conn.commit()
+    changed = [path for path in paths if revalidate(client, headers, path, etags[path]) == 200]
+    assert changed == paths[:4], changed
+
+    with database.get_db_connection() as conn:
+        rebuild_monthly_rollups(conn)
+        conn.commit()
+    assert revalidate(client, headers, '/api/v1/reports/summary', etags['/api/v1/reports/summary']) == 200
+    print("✓ 304 while unchanged, 200 with a new ETag after writes")
+
+
+def test_pdf_not_rerendered():
+    """A current PDF ETag is answered without rendering; a status change makes a new one"""
+    print("\nTesting PDF ETags...")
+    client, headers = use_api_database()
+    path = '/api/v1/invoices/INV-2/pdf'
+    response = client.get(path, headers=headers)
+    etag = response.headers['ETag']
+    assert response.status_code == 200 and response.data.startswith(b'%PDF-')
+
+    cache = get_pdf_cache()
+    lookups = cache.hits + cache.misses
+    assert revalidate(client, headers, path, etag) == 304
+    assert cache.hits + cache.misses == lookups
+
+    with database.get_db_connection() as conn:
+        conn.execute("UPDATE invoices SET status = 'paid' WHERE id = 'INV-2'")
+        conn.commit()
+    response = client.get(path, headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    print("✓ 304 without touching the renderer or cache")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("API ETag Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_versions_follow_writes,
+        test_conditional_get,
+        test_pdf_not_rerendered,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
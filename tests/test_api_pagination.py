@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script for keyset pagination and streamed list responses in the REST API
+"""
+import sys
+import os
+import json
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database, iter_rows
+from src.api import api
+from tests import restore_database, use_temp_database
+
+
+def use_api_database(invoices=25):
+    """Fresh schema with three clients, invoices on a few dates, and an API key"""
+    use_temp_database()
+    api.api_key_cache.invalidate()
+    with database.get_db_connection() as conn:
+        conn.executemany("INSERT INTO clients (id, name, email, created_at) VALUES (?, ?, ?, '2026-01-01')",
+                         [('C1', 'Beta', 'b@example.com'), ('C2', 'Alpha', 'a@example.com'),
+                          ('C3', 'Alpha', 'a2@example.com')])
+        conn.executemany(
+            """INSERT INTO invoices (id, client_id, services, total, status, date, date_iso, created_at)
+               VALUES (?, ?, '[]', ?, ?, '', ?, '2026-01-01')""",
+            [(f"INV-{i:03d}", 'C1' if i % 2 else 'C2', float(i), 'paid' if i % 3 == 0 else 'unpaid',
+              f"2026-01-{1 + i % 5:02d}") for i in range(invoices)]
+        )
+        api_key = api.api_key_cache.create(conn, 'Test', 'admin')['api_key']
+        conn.commit()
+    return api.app.test_client(), {'X-API-Key': api_key}
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    api.api_key_cache.stop()
+    restore_database()
+
+
+def fetch_all(client, headers, path, **params):
+    """Follow next_cursor through every page of a list endpoint"""
+    rows, pages = [], 0
+    while True:
+        response = client.get(path, query_string=params, headers=headers)
+        assert response.status_code == 200, response.data
+        body = json.loads(response.data)
+        rows.extend(body['data'])
+        pages += 1
+        assert body['count'] == len(body['data'])
+        if not body['next_cursor']:
+            return rows, pages
+        params['after'] = body['next_cursor']
+
+
+def test_keyset_pages():
+    """Paging with after= returns every invoice once, in (date, id) descending order"""
+    print("Testing keyset pagination...")
+    client, headers = use_api_database()
+    rows, pages = fetch_all(client, headers, '/api/v1/invoices', limit=10)
+    keys = [(r['date_iso'], r['id']) for r in rows]
+    assert len(rows) == 25 and pages == 3
+    assert keys == sorted(keys, reverse=True) and len(set(keys)) == 25
+
+    clients, _ = fetch_all(client, headers, '/api/v1/clients', limit=1)
+    assert [c['id'] for c in clients] == ['C2', 'C3', 'C1']
+    print("✓ 25 invoices over 3 pages, clients ordered by (name, id)")
+
+
+def test_filters_and_fields():
+    """Date range and status filters combine with the fields= projection"""
+    print("\nTesting filters and fields...")
+    client, headers = use_api_database()
+    rows, _ = fetch_all(client, headers, '/api/v1/invoices', limit=4, status='unpaid',
+                        date_from='2026-01-02', date_to='2026-01-03', fields='id,total,client_name')
+    expected = [i for i in range(25) if i % 3 and 1 + i % 5 in (2, 3)]
+    assert sorted(r['id'] for r in rows) == sorted(f"INV-{i:03d}" for i in expected)
+    assert all(set(r) == {'id', 'total', 'client_name'} for r in rows)
+
+    for params in ({'fields': 'id,secret'}, {'limit': '0'}, {'date_from': '01/02/2026'}, {'after': 'bogus'}):
+        response = client.get('/api/v1/invoices', query_string=params, headers=headers)
+        assert response.status_code == 400, params
+    print("✓", len(rows), "invoices matched; bad parameters rejected with 400")
+
+
+def test_undated_invoices_paged():
+    """Invoices without a date_iso come last and later pages still reach them"""
+    print("\nTesting undated invoices...")
+    client, headers = use_api_database(invoices=5)
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            """INSERT INTO invoices (id, client_id, services, total, status, date, date_iso, created_at)
+               VALUES (?, 'C1', '[]', 1.0, 'unpaid', 'someday', NULL, 'unknown')""",
+            [(f"OLD-{i}",) for i in range(3)]
+        )
+        conn.commit()
+        plan = ' '.join(row[-1] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM invoices i ORDER BY COALESCE(i.date_iso, '') DESC, i.id DESC"))
+        assert 'idx_invoices_sort_date_id' in plan, plan
+
+    # limit=2 ends the third page on an undated invoice, so that cursor holds NULL
+    rows, pages = fetch_all(client, headers, '/api/v1/invoices', limit=2)
+    assert [r['id'] for r in rows[-3:]] == ['OLD-2', 'OLD-1', 'OLD-0'] and len(rows) == 8 and pages == 4
+
+    dated, _ = fetch_all(client, headers, '/api/v1/invoices', limit=2, date_to='2026-12-31')
+    assert len(dated) == 5
+    print("✓ 3 undated invoices paged after the 5 dated ones")
+
+
+def test_ndjson_stream():
+    """format=ndjson streams one row per line, unpaged unless limit is given"""
+    print("\nTesting NDJSON...")
+    client, headers = use_api_database(invoices=250)
+    response = client.get('/api/v1/invoices?format=ndjson&fields=id', headers=headers)
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    assert not response.is_sequence  # streamed, not buffered
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 250 and all(set(line) == {'id'} for line in lines)
+
+    response = client.get('/api/v1/clients?limit=2', headers={**headers, 'Accept': 'application/x-ndjson'})
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 3 and 'next_cursor' in lines[-1]
+    print("✓ 250 invoices streamed as NDJSON")
+
+
+def test_iter_rows_batches():
+    """iter_rows reads a result in batches and leaves the connection usable"""
+    print("\nTesting iter_rows...")
+    use_api_database(invoices=1200)
+    with database.get_db_connection() as conn:
+        ids = [row['id'] for row in iter_rows(conn, "SELECT id FROM invoices ORDER BY id", batch_size=100)]
+        rows = iter_rows(conn, "SELECT id FROM invoices WHERE total > ?", (10,))
+        next(rows)
+        rows.close()
+        assert conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 1200
+    assert ids == sorted(ids) and len(ids) == 1200
+    print("✓ 1200 rows iterated")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("API Pagination Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_keyset_pages,
+        test_filters_and_fields,
+        test_undated_invoices_paged,
+        test_ndjson_stream,
+        test_iter_rows_batches,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
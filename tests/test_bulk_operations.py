@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test script for bulk operations against a real (temporary) database
+"""
+import sys
+import os
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.business.bulk_operations import BulkInvoiceOperations, BulkReporting
+from tests import restore_database, use_temp_database
+
+
+def use_seeded_database(clients=3):
+    """Point the database layer at a fresh schema with a few clients"""
+    path = use_temp_database()
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO clients (id, name, email, created_at) VALUES (?, ?, ?, '2026-01-01')",
+            [(f"C{i}", f"Client {i}", f"c{i}@example.com") for i in range(clients)]
+        )
+        conn.commit()
+    return path
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+
+
+def test_bulk_create_invoices():
+    """Valid rows are inserted in chunks; bad rows are reported by index"""
+    print("Testing bulk invoice creation...")
+    use_seeded_database()
+
+    rows = [
+        {'client_id': f"C{i % 3}", 'services': ['Work'], 'amounts': [100.0], 'tax_rate': 10}
+        for i in range(25)
+    ]
+    rows[3] = {'client_id': 'C0', 'services': ['Work']}  # fails validation
+    rows[17]['client_id'] = 'MISSING'  # fails the foreign key in its chunk
+
+    with database.get_db_connection() as conn:
+        result = BulkInvoiceOperations.bulk_create_invoices(conn, rows, chunk_size=10)
+
+    assert result['created_count'] == 23
+    assert result['error_count'] == 2
+    assert [e['index'] for e in result['errors']] == [3, 17]
+    assert result['errors'][0]['error'] == "Missing required field: amounts"
+    assert result['errors'][1]['data'] is rows[17]
+    assert all(abs(inv['total'] - 110.0) < 1e-9 for inv in result['created_invoices'])
+    assert len({inv['id'] for inv in result['created_invoices']}) == 23
+
+    with database.get_db_connection() as conn:
+        count = conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0]
+        stored = conn.execute(
+            "SELECT amounts, tax_amount, status FROM invoices WHERE id = ?",
+            (result['created_invoices'][0]['id'],)
+        ).fetchone()
+    assert count == 23
+    assert stored['amounts'] == "[100.0]" and stored['status'] == 'unpaid'
+    assert abs(stored['tax_amount'] - 10.0) < 1e-9
+    print("✓ Chunked insert keeps per-row error reporting")
+
+
+def test_bulk_update_and_delete():
+    """Set-based update/delete report missing ids exactly like the per-row loop"""
+    print("\nTesting bulk status update and delete...")
+    use_seeded_database()
+
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, total, status, created_at) VALUES (?, 'C0', 10.0, 'unpaid', '2026-01-01')",
+            [(f"INV-{i}",) for i in range(1200)]
+        )
+        conn.executemany(
+            "INSERT INTO payments (id, invoice_id, amount, date, method, created_at) VALUES (?, ?, 5.0, '2026-01-02', 'Cash', '2026-01-02')",
+            [(f"PAY-{i}", f"INV-{i}") for i in range(1200)]
+        )
+        conn.commit()
+
+        ids = [f"INV-{i}" for i in range(1100)] + ['NOPE-1', 'INV-5', 'NOPE-2']
+        result = BulkInvoiceOperations.bulk_update_status(conn, ids, 'paid')
+        assert result['updated_count'] == 1101
+        assert result['errors'] == [
+            {'invoice_id': 'NOPE-1', 'error': 'Invoice not found'},
+            {'invoice_id': 'NOPE-2', 'error': 'Invoice not found'},
+        ]
+        paid = conn.execute("SELECT COUNT(*) FROM invoices WHERE status = 'paid'").fetchone()[0]
+        assert paid == 1100
+
+        result = BulkInvoiceOperations.bulk_delete_invoices(conn, ids)
+        assert result['deleted_count'] == 1100
+        assert [e['invoice_id'] for e in result['errors']] == ['NOPE-1', 'INV-5', 'NOPE-2']
+        assert conn.execute("SELECT COUNT(*) FROM invoices").fetchone()[0] == 100
+        assert conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == 100
+    print("✓ Chunked IN-list update and delete")
+
+
+def test_generate_bulk_report():
+    """Grouped report matches per-invoice totals and keeps request order"""
+    print("\nTesting bulk report...")
+    use_seeded_database()
+
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, total, status, created_at) VALUES (?, ?, 100.0, 'unpaid', '2026-01-01')",
+            [(f"INV-{i}", f"C{i % 3}") for i in range(600)]
+        )
+        conn.executemany(
+            "INSERT INTO payments (id, invoice_id, amount, date, method, created_at) VALUES (?, ?, 30.0, '2026-01-02', 'Cash', '2026-01-02')",
+            [(f"PAY-{i}-{n}", f"INV-{i}") for i in range(0, 600, 2) for n in range(2)]
+        )
+        conn.commit()
+
+        ids = ['INV-599', 'MISSING'] + [f"INV-{i}" for i in range(600)]
+        report = BulkReporting.generate_bulk_report(conn, ids)
+        assert report['total_invoices'] == 601
+        assert [d['id'] for d in report['invoice_details'][:3]] == ['INV-599', 'INV-0', 'INV-1']
+        assert report['invoice_details'][1]['paid'] == 60.0
+        assert report['invoice_details'][1]['outstanding'] == 40.0
+        assert report['invoice_details'][1]['client_name'] == 'Client 0'
+        assert report['total_amount'] == 60100.0
+        assert report['total_paid'] == 300 * 60.0
+
+        summary = BulkReporting.generate_bulk_report(conn, ids, include_details=False)
+        assert 'invoice_details' not in summary
+        assert summary['total_outstanding'] == report['total_outstanding']
+    print("✓ Single grouped query per chunk")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("Bulk Operations Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_bulk_create_invoices,
+        test_bulk_update_and_delete,
+        test_generate_bulk_report,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
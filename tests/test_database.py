@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Test script for the database layer (connection pooling)
+"""
+import sys
+import os
+import datetime
+import re
+import time
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.db_schema import run_migrations
+from src.models.pool import ConnectionPool, PoolTimeoutError
+from src.models.statements import StatementCache, parse_statement
+from src.business.business_logic import InvoiceReminder
+from tests import restore_database, use_temp_database
+
+ORIGINAL_SQLITE_PROFILE = database.db_config.sqlite_profile
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+
+
+def test_sqlite_connection_reused():
+    """Sequential checkouts should reuse the same configured connection"""
+    print("Testing SQLite connection reuse...")
+    use_temp_database(schema=False)
+
+    with database.get_db_connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+    with database.get_db_connection() as conn:
+        assert conn is first
+    print("✓ Pooled connection reused with PRAGMAs applied")
+
+
+def test_sqlite_uncommitted_work_rolled_back():
+    """Uncommitted writes must not leak to the next borrower"""
+    print("\nTesting rollback on checkin...")
+    use_temp_database(schema=False)
+
+    with database.get_db_connection() as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.commit()
+        conn.execute("INSERT INTO t VALUES (1)")
+    with database.get_db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+    print("✓ Uncommitted work discarded on checkin")
+
+
+def test_sqlite_concurrent_profile():
+    """The concurrent profile switches the database to WAL with tuned PRAGMAs"""
+    print("\nTesting SQLite concurrent profile...")
+    use_temp_database(schema=False)
+    database.db_config.sqlite_profile = "concurrent"
+    try:
+        with database.get_db_connection() as conn:
+            assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+            assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+            assert conn.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+    finally:
+        database.db_config.sqlite_profile = ORIGINAL_SQLITE_PROFILE
+        database.close_all_connections()
+    print("✓ WAL profile applied")
+
+
+def test_pool_limits_and_health_checks():
+    """Pool honours max size, overflow idle timeout and pre-ping health checks"""
+    print("\nTesting pool limits...")
+    path = use_temp_database(schema=False)
+
+    pool = ConnectionPool(database._create_sqlite_connection, pool_size=0, max_overflow=1,
+                          timeout=0.05, idle_timeout=0.05,
+                          validate=database._validate_sqlite_connection)
+    conn = pool.acquire()
+    try:
+        pool.acquire()
+        assert False, "Expected PoolTimeoutError"
+    except PoolTimeoutError:
+        pass
+    pool.release(conn)
+
+    # Dead connections are replaced on checkout
+    conn.close()
+    replacement = pool.acquire()
+    assert replacement is not conn
+    pool.release(replacement)
+
+    # Idle overflow connections are reaped
+    time.sleep(0.1)
+    fresh = pool.acquire()
+    assert fresh is not replacement
+    pool.release(fresh)
+
+    stats = pool.stats()
+    assert stats['waits'] == 1 and stats['timeouts'] == 1
+    assert stats['invalidated'] == 1
+    assert stats['in_use'] == 0 and stats['idle'] == 1
+    pool.dispose()
+    os.remove(path)
+    print("✓ Max size, health checks and idle timeout enforced")
+
+
+def test_pool_overflow_and_leak_detection():
+    """Overflow connections beyond pool_size are tracked and leaks are reported"""
+    print("\nTesting pool overflow and leak detection...")
+    path = use_temp_database(schema=False)
+
+    pool = ConnectionPool(database._create_sqlite_connection, pool_size=1, max_overflow=2,
+                          timeout=0.05, leak_timeout=0.01)
+
+    def checkout_and_forget():
+        return pool.acquire()
+
+    conns = [pool.acquire(), checkout_and_forget(), pool.acquire()]
+    stats = pool.stats()
+    assert stats['open'] == 3 and stats['in_use'] == 3 and stats['overflow'] == 2
+
+    time.sleep(0.02)
+    leaks = pool.find_leaks()
+    assert len(leaks) == 3
+    assert any('checkout_and_forget' in leak['acquired_at'] for leak in leaks)
+
+    for conn in conns:
+        pool.release(conn)
+    assert pool.find_leaks() == []
+    pool.dispose()
+    os.remove(path)
+    print("✓ Overflow counted and leaked checkouts reported with their stack")
+
+
+# Hot-path queries that must be served by an index, never a full table scan
+INDEXED_QUERIES = [
+    ("SELECT * FROM invoices WHERE client_id = ?", ('C1',)),
+    ("SELECT * FROM invoices WHERE status = ?", ('paid',)),
+    ("SELECT * FROM invoices WHERE client_id = ? AND status = 'unpaid' ORDER BY date", ('C1',)),
+    ("SELECT * FROM invoices WHERE date BETWEEN ? AND ?", ('2026-01-01', '2026-02-01')),
+    ("SELECT * FROM invoices WHERE created_at >= ?", ('2026-01-01',)),
+    ("SELECT SUM(amount) FROM payments WHERE invoice_id = ?", ('INV-1',)),
+    ("SELECT SUM(amount) FROM expenses WHERE date BETWEEN ? AND ?", ('2026-01-01', '2026-02-01')),
+    ("SELECT * FROM audit_logs WHERE entity_type = ? AND entity_id = ? ORDER BY timestamp DESC",
+     ('invoice', 'INV-1')),
+    ("SELECT * FROM shared_invoices WHERE invoice_id = ? AND access_token = ?", ('INV-1', 'token')),
+    ("SELECT * FROM recurring_invoices WHERE is_active = 1", ()),
+    ("SELECT * FROM invoices WHERE status = 'unpaid' AND date_iso <= ?", ('2026-01-01',)),
+    ("SELECT id FROM invoices WHERE status IN ('unpaid', 'partially_paid') AND due_date < ?", ('2026-01-01',)),
+    ("SELECT 1 FROM invoice_reminders WHERE invoice_id = ? AND reminder_type = 'reminder' AND sent_date >= ?",
+     ('INV-1', '2026-01-01')),
+    ("SELECT * FROM invoices ORDER BY COALESCE(date_iso, '') DESC, id DESC LIMIT 101", ()),
+    ("SELECT * FROM invoices WHERE COALESCE(date_iso, '') <= ? AND ((COALESCE(date_iso, '') < ?) "
+     "OR (COALESCE(date_iso, '') = ? AND id < ?)) ORDER BY COALESCE(date_iso, '') DESC, id DESC LIMIT 101",
+     ('2026-01-01', '2026-01-01', '2026-01-01', 'INV-1')),
+    ("SELECT * FROM invoices WHERE client_id = ? ORDER BY COALESCE(date_iso, '') DESC, id DESC LIMIT 101",
+     ('C1',)),
+    ("SELECT * FROM clients WHERE name >= ? AND ((name > ?) OR (name = ? AND id > ?)) "
+     "ORDER BY name ASC, id ASC LIMIT 101", ('Acme', 'Acme', 'Acme', 'C1')),
+]
+
+
+def assert_no_full_scan(conn, query, params):
+    """Fail if EXPLAIN QUERY PLAN reports a full scan of any table"""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    details = [row['detail'] for row in plan]
+    for detail in details:
+        assert not re.fullmatch(r"SCAN \w+( AS \w+)?", detail), \
+            f"Full table scan for {query!r}: {details}"
+
+
+def test_hot_path_indexes():
+    """Index migration is idempotent and hot queries use indexes"""
+    print("\nTesting hot path indexes...")
+    use_temp_database()
+
+    with database.get_db_connection() as conn:
+        # Re-running is a no-op once the migration is recorded
+        assert run_migrations(conn) == []
+        versions = [row['version'] for row in conn.execute("SELECT version FROM schema_migrations")]
+        assert 1 in versions
+
+        for query, params in INDEXED_QUERIES:
+            assert_no_full_scan(conn, query, params)
+    print("✓ All hot path queries use an index")
+
+
+def test_invoice_date_backfill():
+    """Legacy invoice dates are backfilled into date_iso and overdue invoices found by range"""
+    print("\nTesting invoice date backfill...")
+    use_temp_database()
+
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, created_at) VALUES ('C1', 'Acme', '2026-01-01')")
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, services, total, status, date, created_at, due_date) VALUES (?, 'C1', '[]', 10, ?, ?, ?, ?)",
+            [('OLD', 'unpaid', '05 January 2026', '2026-01-05T10:00:00', '04 February 2026'),
+             ('ISO', 'unpaid', '2026-03-01', '2026-03-01T10:00:00', None),
+             ('NODATE', 'unpaid', None, '2026-01-02T10:00:00', '2026-02-01'),
+             ('PAID', 'paid', '05 January 2026', '2026-01-05T10:00:00', None),
+             ('BAD', 'unpaid', 'sometime', 'also bad', None)]
+        )
+        conn.execute("DELETE FROM schema_migrations WHERE version = 7")
+        conn.commit()
+        assert run_migrations(conn) == [7]
+
+        rows = {row['id']: row for row in conn.execute("SELECT id, date_iso, due_date FROM invoices")}
+        assert rows['OLD']['date_iso'] == '2026-01-05' and rows['OLD']['due_date'] == '2026-02-04'
+        assert rows['ISO']['date_iso'] == '2026-03-01'
+        assert rows['NODATE']['date_iso'] == '2026-01-02' and rows['NODATE']['due_date'] == '2026-02-01'
+        assert rows['BAD']['date_iso'] is None
+
+        # 2026-01-05 is 60 days before 2026-03-06
+        days = (datetime.date.today() - datetime.date(2026, 3, 6)).days
+        overdue = InvoiceReminder.get_overdue_invoices(conn, days_overdue=days + 60)
+        assert [row['id'] for row in overdue] == ['NODATE', 'OLD']
+        assert overdue[0]['name'] == 'Acme'
+    print("✓ Dates backfilled and overdue invoices selected in SQL")
+
+
+def test_placeholder_translation():
+    """Placeholders are translated without touching quoted text or comments"""
+    print("\nTesting placeholder translation...")
+    statement = parse_statement(
+        "SELECT * FROM settings WHERE key LIKE 'TAX_%' AND value = 'why?' "
+        "AND key = ? -- trailing ? comment\n AND \"col?\" = ? /* ? */"
+    )
+    assert statement.param_count == 2
+    assert "'TAX_%%'" in statement.pyformat and "'why?'" in statement.pyformat
+    assert "key = %s" in statement.pyformat and '"col?" = %s' in statement.pyformat
+    assert "key = $1" in statement.numbered and '"col?" = $2' in statement.numbered
+    assert "'TAX_%'" in statement.numbered
+    assert statement.preparable
+    assert statement.execute_sql == f"EXECUTE {statement.name} (%s, %s)"
+
+    assert parse_statement("SELECT 'It''s ?' FROM t WHERE a = ?").param_count == 1
+    assert not parse_statement("CREATE TABLE t (x TEXT)").preparable
+    print("✓ Placeholders translated, literals preserved")
+
+
+def test_statement_cache():
+    """Repeated SQL text is parsed once and counted towards preparing"""
+    print("\nTesting statement cache...")
+    cache = StatementCache(max_size=2)
+    first = cache.get("SELECT * FROM api_keys WHERE key = ?")
+    again = cache.get("SELECT * FROM api_keys WHERE key = ?")
+    assert first is again and again.executions == 2
+    assert cache.hits == 1 and cache.misses == 1
+
+    cache.get("SELECT 1")
+    cache.get("SELECT 2")
+    assert len(cache) == 2
+    assert cache.get("SELECT * FROM api_keys WHERE key = ?") is not first
+    print("✓ Statements cached with LRU eviction")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("Database Layer Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_sqlite_connection_reused,
+        test_sqlite_uncommitted_work_rolled_back,
+        test_sqlite_concurrent_profile,
+        test_pool_limits_and_health_checks,
+        test_pool_overflow_and_leak_detection,
+        test_hot_path_indexes,
+        test_invoice_date_backfill,
+        test_placeholder_translation,
+        test_statement_cache,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
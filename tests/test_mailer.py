@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Test script for the email outbox and pooled SMTP sending
+"""
+import sys
+import os
+import datetime
+import email
+import socketserver
+import threading
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.business.bulk_operations import BulkInvoiceOperations
+from src.business import mailer as mailer_module
+from src.business.mailer import Mailer, smtp_settings
+from src.business.scheduler import NotificationManager
+from tests import restore_database, use_temp_database
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    """Just enough of SMTP for smtplib: EHLO, AUTH PLAIN, MAIL, RCPT, DATA, NOOP, RSET, QUIT"""
+
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost test server")
+        while True:
+            line = self.rfile.readline().decode().strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250 AUTH PLAIN")
+            elif command == 'AUTH':
+                self.reply("235 Authentication successful")
+            elif command == 'RCPT' and 'reject' in line:
+                self.reply("550 No such user")
+            elif command in ('MAIL', 'RCPT', 'NOOP', 'RSET'):
+                self.reply("250 OK")
+            elif command == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b".\r\n", b""):
+                        break
+                    data.append(data_line)
+                with server.lock:
+                    if server.fail_next:
+                        server.fail_next -= 1
+                        self.reply("451 Try again later")
+                        continue
+                    server.messages.append(email.message_from_bytes(b"".join(data)))
+                self.reply("250 Queued")
+            elif command == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+def start_smtp_server():
+    """Local SMTP stand-in on a free port, recording messages and connection count"""
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), _SmtpHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.connections = 0
+    server.fail_next = 0
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def email_settings(server):
+    """Settings pointing at the test server (SMTP_PASSWORD comes from the environment)"""
+    os.environ['SMTP_PASSWORD'] = 'secret'
+    return {
+        'SMTP_SERVER': '127.0.0.1', 'SMTP_PORT': str(server.server_address[1]),
+        'SMTP_USERNAME': 'user', 'SMTP_SENDER_EMAIL': 'billing@example.com',
+        'COMPANY_NAME': 'Test Co', 'EMAIL_SUBJECT': 'Invoice from {company_name}',
+        'EMAIL_BODY': 'Dear {client_name}, invoice {invoice_id} totals ${total}.'
+    }
+
+
+def use_mail_database(invoices=5):
+    """Fresh schema with one client and a few unpaid invoices"""
+    use_temp_database()
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, email, created_at) VALUES ('C1', 'Acme', 'acme@example.com', '2026-01-01')")
+        conn.execute("INSERT INTO clients (id, name, email, created_at) VALUES ('C2', 'No Mail', NULL, '2026-01-01')")
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, services, total, status, date, created_at) VALUES (?, 'C1', ?, 100.0, 'unpaid', '05 January 2026', ?)",
+            [(f"INV-{i}", str([('Design', 100.0)]), f"2026-01-0{i + 1}T09:00:00") for i in range(invoices)]
+        )
+        conn.execute("INSERT INTO invoices (id, client_id, services, total, status, date, created_at) VALUES ('INV-X', 'C2', '[]', 10.0, 'unpaid', '05 January 2026', '2026-01-09')")
+        conn.commit()
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+    os.environ.pop('SMTP_PASSWORD', None)
+
+
+def test_bulk_send_reuses_connections():
+    """Bulk sending goes through the outbox and reuses pooled SMTP sessions"""
+    print("Testing bulk send over pooled connections...")
+    use_mail_database()
+    server = start_smtp_server()
+    os.environ['EMAIL_WORKERS'] = '2'
+    try:
+        with database.get_db_connection() as conn:
+            result = BulkInvoiceOperations.bulk_send_emails(
+                conn, [f"INV-{i}" for i in range(5)] + ['INV-X', 'MISSING'], email_settings(server))
+            statuses = [row['status'] for row in conn.execute("SELECT status FROM email_outbox").fetchall()]
+    finally:
+        os.environ.pop('EMAIL_WORKERS')
+        server.shutdown()
+        server.server_close()
+
+    assert result['sent_count'] == 5
+    assert sorted(e['invoice_id'] for e in result['errors']) == ['INV-X', 'MISSING']
+    assert statuses == ['sent'] * 5
+    assert len(server.messages) == 5 and server.connections <= 2
+    message = server.messages[0]
+    assert message['Subject'] == 'Invoice from Test Co'
+    attachments = [part for part in message.walk() if part.get_content_type() == 'application/pdf']
+    assert attachments and attachments[0].get_payload(decode=True).startswith(b'%PDF-')
+    print("✓ 5 emails sent over", server.connections, "connection(s)")
+
+
+def test_retry_and_failure():
+    """Transient failures are retried; permanent ones fail the message and can be requeued"""
+    print("\nTesting retries...")
+    use_mail_database()
+    server = start_smtp_server()
+    server.fail_next = 1
+    mailer = Mailer(smtp_settings(email_settings(server)), workers=1, retry_delay=0.01)
+    try:
+        with database.get_db_connection() as conn:
+            result = mailer.send(conn, [
+                {'recipient': 'acme@example.com', 'subject': 'Hello', 'body': '<p>Hi</p>'},
+                {'recipient': 'reject@example.com', 'subject': 'Hello', 'body': '<p>Hi</p>'},
+            ])
+            outcomes = {r['status']: r for r in result['results']}
+            assert mailer.requeue(conn, [outcomes['failed']['id']]) == 1
+            row = conn.execute("SELECT status, attempts FROM email_outbox WHERE id = ?",
+                               (outcomes['failed']['id'],)).fetchone()
+    finally:
+        mailer.close()
+        server.shutdown()
+        server.server_close()
+
+    assert result['sent_count'] == 1 and result['failed_count'] == 1
+    assert outcomes['sent']['attempts'] == 2
+    assert outcomes['failed']['attempts'] == 1 and '550' in outcomes['failed']['error']
+    assert (row['status'], row['attempts']) == ('queued', 1)
+    print("✓ Transient failure retried, permanent failure recorded")
+
+
+def test_batch_reminders():
+    """Overdue invoices are reminded once per window, with reminder and audit rows recorded"""
+    print("\nTesting batch reminders...")
+    use_mail_database()
+    server = start_smtp_server()
+    settings = email_settings(server)
+    now = datetime.datetime.now().isoformat()
+    with database.get_db_connection() as conn:
+        conn.execute(f"DELETE FROM settings WHERE key IN ({', '.join('?' * len(settings))})", list(settings))
+        conn.executemany("INSERT INTO settings (key, value) VALUES (?, ?)", list(settings.items()))
+        conn.execute("UPDATE invoices SET due_date = '2026-01-01'")
+        conn.execute("UPDATE invoices SET status = 'paid' WHERE id = 'INV-4'")
+        conn.execute("""INSERT INTO invoice_reminders (id, invoice_id, reminder_type, sent_date, created_at)
+                        VALUES ('R0', 'INV-3', 'reminder', ?, ?)""", (now, now))
+        conn.commit()
+
+    manager = NotificationManager(database.get_db_connection)
+    try:
+        first = manager.send_batch_reminders(days_overdue=7)
+        second = manager.send_batch_reminders(days_overdue=7)
+        with database.get_db_connection() as conn:
+            reminded = [row['invoice_id'] for row in conn.execute(
+                "SELECT invoice_id FROM invoice_reminders WHERE id != 'R0' ORDER BY invoice_id").fetchall()]
+            audited = conn.execute(
+                "SELECT COUNT(*) FROM audit_logs WHERE entity_type = 'invoice' AND action = 'notification_sent'"
+            ).fetchone()[0]
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert first['sent_count'] == 3, first
+    assert first['errors'] == [{'invoice_id': 'INV-X', 'error': 'Client email not available'}]
+    assert second['sent_count'] == 0
+    assert reminded == ['INV-0', 'INV-1', 'INV-2'] and audited == 3
+    assert len(server.messages) == 3 and server.messages[0]['Subject'].startswith('Payment reminder')
+    print("✓ Reminders sent once per window")
+
+
+def test_dispatch_errors_release_claims():
+    """A failed attachment fails only its message; a crash puts unsent claims back in the queue"""
+    print("\nTesting dispatch errors...")
+    use_mail_database()
+    server = start_smtp_server()
+    mailer = Mailer(smtp_settings(email_settings(server)), workers=1, retry_delay=0.01)
+    render = mailer_module.cached_invoice_pdf
+
+    def failing_render(invoice, settings, logo_path=None):
+        if invoice['id'] == 'INV-1':
+            raise OSError("cache directory is read-only")
+        return render(invoice, settings, logo_path)
+
+    def crash(*args, **kwargs):
+        raise RuntimeError("database went away")
+
+    messages = [{'recipient': 'acme@example.com', 'subject': 'Invoice', 'body': '<p>Hi</p>',
+                 'invoice_id': f"INV-{i}", 'attach_pdf': True} for i in range(3)]
+    fetch_invoices = mailer_module.BatchPdfRenderer.fetch_invoices
+    try:
+        with database.get_db_connection() as conn:
+            mailer_module.cached_invoice_pdf = failing_render
+            result = mailer.send(conn, messages)
+
+            ids = Mailer.enqueue(conn, messages[:2])
+            conn.commit()
+            mailer_module.BatchPdfRenderer.fetch_invoices = staticmethod(crash)
+            try:
+                mailer.dispatch(conn, ids)
+                assert False, "dispatch swallowed the error"
+            except RuntimeError:
+                pass
+            requeued = [row['status'] for row in conn.execute(
+                "SELECT status FROM email_outbox WHERE id IN (?, ?)", ids).fetchall()]
+    finally:
+        mailer_module.cached_invoice_pdf = render
+        mailer_module.BatchPdfRenderer.fetch_invoices = staticmethod(fetch_invoices)
+        mailer.close()
+        server.shutdown()
+        server.server_close()
+
+    outcomes = {r['invoice_id']: r for r in result['results']}
+    assert result['sent_count'] == 2 and result['failed_count'] == 1
+    assert 'read-only' in outcomes['INV-1']['error'] and outcomes['INV-1']['attempts'] == 0
+    assert requeued == ['queued', 'queued']
+    print("✓ Attachment failure isolated; interrupted claims requeued")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("Mailer Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_bulk_send_reuses_connections,
+        test_retry_and_failure,
+        test_dispatch_errors_release_claims,
+        test_batch_reminders,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test script for invoices.amount_paid, payment recording and reconciliation
+"""
+import sys
+import os
+import threading
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.payments import record_payment, reconcile_amount_paid
+from src.models.rollups import get_monthly_rollups, rebuild_monthly_rollups
+from tests import restore_database, use_temp_database
+
+
+def use_payments_database(total=100.0):
+    """Fresh schema with one client and one unpaid invoice for ``total``"""
+    path = use_temp_database()
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, email, created_at) VALUES ('C1', 'Acme', 'a@example.com', '2026-01-01')")
+        conn.execute("""INSERT INTO invoices (id, client_id, services, total, status, date, date_iso, created_at)
+                        VALUES ('INV-1', 'C1', '[]', ?, 'unpaid', '05 January 2026', '2026-01-05', '2026-01-05')""",
+                     (total,))
+        rebuild_monthly_rollups(conn)
+    return path
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+
+
+def invoice(conn):
+    """amount_paid and status of INV-1"""
+    row = conn.execute("SELECT amount_paid, status FROM invoices WHERE id = 'INV-1'").fetchone()
+    return row['amount_paid'], row['status']
+
+
+def test_amount_paid_follows_payments():
+    """Inserts, moves and deletes of payments keep amount_paid and the status current"""
+    print("Testing amount_paid...")
+    use_payments_database()
+    with database.get_db_connection() as conn:
+        first = record_payment(conn, 'INV-1', 40, '2026-01-06', 'Cash')
+        conn.commit()
+        assert invoice(conn) == (40, 'partially_paid')
+        record_payment(conn, 'INV-1', 60, '2026-01-07', 'Bank')
+        conn.commit()
+        assert invoice(conn) == (100, 'paid')
+
+        conn.execute("UPDATE payments SET amount = 10 WHERE id = ?", (first,))
+        assert invoice(conn) == (70, 'partially_paid')
+        conn.execute("DELETE FROM payments")
+        assert invoice(conn) == (0, 'unpaid')
+        conn.rollback()
+
+        try:
+            record_payment(conn, 'INV-404', 10, '2026-01-06', 'Cash')
+            assert False, "payment for a missing invoice was recorded"
+        except ValueError:
+            conn.rollback()
+        assert conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == 2
+
+        # The paid invoice moved from outstanding to revenue in the rollup
+        month = get_monthly_rollups(conn)[0]
+        assert month['revenue_paid'] == 100 and month['outstanding'] == 0
+    print("✓ amount_paid and status updated with each payment")
+
+
+def test_concurrent_payments():
+    """Parallel payments to one invoice are all counted, and it ends up paid exactly once"""
+    print("\nTesting concurrent payments...")
+    use_payments_database(total=400.0)
+    threads, failures = 8, []
+    payments_per_thread = 10
+    barrier = threading.Barrier(threads)
+
+    def pay():
+        try:
+            barrier.wait()
+            for _ in range(payments_per_thread):
+                with database.get_db_connection() as conn:
+                    record_payment(conn, 'INV-1', 5.0, '2026-01-06', 'Card')
+                    conn.commit()
+        except Exception as e:
+            failures.append(e)
+
+    workers = [threading.Thread(target=pay) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert not failures, failures
+    with database.get_db_connection() as conn:
+        assert invoice(conn) == (400, 'paid')
+        assert conn.execute("SELECT COUNT(*) FROM payments").fetchone()[0] == threads * payments_per_thread
+        assert reconcile_amount_paid(conn, fix=False) == []
+        month = get_monthly_rollups(conn)[0]
+        assert month['paid_count'] == 1 and month['unpaid_count'] == 0, month
+    print(f"✓ {threads * payments_per_thread} payments from {threads} threads, no lost updates")
+
+
+def test_reconcile_repairs_drift():
+    """reconcile_amount_paid finds invoices out of step with their payments and fixes them"""
+    print("\nTesting reconciliation...")
+    use_payments_database()
+    with database.get_db_connection() as conn:
+        record_payment(conn, 'INV-1', 30, '2026-01-06', 'Cash')
+        conn.execute("UPDATE invoices SET amount_paid = 100, status = 'paid' WHERE id = 'INV-1'")
+        conn.commit()
+
+        drifted = reconcile_amount_paid(conn, fix=False)
+        assert [(row['id'], row['payments_total']) for row in drifted] == [('INV-1', 30)]
+        assert invoice(conn) == (100, 'paid')
+
+        reconcile_amount_paid(conn)
+        assert invoice(conn) == (30, 'partially_paid')
+        assert reconcile_amount_paid(conn, fix=False) == []
+    print("✓ Drift reported, then repaired")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("Payments Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_amount_paid_follows_payments,
+        test_concurrent_payments,
+        test_reconcile_repairs_drift,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Test script for invoice PDF rendering
+"""
+import sys
+import os
+import io
+import json
+import tempfile
+import zipfile
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.business.pdf_batch import BatchPdfRenderer
+from src.utils.pdf_cache import PdfCache
+from src.utils.pdf_renderer import get_invoice_renderer, invoice_content_key, render_invoice_pdf
+from tests import restore_database, use_temp_database
+
+SETTINGS = {'COMPANY_NAME': 'Test Co', 'BANK_DETAILS': 'Bank: Test'}
+
+
+def make_invoice(**overrides):
+    """A paid invoice with two service lines"""
+    invoice = {
+        'id': 'INV-1', 'date': '01 January 2026', 'total': 150.0, 'status': 'paid',
+        'services': str([('Design', 100.0), ('Hosting', 50.0)]),
+        'name': 'Acme', 'email': 'acme@example.com', 'phone': None,
+    }
+    invoice.update(overrides)
+    return invoice
+
+
+def test_render_in_memory():
+    """Rendering returns PDF bytes and writes nothing to the working directory"""
+    print("Testing in-memory rendering...")
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            pdf = render_invoice_pdf(make_invoice(), SETTINGS)
+            corrupt = render_invoice_pdf(make_invoice(services='not a list'), SETTINGS)
+        finally:
+            os.chdir(cwd)
+        assert os.listdir(tmp) == []
+    assert pdf.startswith(b'%PDF-') and corrupt.startswith(b'%PDF-')
+    print("✓ PDF rendered into memory")
+
+
+def test_renderer_reuse():
+    """The shared renderer is rebuilt only when printed settings change"""
+    print("\nTesting renderer reuse...")
+    renderer = get_invoice_renderer(SETTINGS)
+    assert get_invoice_renderer(dict(SETTINGS, SMTP_SERVER='smtp.example.com')) is renderer
+    assert get_invoice_renderer(dict(SETTINGS, COMPANY_NAME='Other Co')) is not renderer
+
+    key = invoice_content_key(make_invoice(), SETTINGS)
+    assert invoice_content_key(make_invoice(), dict(SETTINGS)) == key
+    assert invoice_content_key(make_invoice(status='unpaid'), SETTINGS) != key
+    assert invoice_content_key(make_invoice(), dict(SETTINGS, COMPANY_TIN='123')) != key
+    print("✓ Renderer and content keys follow the printed content")
+
+
+def use_invoice_database(invoices=6):
+    """Fresh schema with one client and a few invoices, every third one paid"""
+    path = use_temp_database()
+    with database.get_db_connection() as conn:
+        conn.execute("INSERT INTO clients (id, name, email, created_at) VALUES ('C1', 'Acme', 'acme@example.com', '2026-01-01')")
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, services, total, status, date, created_at) VALUES (?, 'C1', ?, 100.0, ?, '05 January 2026', ?)",
+            [(f"INV-{i}", str([('Design', 100.0)]), 'paid' if i % 3 == 0 else 'unpaid', f"2026-01-0{i + 1}T09:00:00")
+             for i in range(invoices)]
+        )
+        conn.execute("UPDATE invoices SET services = 'not a list' WHERE id = 'INV-1'")
+        conn.commit()
+    return path
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+
+
+def test_batch_render():
+    """Batches render across worker processes and report per-invoice errors"""
+    print("\nTesting batch rendering...")
+    use_invoice_database()
+    progress = []
+    archive = io.BytesIO()
+    with database.get_db_connection() as conn:
+        result = BatchPdfRenderer.export(conn, archive, invoice_ids=['INV-0', 'INV-4', 'MISSING', 'INV-0'],
+                                         workers=2, chunk_size=1, progress=lambda done, total: progress.append(done))
+        unpaid = BatchPdfRenderer.fetch_invoices(conn, status='unpaid', end_date='2026-01-03')
+
+    assert result['total'] == 3 and result['rendered_count'] == 2
+    assert result['errors'] == [{'id': 'MISSING', 'error': 'Invoice not found'}]
+    assert sorted(progress) == [2, 3]
+    with zipfile.ZipFile(archive) as zf:
+        assert sorted(zf.namelist()) == ['errors.json', 'invoice_INV-0.pdf', 'invoice_INV-4.pdf']
+        assert zf.read('invoice_INV-0.pdf').startswith(b'%PDF-')
+        assert json.loads(zf.read('errors.json'))[0]['id'] == 'MISSING'
+    assert [invoice['id'] for invoice in unpaid] == ['INV-1', 'INV-2']
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with database.get_db_connection() as conn:
+            result = BatchPdfRenderer.export(conn, tmp, filters={'status': 'unpaid'},
+                                             output_format='directory', workers=1)
+        assert result['rendered_count'] == 4 and len(os.listdir(tmp)) == 4
+
+    # The cap applies to filters (and no filters at all), not only to ID lists
+    with database.get_db_connection() as conn:
+        for kwargs in ({'filters': {'status': 'unpaid'}}, {}, {'invoice_ids': ['INV-0', 'INV-2', 'INV-4']}):
+            try:
+                BatchPdfRenderer.export(conn, io.BytesIO(), max_invoices=2, workers=1, **kwargs)
+                assert False, f"cap not applied to {kwargs}"
+            except ValueError:
+                pass
+        result = BatchPdfRenderer.export(conn, io.BytesIO(), filters={'status': 'paid'}, max_invoices=2, workers=1)
+        assert result['rendered_count'] == 2
+    print("✓ Batch rendered to ZIP and directory, capped at max_invoices")
+
+
+def test_pdf_cache():
+    """Cached PDFs are reused, invalidated per invoice and evicted least recently used first"""
+    print("\nTesting PDF cache...")
+    with tempfile.TemporaryDirectory() as tmp:
+        size = len(render_invoice_pdf(make_invoice(), SETTINGS))
+        cache = PdfCache(tmp, max_bytes=int(size * 2.5))
+
+        pdf = cache.get_or_render(make_invoice(), SETTINGS)
+        assert cache.get_or_render(make_invoice(), SETTINGS) == pdf
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # A status change gives a new key; invalidate drops the old copy
+        cache.get_or_render(make_invoice(status='unpaid'), SETTINGS)
+        assert cache.stats()['entries'] == 2
+        assert cache.invalidate(['INV-1', 'INV-2']) == 2
+        assert cache.stats()['entries'] == 0
+
+        for i, invoice_id in enumerate(['INV-A', 'INV-B']):
+            cache.get_or_render(make_invoice(id=invoice_id), SETTINGS)
+            key = invoice_content_key(make_invoice(id=invoice_id), SETTINGS)
+            os.utime(cache._path(invoice_id, key), (1000 + i, 1000 + i))
+        cache.get_or_render(make_invoice(id='INV-C'), SETTINGS)
+
+        stats = cache.stats()
+        assert stats['evictions'] == 1 and stats['entries'] == 2
+        assert stats['size_bytes'] <= stats['max_bytes']
+        assert not any(name.startswith('INV-A__') for name in os.listdir(tmp))
+    print("✓ PDF cache hits, invalidation and eviction work")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("PDF Renderer Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_render_in_memory,
+        test_renderer_reuse,
+        test_batch_render,
+        test_pdf_cache,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
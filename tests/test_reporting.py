@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Test script for the advanced reports against a real (temporary) database
+"""
+import sys
+import os
+import datetime
+
+# Add the parent directory to the path so we can import from src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.models import database
+from src.models.dialect import month_bucket
+from src.models.rollups import get_monthly_rollups, rebuild_monthly_rollups, summarize_rollups
+from src.business.advanced_reporting import AdvancedReporting
+from src.business.business_logic import BusinessAnalytics
+from src.business.bulk_operations import BulkInvoiceOperations
+from tests import restore_database, use_temp_database
+
+
+def use_reporting_database():
+    """
+    Fresh schema with two clients, one project and a few invoices
+
+    C1 has INV-1 (100, paid 100), INV-2 (200, paid 50 + 25) and INV-3 (50,
+    nothing paid); C2 has no invoices. INV-1 and INV-2 belong to P1.
+    """
+    path = use_temp_database()
+
+    now = datetime.datetime.now()
+    recent = (now - datetime.timedelta(days=10)).isoformat()
+    old = (now - datetime.timedelta(days=100)).isoformat()
+    with database.get_db_connection() as conn:
+        conn.executemany(
+            "INSERT INTO clients (id, name, email, created_at) VALUES (?, ?, ?, ?)",
+            [('C1', 'Acme', 'acme@example.com', old), ('C2', 'Idle', 'idle@example.com', old)]
+        )
+        conn.execute(
+            "INSERT INTO projects (id, client_id, name, budget, status, created_at) VALUES ('P1', 'C1', 'Site', 1000, 'active', ?)",
+            (old,)
+        )
+        conn.executemany(
+            "INSERT INTO invoices (id, client_id, project_id, total, status, created_at, due_date) VALUES (?, 'C1', ?, ?, ?, ?, ?)",
+            [('INV-1', 'P1', 100.0, 'paid', old, None),
+             ('INV-2', 'P1', 200.0, 'partially_paid', old, old),
+             ('INV-3', None, 50.0, 'unpaid', recent, None)]
+        )
+        conn.executemany(
+            "INSERT INTO payments (id, invoice_id, amount, date, method, created_at) VALUES (?, ?, ?, ?, 'Cash', ?)",
+            [('PAY-1', 'INV-1', 100.0, old, old), ('PAY-2', 'INV-2', 50.0, old, old),
+             ('PAY-3', 'INV-2', 25.0, old, old)]
+        )
+        conn.execute(
+            "INSERT INTO expenses (id, date, category, amount, created_at, project_id) VALUES ('E1', ?, 'Travel', 120.0, ?, 'P1')",
+            (old, old)
+        )
+        conn.commit()
+    return path
+
+
+def teardown_module(module=None):
+    """Restore the configured database after the suite"""
+    restore_database()
+
+
+def test_client_performance_metrics():
+    """Payment totals come from the per-invoice CTE, one row per invoiced client"""
+    print("Testing client performance metrics...")
+    use_reporting_database()
+    with database.get_db_connection() as conn:
+        result = AdvancedReporting.client_performance_metrics(conn)
+
+    assert result['total_clients'] == 1 and result['active_clients'] == 1
+    client = result['top_clients'][0]
+    assert client['id'] == 'C1' and client['invoice_count'] == 3
+    assert client['total_revenue'] == 350.0 and client['total_paid'] == 175.0
+    assert client['outstanding'] == 175.0
+    assert set(client) == {'id', 'name', 'email', 'invoice_count', 'total_revenue', 'total_paid',
+                           'outstanding', 'avg_invoice_value', 'last_invoice_date',
+                           'days_since_last_invoice', 'is_active'}
+    print("✓ Client metrics computed in one query")
+
+
+def test_project_profitability_analysis():
+    """Project revenue and expenses are aggregated per project"""
+    print("\nTesting project profitability...")
+    use_reporting_database()
+    with database.get_db_connection() as conn:
+        result = AdvancedReporting.project_profitability_analysis(conn)
+
+    assert result['total_projects'] == 1
+    project = result['projects'][0]
+    assert project['revenue'] == 300.0 and project['invoice_count'] == 2
+    assert project['expenses'] == 120.0 and project['profit'] == 180.0
+    assert project['budget_utilization'] == 12.0
+    assert result['total_profit'] == 180.0
+    print("✓ Project profitability computed in one query")
+
+
+def test_invoice_aging_report():
+    """Outstanding amounts use the summed payments of each open invoice"""
+    print("\nTesting invoice aging report...")
+    use_reporting_database()
+    with database.get_db_connection() as conn:
+        result = AdvancedReporting.invoice_aging_report(conn)
+
+    buckets = result['aging_buckets']
+    assert result['total_invoices'] == 2
+    assert buckets['1-30_days']['invoices'][0]['id'] == 'INV-3'
+    assert buckets['1-30_days']['amount'] == 50.0
+    assert buckets['61-90_days']['count'] == 0
+    assert buckets['over_90_days']['invoices'][0]['outstanding'] == 125.0
+    assert result['total_outstanding'] == 175.0
+    print("✓ Aging buckets computed in one query")
+
+
+def test_month_bucketing():
+    """Monthly trends are grouped in SQL and match Python's month keys"""
+    print("\nTesting month bucketing...")
+    assert month_bucket('created_at', 'sqlite') == "strftime('%Y-%m', created_at)"
+    assert month_bucket('created_at', 'mysql') == "DATE_FORMAT(created_at, '%Y-%m')"
+    assert 'date_trunc' in month_bucket('created_at', 'postgresql')
+
+    use_reporting_database()
+    with database.get_db_connection() as conn:
+        trend = AdvancedReporting.revenue_trend_analysis(conn, months=12)
+        forecast = AdvancedReporting.predictive_analytics(conn)
+
+    now = datetime.datetime.now()
+    recent_month = (now - datetime.timedelta(days=10)).strftime('%Y-%m')
+    old_month = (now - datetime.timedelta(days=100)).strftime('%Y-%m')
+    assert list(trend['monthly_data']) == [old_month, recent_month]
+    assert trend['monthly_data'][old_month] == {
+        'revenue': 300.0, 'invoice_count': 2, 'paid_count': 1, 'unpaid_count': 1
+    }
+    assert trend['total_revenue'] == 350.0
+    assert trend['growth_rate'] == (50.0 - 300.0) / 300.0 * 100
+    assert forecast['months_analyzed'] == 2
+    assert forecast['predicted_next_month'] == 175.0
+    print("✓ Months bucketed in the database")
+
+
+def test_monthly_rollups():
+    """Tracked writes keep the rollup equal to a full rebuild"""
+    print("\nTesting monthly rollups...")
+    use_reporting_database()
+    now = datetime.datetime.now()
+    with database.get_db_connection() as conn:
+        assert rebuild_monthly_rollups(conn) == 2
+        summary = summarize_rollups(conn)
+        assert summary['revenue'] == 100.0 and summary['expenses'] == 120.0
+        assert summary['outstanding'] == 50.0
+        assert summary['invoice_count'] == 3 and summary['paid_count'] == 1
+
+        BulkInvoiceOperations.bulk_update_status(conn, ['INV-3'], 'paid')
+        BulkInvoiceOperations.bulk_create_invoices(
+            conn, [{'client_id': 'C1', 'services': ['Work'], 'amounts': [40.0]}]
+        )
+        BulkInvoiceOperations.bulk_delete_invoices(conn, ['INV-1'])
+        tracked = get_monthly_rollups(conn)
+
+        rebuild_monthly_rollups(conn)
+        assert get_monthly_rollups(conn) == tracked
+
+        recent = (now - datetime.timedelta(days=10)).date().isoformat()
+        metrics = BusinessAnalytics.calculate_metrics(conn, recent, now.date().isoformat())
+    assert metrics['revenue'] == 50.0 and metrics['invoice_count'] == 1
+    assert metrics['expenses'] == 0 and metrics['outstanding'] == 40.0
+    print("✓ Incremental rollup matches a rebuild")
+
+
+def main():
+    """Run all tests"""
+    print("=" * 60)
+    print("Advanced Reporting Test Suite")
+    print("=" * 60)
+
+    tests = [
+        test_client_performance_metrics,
+        test_project_profitability_analysis,
+        test_invoice_aging_report,
+        test_month_bucketing,
+        test_monthly_rollups,
+    ]
+    failed = 0
+    for test in tests:
+        try:
+            test()
+        except Exception as e:
+            failed += 1
+            print(f"✗ {test.__name__} failed: {e}")
+
+    teardown_module()
+
+    print("=" * 60)
+    if failed == 0:
+        print("✓ All tests passed!")
+        return 0
+    print(f"✗ {failed} test(s) failed")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())